@@ -0,0 +1,150 @@
+"""
+Нагрузочное сравнение Database с общим пулом соединений (WAL, настроенные pragma, кэш выражений)
+и прежней схемы, когда каждый вызов connect() открывал новое соединение, а каждая модель
+при создании заново выполняла create_tables().
+
+Каждый поток имитирует обработку обновлений бота: просмотр мероприятия с проверкой
+регистрации, список мероприятий региона и запись на мероприятие. Запуск:
+
+    python benchmark_database.py --threads 4 --updates 500
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from database.connection import get_connection_pool
+from database.exceptions import DatabaseError
+from database.models import user as user_module
+from database.models.event import EventModel
+from database.models.user import UserModel
+
+CITIES = ("Москва", "Казань", "Самара", "Томск")
+
+
+class LegacyConnection:
+    """Новое соединение на каждую операцию и проверка схемы при создании каждой модели"""
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.create_tables()
+
+    @contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, timeout=20)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка при подключении к базе данных: {e}")
+        finally:
+            conn.close()
+
+
+class LegacyUserModel(LegacyConnection, UserModel):
+    pass
+
+
+class LegacyEventModel(LegacyConnection, EventModel):
+    pass
+
+
+def populate(db_path: str, user_class, event_class, users: int, events: int):
+    event_db = event_class(db_path)
+    user_db = user_class(db_path)
+    for event_id in range(events):
+        event_db.add_event(
+            f"Мероприятие {event_id}", "01.01.2030", "10:00", CITIES[event_id % len(CITIES)], "admin",
+            "Описание мероприятия", 5, "экология,город", f"CODE{event_id}", "admin"
+        )
+    for user_id in range(1, users + 1):
+        user_db.save_user(user_id, f"Пользователь {user_id}", f"@user{user_id}")
+        user_db.update_user_city(user_id, CITIES[user_id % len(CITIES)])
+
+
+def run(db_path: str, user_class, event_class, threads: int, updates: int, events: int) -> dict:
+    errors = []
+    latencies = []
+    lock = threading.Lock()
+
+    def handle_updates(user_id: int):
+        local = []
+        try:
+            for update in range(updates):
+                event_id = update % events + 1
+                started = time.perf_counter()
+                # Обработчики создают модели на каждое обновление, как в bot/handlers
+                user_db, event_db = user_class(db_path), event_class(db_path)
+                user = user_db.get_user(user_id)
+                event_db.get_event_by_id(event_id)
+                registered = event_db.is_user_registered_for_event(user_id, str(event_id))
+                event_db.get_events_by_city(user["city"])
+                event_db.get_events_count_by_city(user["city"])
+                if not registered and update % 10 == 0:
+                    events_list = [e for e in (user["registered_events"] or "").split(",") if e]
+                    user_db.update_user_registered_events(user_id, ",".join(events_list + [str(event_id)]))
+                    event_db.increment_event_participants_count(event_id)
+                local.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=handle_updates, args=(user_id,)) for user_id in range(1, threads + 1)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    def percentile(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+    return {
+        "updates_per_s": threads * updates / elapsed,
+        "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    variants = (
+        ("legacy", LegacyUserModel, LegacyEventModel),
+        ("pooled", UserModel, EventModel),
+    )
+
+    print(f"Потоков: {args.threads}, обновлений на поток: {args.updates}")
+    print(f"{'variant':<8} {'updates/s':>10} {'mean':>10} {'p50':>10} {'p95':>10} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, user_class, event_class in variants:
+            db_path = os.path.join(directory, f"{name}.db")
+            populate(db_path, user_class, event_class, args.threads, args.events)
+            # is_user_registered_for_event создает UserModel внутри себя
+            user_module_class = user_module.UserModel
+            user_module.UserModel = user_class
+            try:
+                result = run(db_path, user_class, event_class, args.threads, args.updates, args.events)
+            finally:
+                user_module.UserModel = user_module_class
+            get_connection_pool(db_path).close()
+            print(
+                f"{name:<8} {result['updates_per_s']:>10.0f} {result['mean']:>8.2f}ms "
+                f"{result['p50']:>8.2f}ms {result['p95']:>8.2f}ms {result['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Нагрузочное сравнение MemoryStore с долгоживущими соединениями (WAL, synchronous=NORMAL)
+и прежней схемы, когда на каждую операцию открывалось новое соединение с настройками по умолчанию.
+
+Несколько потоков имитируют параллельные AI-чаты: каждый ход сохраняет запрос и ответ,
+читает историю разговора и обращается к общей памяти агента. Запуск:
+
+    python benchmark_memory_store.py --threads 8 --turns 200
+"""
+import argparse
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _load_memory_store():
+    # Модуль загружается напрямую: services/ai/__init__.py импортирует RAG-агента целиком
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "services", "ai", "memory_store.py")
+    spec = importlib.util.spec_from_file_location("memory_store", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _legacy_store_class(memory_store):
+    class LegacyMemoryStore(memory_store.MemoryStore):
+        """Новое соединение на каждую операцию, журнал и синхронизация по умолчанию"""
+
+        @contextmanager
+        def _connect(self):
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+    return LegacyMemoryStore
+
+
+def run(store, threads: int, turns: int) -> dict:
+    errors = []
+    latencies = {"store": [], "retrieve": []}
+    lock = threading.Lock()
+
+    def chat(user_id: int):
+        local = {"store": [], "retrieve": []}
+        try:
+            for turn in range(turns):
+                started = time.perf_counter()
+                store.append_conversation(user_id, [
+                    {"role": "user", "content": f"Вопрос {turn} о мероприятиях"},
+                    {"role": "assistant", "content": f"Ответ {turn}: ближайшие мероприятия в вашем регионе"},
+                ])
+                store.store("agent", f"last_query_{user_id}", {"turn": turn})
+                local["store"].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                store.get_conversation(user_id)
+                store.retrieve("agent", f"last_query_{user_id}")
+                local["retrieve"].append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+        with lock:
+            for key, values in local.items():
+                latencies[key].extend(values)
+
+    workers = [threading.Thread(target=chat, args=(user_id,)) for user_id in range(1, threads + 1)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    def percentile(values, q):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+    return {
+        "turns_per_s": threads * turns / elapsed,
+        "store_p50": percentile(latencies["store"], 0.5),
+        "store_p95": percentile(latencies["store"], 0.95),
+        "retrieve_p50": percentile(latencies["retrieve"], 0.5),
+        "retrieve_p95": percentile(latencies["retrieve"], 0.95),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    memory_store = _load_memory_store()
+    variants = (
+        ("legacy", _legacy_store_class(memory_store)),
+        ("pooled", memory_store.MemoryStore),
+    )
+
+    print(f"Потоков: {args.threads}, ходов на поток: {args.turns}")
+    print(f"{'variant':<8} {'turns/s':>9} {'store p50':>10} {'store p95':>10} {'read p50':>10} {'read p95':>10} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, store_class in variants:
+            store = store_class(os.path.join(directory, f"{name}.db"))
+            result = run(store, args.threads, args.turns)
+            store.close()
+            print(
+                f"{name:<8} {result['turns_per_s']:>9.0f} {result['store_p50']:>8.2f}ms {result['store_p95']:>8.2f}ms "
+                f"{result['retrieve_p50']:>8.2f}ms {result['retrieve_p95']:>8.2f}ms {result['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
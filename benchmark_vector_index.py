@@ -0,0 +1,121 @@
+"""
+Сравнение реализаций VectorIndex (NumPy и FAISS) на синтетическом каталоге мероприятий.
+
+Для каждой реализации в отдельном процессе измеряются время импорта, построения,
+публикации и открытия индекса (время запуска бота), прирост памяти процесса
+и задержка поиска. Запуск:
+
+    python benchmark_vector_index.py --events 2000 --dimension 1024 --queries 200
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKENDS = ("numpy", "faiss")
+
+
+def _rss_mb() -> float:
+    # ru_maxrss в Linux измеряется в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(backend: str, events: int, dimension: int, queries: int, directory: str) -> dict:
+    import numpy as np
+
+    rss_start = _rss_mb()
+    started = time.perf_counter()
+    # Модуль загружается напрямую: services/ai/__init__.py импортирует RAG-агента целиком
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "services", "ai", "vector_index.py")
+    spec = importlib.util.spec_from_file_location("vector_index", path)
+    vector_index = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(vector_index)
+    if backend == "faiss":
+        import faiss  # noqa: F401 - время импорта FAISS входит во время запуска
+    import_time = time.perf_counter() - started
+
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((events, dimension)).astype(np.float32)
+    ids = list(range(1, events + 1))
+    records = [{"id": event_id, "name": f"Мероприятие {event_id}", "date": "01.01.2030"} for event_id in ids]
+
+    started = time.perf_counter()
+    index = vector_index.create_index(backend, dimension)
+    index.add(ids, vectors, records)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vector_index.publish_index(index, directory, f"bench_{backend}")
+    publish_time = time.perf_counter() - started
+    del index
+
+    started = time.perf_counter()
+    loaded = vector_index.open_published_index(directory, f"bench_{backend}")
+    load_time = time.perf_counter() - started
+
+    query_vectors = rng.standard_normal((queries, dimension)).astype(np.float32)
+    loaded.search(query_vectors[0], 10)
+    started = time.perf_counter()
+    results = [loaded.search(query, 10) for query in query_vectors]
+    search_time = (time.perf_counter() - started) / queries
+
+    return {
+        "backend": backend,
+        "import_ms": import_time * 1000,
+        "build_ms": build_time * 1000,
+        "publish_ms": publish_time * 1000,
+        "load_ms": load_time * 1000,
+        "search_ms": search_time * 1000,
+        "rss_growth_mb": _rss_mb() - rss_start,
+        "top_ids": [[event_id for event_id, _ in found] for found in results],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.events, args.dimension, args.queries, args.directory)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in BACKENDS:
+            command = [
+                sys.executable, os.path.abspath(__file__), "--worker", backend, "--directory", directory,
+                "--events", str(args.events), "--dimension", str(args.dimension), "--queries", str(args.queries)
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            if completed.returncode != 0:
+                print(f"{backend}: ошибка\n{completed.stderr.strip()}")
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print(f"Каталог: {args.events} мероприятий, размерность {args.dimension}, {args.queries} запросов, top-10")
+    print(f"{'backend':<8} {'import':>9} {'build':>9} {'publish':>9} {'load':>9} {'search':>9} {'memory':>10}")
+    for result in results:
+        print(
+            f"{result['backend']:<8} {result['import_ms']:>7.1f}ms {result['build_ms']:>7.1f}ms "
+            f"{result['publish_ms']:>7.1f}ms {result['load_ms']:>7.1f}ms {result['search_ms']:>7.3f}ms "
+            f"{result['rss_growth_mb']:>8.1f}MB"
+        )
+
+    # Оба индекса точные, поэтому результаты поиска должны совпадать
+    if len(results) == 2:
+        same = sum(a == b for a, b in zip(results[0]["top_ids"], results[1]["top_ids"]))
+        print(f"Совпадение top-10: {same}/{args.queries}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 """Обработчики админских команд."""
 
+import asyncio
 import os
 import csv
 import logging
@@ -67,7 +68,8 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• `/delete_me` \\- удалить свой аккаунт\n"
         "• `/ai_query <query>` \\- обработать запрос через ИИ\n"
         "• `/search_events_tag <tag>` \\- поиск мероприятий по тегу\n"
-        "• `/load_events_csv` \\- загрузить CSV с мероприятиями"
+        "• `/load_events_csv` \\- загрузить CSV с мероприятиями\n"
+        "• `/rebuild_index` \\- перестроить векторный индекс мероприятий"
     )
 
 @role_required("admin")
@@ -80,6 +82,34 @@ async def set_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except (IndexError, ValueError):
         await update.message.reply_markdown("*⚠️ Использование: /set_admin <user_id>*")
 
+@role_required("admin")
+async def rebuild_index(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик команды /rebuild_index: фоновая перестройка векторного индекса."""
+    from services.ai.shared_embeddings import SharedEmbeddings
+
+    try:
+        store = await asyncio.to_thread(lambda: SharedEmbeddings().get_store())
+        started = store.rebuild()
+        stats = store.get_rebuild_stats()
+    except Exception as e:
+        logger.error(f"Ошибка при перестройке векторного индекса: {e}")
+        await update.message.reply_text("❌ Не удалось запустить перестройку векторного индекса.")
+        return
+
+    status = "🔄 Перестройка индекса запущена" if started else "⏳ Перестройка индекса уже выполняется"
+    last = "—"
+    if stats["last_started"]:
+        last = f"{stats['last_started']}, {stats['last_status']}, {stats['last_duration']:.1f} с"
+        if stats["last_error"]:
+            last += f" ({stats['last_error']})"
+    await update.message.reply_text(
+        f"{status}.\n"
+        f"В индексе: {stats['current']} актуальных и {stats['archived']} архивных мероприятий\n"
+        f"Последняя перестройка: {last}\n"
+        f"Перестроек: {stats['runs']}, ошибок: {stats['failures']}, "
+        f"среднее время: {stats['avg_duration']:.1f} с"
+    )
+
 @role_required("admin")
 async def unset_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /unset_admin."""
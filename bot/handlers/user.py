@@ -1,6 +1,8 @@
 MAX_MESSAGE_LENGTH = 4096
 
+import asyncio
 import logging
+import threading
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
 from bot.keyboards.common import get_cancel_keyboard
@@ -17,6 +19,9 @@ from bot.keyboards import (get_ai_chat_keyboard, get_city_selection_keyboard, ge
 
 from database.models.project import ProjectModel
 from services.ai import UnifiedRAGAgent
+from services.ai.recommendations import RecommendationBuilder
+from services.ai.event_similarity import EventSimilarityGraph
+from services.ai.session_history import SessionHistory
 from database import UserModel, EventModel
 from bot.constants import CITIES, TAGS
 
@@ -25,6 +30,26 @@ logger = logging.getLogger(__name__)
 user_db = UserModel()
 event_db = EventModel()
 
+# RAG-агент создается один раз (при запуске бота или при первом обращении к ИИ-чату)
+# и переиспользуется, чтобы не перестраивать векторное хранилище на каждое сообщение
+_rag_agent = None
+_rag_agent_lock = threading.Lock()
+
+
+def get_rag_agent() -> UnifiedRAGAgent:
+    """
+    Возвращает общий RAG-агент, создавая его при первом вызове.
+    Создание загружает векторное хранилище, поэтому из асинхронного кода
+    функцию нужно вызывать через asyncio.to_thread.
+
+    Returns:
+        UnifiedRAGAgent: RAG-агент
+    """
+    global _rag_agent
+    with _rag_agent_lock:
+        if _rag_agent is None:
+            _rag_agent = UnifiedRAGAgent()
+        return _rag_agent
 
 
 async def handle_event_tag_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -207,27 +232,17 @@ async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 async def handle_ai_chat(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.message.text.strip()
     if query.lower() in ["выход", "назад", "меню", "❌ отмена"]:
-        context.user_data.pop("conversation_history", None)
+        await asyncio.to_thread(SessionHistory().reset, update.effective_user.id)
         await update.message.reply_text(
             "Диалог прерван. Возвращаемся в главное меню.",
             reply_markup=get_main_menu_keyboard()
         )
         return MAIN_MENU
 
-    if "conversation_history" not in context.user_data:
-        context.user_data["conversation_history"] = []
-
-    context.user_data["conversation_history"].append({"role": "user", "content": query})
-
-    # Используем новый унифицированный RAG-агент вместо маршрутизатора
-    rag_agent = UnifiedRAGAgent()
-    response = rag_agent.process_query(
-        query,
-        user_id=update.effective_user.id,
-        conversation_history=context.user_data["conversation_history"]
-    )
-
-    context.user_data["conversation_history"].append({"role": "assistant", "content": response})
+    # Этапы обработки выполняются асинхронно и не блокируют обработку других сообщений.
+    # История разговора хранится в SessionHistory и дополняется агентом
+    rag_agent = _rag_agent or await asyncio.to_thread(get_rag_agent)
+    response = await rag_agent.aprocess_query(query, user_id=update.effective_user.id)
 
     max_length = 4096
     if len(response) > max_length:
@@ -262,6 +277,26 @@ async def handle_volunteer_home(update: Update, context: ContextTypes.DEFAULT_TY
             context.user_data.pop("selected_tag", None)
         # Вызываем функцию обработки мероприятий
         return await handle_events(update, context)
+    elif text == "Рекомендовано для вас":
+        # Рекомендации рассчитываются периодической задачей, здесь только чтение из базы
+        events = await asyncio.to_thread(RecommendationBuilder().get_recommendations, user_id)
+        if not events:
+            await update.message.reply_text(
+                "Пока нечего порекомендовать. Укажите интересы и регион в профиле или загляните в текущие мероприятия.",
+                reply_markup=get_volunteer_dashboard_keyboard()
+            )
+            return VOLUNTEER_DASHBOARD
+
+        registered = []
+        if user and user.get("registered_events"):
+            registered = [e.strip() for e in user["registered_events"].split(",") if e.strip()]
+
+        await update.message.reply_text(
+            "Мероприятия, подобранные по вашим интересам и региону:",
+            reply_markup=get_events_keyboard(events, 0, max(len(events), 1), len(events), registered_events=registered)
+        )
+        context.user_data["current_events"] = events
+        return GUEST_DASHBOARD
     elif text == "Информация":
         return await show_info(update, context)
     elif text == "Бонусы":
@@ -998,6 +1033,26 @@ async def handle_event_details(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return VOLUNTEER_DASHBOARD
 
+    elif text == "🔍 Похожие мероприятия":
+        # Соседи мероприятия рассчитываются заранее, здесь только чтение из базы
+        events = await asyncio.to_thread(EventSimilarityGraph().get_similar, int(event_id))
+        if not events:
+            await update.message.reply_text("Похожих предстоящих мероприятий не найдено.")
+            return EVENT_DETAILS
+
+        user = user_db.get_user(user_id)
+        registered = []
+        if user and user.get("registered_events"):
+            registered = [e.strip() for e in user["registered_events"].split(",") if e.strip()]
+
+        context.user_data.pop("current_event_id", None)
+        await update.message.reply_text(
+            "Похожие мероприятия:",
+            reply_markup=get_events_keyboard(events, 0, max(len(events), 1), len(events), registered_events=registered)
+        )
+        context.user_data["current_events"] = events
+        return GUEST_DASHBOARD
+
     elif text == "✅ Зарегистрироваться":
         # Получаем информацию о пользователе и мероприятии
         user = user_db.get_user(user_id)
@@ -52,6 +52,7 @@ def get_event_details_keyboard(event_id, is_registered=False):
     else:
         buttons.append(["✅ Зарегистрироваться"])
 
+    buttons.append(["🔍 Похожие мероприятия"])
     buttons.append(["⬅️ Назад к списку"])
     buttons.append(["❌ Выход"])
 
@@ -21,6 +21,7 @@ def get_main_menu_keyboard(role="user"):
 def get_volunteer_dashboard_keyboard():
     return ReplyKeyboardMarkup([
         ["Профиль", "Текущие мероприятия"],
+        ["Рекомендовано для вас"],
         ["Бонусы", "Ввести код", "Лидерборд"],
         ["Информация", "Выход"]
     ], resize_keyboard=True)
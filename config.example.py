@@ -21,3 +21,131 @@ GIGACHAT_API_URL = "https://gigachat.devices.sberbank.ru/api/v1/chat/completions
 MODEL_NAME = "GigaChat:latest"
 TEMPERATURE = 0.7  # Параметр генеративности (0.0 - 1.0)
 MAX_TOKENS = 200  # Максимальное количество токенов в ответе
+
+# Маршрутизация вызовов LLM: модель, температура и лимит токенов для каждого типа вызова.
+# Дешевые классификационные запросы идут на быструю модель, финальные ответы - на более крупную.
+LLM_ROUTES = {
+    "intent": {"model": "GigaChat", "temperature": 0.1, "max_tokens": 200},
+    "extraction": {"model": "GigaChat", "temperature": 0.1, "max_tokens": 150},
+    "rewrite": {"model": "GigaChat", "temperature": 0.3, "max_tokens": 60},
+    "summary": {"model": "GigaChat", "temperature": 0.2, "max_tokens": 150},
+    "final_answer": {"model": MODEL_NAME, "temperature": TEMPERATURE, "max_tokens": MAX_TOKENS},
+}
+
+# Минимальная косинусная близость вопроса к справочнику bot_info,
+# при которой ответ выдается из справочника без обращения к GigaChat,
+# и доля значимых слов вопроса, которые должны встречаться в примерах раздела
+FAQ_MIN_SIMILARITY = 0.6
+FAQ_MIN_COVERAGE = 0.75
+
+# Адаптивный семантический поиск: запрос перефразируется через GigaChat, только если
+# лучшая релевантность (0..1) ниже порога или найдено меньше SEARCH_MIN_RESULTS мероприятий.
+# Пороги подбираются по статистике UnifiedRAGAgent.get_search_stats().
+SEARCH_MIN_RELEVANCE = 0.75
+SEARCH_MIN_RESULTS = 2
+# Запускать перефразирование параллельно с первым поиском. Быстрее при низкой релевантности,
+# но вызов модели оплачивается для каждого поиска, в том числе уверенного
+# (такие вызовы считаются в rewrites_wasted статистики поиска)
+SEARCH_SPECULATIVE_REWRITE = False
+
+# Веса признаков при переранжировании рекомендаций (services/ai/reranker.py).
+# Отрицательные веса понижают мероприятия, на которые пользователь уже записан, и прошедшие.
+RERANK_WEIGHTS = {
+    "similarity": 0.4,
+    "tags": 0.25,
+    "region": 0.15,
+    "date": 0.1,
+    "availability": 0.05,
+    "registered": -0.5,
+    "past": -1.0,
+}
+
+# Персональные рекомендации (services/ai/recommendations.py) пересчитываются периодической
+# задачей раз в RECOMMENDATIONS_INTERVAL секунд только для пользователей, затронутых изменениями
+RECOMMENDATIONS_INTERVAL = 600
+RECOMMENDATIONS_TOP_N = 10
+
+# Граф похожих мероприятий (services/ai/event_similarity.py): число соседей,
+# период фонового пересчета для измененных мероприятий и период полного пересчета с новыми IDF в секундах
+SIMILAR_EVENTS_K = 10
+SIMILAR_EVENTS_INTERVAL = 300
+SIMILAR_EVENTS_FULL_REBUILD_INTERVAL = 86400
+
+# Сколько дней прошедшее мероприятие остается в основном векторном индексе.
+# Более старые мероприятия переносятся в архивный уровень и ищутся только по вопросам об истории.
+VECTOR_HOT_TIER_DAYS = 7
+
+# Каталог опубликованных векторных индексов. Файлы открываются с отображением в память
+# и используются всеми процессами бота; новое поколение публикуется атомарной заменой манифеста.
+VECTOR_INDEX_DIR = "./database/vector_index"
+# "faiss" или "numpy". Для каталога в несколько тысяч мероприятий точный поиск на NumPy
+# не уступает FAISS и не требует его установки (сравнение: python benchmark_vector_index.py)
+VECTOR_INDEX_BACKEND = "faiss"
+# Через сколько секунд после изменения мероприятия уровень индекса публикуется на диск
+# (серия изменений - одним поколением) и как часто поиск проверяет поколения других процессов
+VECTOR_INDEX_PUBLISH_DELAY = 5
+VECTOR_INDEX_RELOAD_INTERVAL = 5
+# Через сколько секунд после изменения мероприятия в базе (добавление, правка, удаление)
+# оно переиндексируется; изменения за это время векторизуются одним пакетом
+VECTOR_INDEX_SYNC_DELAY = 2
+
+# API эмбеддингов GigaChat (services/ai/gigachat_embeddings.py)
+EMBEDDINGS_MODEL = "Embeddings"
+EMBEDDINGS_BATCH_SIZE = 16
+
+# Период проверки векторного индекса в секундах: если мероприятия менялись, индекс
+# перестраивается в фоне и атомарно подменяется (вручную - командой /rebuild_index)
+VECTOR_INDEX_REBUILD_INTERVAL = 900
+
+# Сколько последних сообщений разговора с пользователем хранится в памяти агента (database/memory.db)
+CONVERSATION_HISTORY_LIMIT = 50
+
+# Сколько миллисекунд соединение с базой памяти агента ждет снятия блокировки другим потоком
+MEMORY_DB_BUSY_TIMEOUT = 5000
+
+# История AI-чата (services/ai/session_history.py): окно последних сообщений пользователя в памяти,
+# число сессий в кэше (неактивные вытесняются) и пакетная фоновая запись в memory.db
+SESSION_HISTORY_WINDOW = 20
+SESSION_CACHE_SIZE = 1000
+SESSION_FLUSH_INTERVAL = 5
+SESSION_FLUSH_BATCH = 100
+
+# Сжатие длинных разговоров (services/ai/conversation_summary.py): после CONVERSATION_SUMMARY_TOKENS
+# токенов ранние сообщения сворачиваются в краткое содержание, в промпт дословно попадают
+# только CONVERSATION_TAIL_MESSAGES последних сообщений
+CONVERSATION_SUMMARY_TOKENS = 1000
+CONVERSATION_TAIL_MESSAGES = 4
+
+# Семантическая память разговоров (services/ai/turn_memory.py): сколько ходов пользователя
+# хранится с эмбеддингами и для скольких пользователей индексы ходов держатся в памяти
+TURN_MEMORY_LIMIT = 200
+TURN_MEMORY_CACHE_SIZE = 200
+
+# Обслуживание базы памяти агента (memory.db): период в секундах, размер порции удаления,
+# сколько цепочек рассуждений хранится для агента. Истекшие записи и строки сверх лимитов
+# CONVERSATION_HISTORY_LIMIT и TURN_MEMORY_LIMIT удаляются, место освобождается incremental_vacuum
+# (база, созданная до его включения, переводится в этот режим один раз при запуске бота)
+MEMORY_MAINTENANCE_INTERVAL = 3600
+MEMORY_MAINTENANCE_BATCH = 500
+REASONING_CHAINS_LIMIT = 500
+
+# Телеметрия агентов (services/ai/telemetry.py): доля запросов, для которых сохраняется цепочка
+# рассуждений (при уровне логирования DEBUG - все), доля записываемых вызовов инструментов,
+# размер буфера и период фоновой записи в memory.db
+TELEMETRY_REASONING_SAMPLE_RATE = 0.0
+TELEMETRY_ACTION_SAMPLE_RATE = 1.0
+TELEMETRY_QUEUE_SIZE = 1000
+TELEMETRY_FLUSH_INTERVAL = 10
+AGENT_ACTIONS_LIMIT = 5000
+
+# Кэш инструментов RAG-агента: сколько секунд повторный семантический поиск и выборка
+# мероприятий из БД с теми же аргументами берутся из кэша (0 - без кэша)
+SEMANTIC_SEARCH_CACHE_TTL = 60
+DB_EVENTS_CACHE_TTL = 30
+
+# Соединения с основной базой (database/connection.py): ожидание блокировки в мс, страничный
+# кэш соединения в КБ, объем файла, отображаемый в память, и кэш подготовленных выражений
+DB_BUSY_TIMEOUT = 20000
+DB_CACHE_SIZE_KB = 8192
+DB_MMAP_SIZE = 67108864
+DB_STATEMENT_CACHE_SIZE = 128
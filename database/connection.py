@@ -1,7 +1,139 @@
+import logging
+import os
 import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
 
-def get_db_connection(db_path: str = "./database/database.db"):
+import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "./database/database.db"
+# Сколько миллисекунд соединение ждет снятия блокировки другой записью
+DEFAULT_DB_BUSY_TIMEOUT = 20000
+# Размер страничного кэша каждого соединения в КБ
+DEFAULT_DB_CACHE_SIZE_KB = 8192
+# Сколько байт файла базы отображается в память для чтения
+DEFAULT_DB_MMAP_SIZE = 64 * 1024 * 1024
+# Сколько подготовленных выражений кэширует каждое соединение
+DEFAULT_DB_STATEMENT_CACHE_SIZE = 128
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_db_connection(db_path: str = DEFAULT_DB_PATH):
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     return conn
 
+
+def _close_connection(conn: sqlite3.Connection):
+    try:
+        conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при закрытии соединения с базой данных: {e}")
+
+
+class _ThreadConnection:
+    """
+    Соединение одного потока. Хранится только в threading.local, поэтому освобождается
+    вместе с потоком, и соединение закрывается финализатором
+    """
+    __slots__ = ("conn", "depth", "finalizer", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.depth = 0
+        self.finalizer = weakref.finalize(self, _close_connection, conn)
+
+
+class ConnectionPool:
+    """
+    Долгоживущие соединения с одной базой SQLite, по одному на поток.
+    Соединения работают в режиме WAL с настроенными pragma и кэшируют
+    подготовленные выражения, поэтому обращения к базе не платят за открытие
+    файла и разбор схемы при каждом запросе. Соединение короткоживущего потока
+    (таймера, фоновой перестройки) закрывается при завершении этого потока.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.busy_timeout = getattr(config, "DB_BUSY_TIMEOUT", DEFAULT_DB_BUSY_TIMEOUT)
+        self.cache_size_kb = getattr(config, "DB_CACHE_SIZE_KB", DEFAULT_DB_CACHE_SIZE_KB)
+        self.mmap_size = getattr(config, "DB_MMAP_SIZE", DEFAULT_DB_MMAP_SIZE)
+        self.statement_cache_size = getattr(config, "DB_STATEMENT_CACHE_SIZE", DEFAULT_DB_STATEMENT_CACHE_SIZE)
+        self.schema_ready = False
+        self._local = threading.local()
+        # Слабые ссылки: пул не продлевает жизнь соединений завершившихся потоков
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            cached_statements=self.statement_cache_size,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        # WAL позволяет читать параллельно с записью, а synchronous=NORMAL
+        # в этом режиме не вызывает fsync на каждый коммит
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Контекстный менеджер для соединения текущего потока.
+        Вложенные вызовы получают то же соединение; при выходе из внешнего
+        незавершенная транзакция откатывается, как при закрытии соединения.
+
+        Yields:
+            sqlite3.Connection: Соединение с базой данных
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._open_connection())
+            with self._lock:
+                self._connections.add(holder)
+        conn = holder.conn
+        holder.depth += 1
+        try:
+            yield conn
+        finally:
+            holder.depth -= 1
+            if holder.depth == 0 and conn.in_transaction:
+                conn.rollback()
+
+    def close(self):
+        """Закрывает соединения всех потоков"""
+        with self._lock:
+            holders, self._connections = list(self._connections), weakref.WeakSet()
+        for holder in holders:
+            holder.finalizer()
+        self._local = threading.local()
+
+
+def get_connection_pool(db_path: str = DEFAULT_DB_PATH) -> ConnectionPool:
+    """
+    Возвращает общий пул соединений для файла базы данных
+
+    Args:
+        db_path: Путь к файлу базы данных
+
+    Returns:
+        ConnectionPool: Пул соединений
+    """
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path)
+        return pool
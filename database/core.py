@@ -2,15 +2,21 @@ import sqlite3
 import os
 import logging
 from contextlib import contextmanager
+from .connection import DEFAULT_DB_PATH, get_connection_pool
 from .exceptions import DatabaseError
+from .signals import notify_event_change
 
 logger = logging.getLogger(__name__)
 
 class Database:
-    def __init__(self, db_name='./database/database.db'):
+    def __init__(self, db_name=DEFAULT_DB_PATH):
         self.db_name = db_name
         self._ensure_db_directory()
-        self.create_tables()
+        # Модели создаются часто, поэтому пул соединений и проверка схемы общие для файла базы
+        self.pool = get_connection_pool(db_name)
+        if not self.pool.schema_ready:
+            self.create_tables()
+            self.pool.schema_ready = True
 
     def _ensure_db_directory(self):
         """Проверяет и создает директорию для базы данных."""
@@ -20,16 +26,18 @@ class Database:
 
     @contextmanager
     def connect(self):
-        conn = sqlite3.connect(self.db_name, check_same_thread=False, timeout=20)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        except sqlite3.Error as e:
-            logger.error(f"Ошибка при подключении к базе данных: {e}")
-            raise DatabaseError(f"Ошибка при подключении к базе данных: {e}")
-        finally:
-            if conn:
-                conn.close()
+        """Соединение текущего потока из общего пула; после операции оно не закрывается."""
+        with self.pool.connection() as conn:
+            try:
+                yield conn
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка при подключении к базе данных: {e}")
+                raise DatabaseError(f"Ошибка при подключении к базе данных: {e}")
+
+    def close(self):
+        """Закрывает соединения с базой данных во всех потоках."""
+        self.pool.close()
+
     def create_tables(self):
         """Создает таблицы в базе данных."""
         try:
@@ -99,6 +107,49 @@ class Database:
                     )
                 ''')
 
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS event_summaries (
+                        event_id INTEGER PRIMARY KEY,
+                        summary TEXT NOT NULL,
+                        keywords TEXT DEFAULT '',
+                        source_hash TEXT NOT NULL,
+                        updated_at TEXT DEFAULT (datetime('now')),
+                        FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS user_recommendations (
+                        user_id INTEGER NOT NULL,
+                        rank INTEGER NOT NULL,
+                        event_id INTEGER NOT NULL,
+                        score REAL NOT NULL,
+                        updated_at TEXT DEFAULT (datetime('now')),
+                        PRIMARY KEY (user_id, rank)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_user_recommendations_event
+                    ON user_recommendations (event_id)
+                ''')
+                # Отметка о расчете рекомендаций: пустой список тоже результат
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS user_recommendation_runs (
+                        user_id INTEGER PRIMARY KEY,
+                        updated_at TEXT DEFAULT (datetime('now'))
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS event_neighbors (
+                        event_id INTEGER NOT NULL,
+                        rank INTEGER NOT NULL,
+                        neighbor_id INTEGER NOT NULL,
+                        score REAL NOT NULL,
+                        PRIMARY KEY (event_id, rank)
+                    )
+                ''')
+
                 conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Ошибка при создании таблиц: {e}")
@@ -125,6 +176,34 @@ class Database:
             logger.error(f"Ошибка при получении мероприятий: {e}")
             raise DatabaseError(f"Ошибка при получении мероприятий: {e}")
 
+    def get_events_by_ids(self, event_ids: list):
+        """
+        Получает мероприятия по списку ID
+
+        Args:
+            event_ids: Список ID мероприятий
+
+        Returns:
+            Список найденных мероприятий
+        """
+        if not event_ids:
+            return []
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" for _ in event_ids)
+                cursor.execute(f"""
+                    SELECT id, name, description, event_date, start_time,
+                           city, creator, participation_points, participants_count,
+                           tags, code, owner, project_id
+                    FROM events
+                    WHERE id IN ({placeholders})
+                """, list(event_ids))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении мероприятий: {e}")
+            raise DatabaseError(f"Ошибка при получении мероприятий: {e}")
+
     def add_event(self, event_data: dict) -> int:
         """
         Добавляет новое мероприятие
@@ -156,7 +235,9 @@ class Database:
                     event_data.get('project_id', None)
                 ))
                 conn.commit()
-                return cursor.lastrowid
+                event_id = cursor.lastrowid
+            notify_event_change(event_id, "added")
+            return event_id
         except sqlite3.Error as e:
             logger.error(f"Ошибка при добавлении мероприятия: {e}")
             raise DatabaseError(f"Ошибка при добавлении мероприятия: {e}")
@@ -191,6 +272,7 @@ class Database:
                     event_id
                 ))
                 conn.commit()
+            notify_event_change(event_id, "updated")
         except sqlite3.Error as e:
             logger.error(f"Ошибка при обновлении мероприятия: {e}")
             raise DatabaseError(f"Ошибка при обновлении мероприятия: {e}")
@@ -206,7 +288,249 @@ class Database:
             with self.connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
+                cursor.execute("DELETE FROM event_summaries WHERE event_id = ?", (event_id,))
+                cursor.execute("DELETE FROM event_neighbors WHERE event_id = ?", (event_id,))
                 conn.commit()
+            notify_event_change(event_id, "deleted")
         except sqlite3.Error as e:
             logger.error(f"Ошибка при удалении мероприятия: {e}")
-            raise DatabaseError(f"Ошибка при удалении мероприятия: {e}") 
\ No newline at end of file
+            raise DatabaseError(f"Ошибка при удалении мероприятия: {e}")
+
+    def get_event_summaries(self, event_ids: list) -> dict:
+        """
+        Получает краткие описания мероприятий
+
+        Args:
+            event_ids: Список ID мероприятий
+
+        Returns:
+            Словарь {ID мероприятия: {"summary", "keywords", "source_hash"}}
+        """
+        if not event_ids:
+            return {}
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" for _ in event_ids)
+                cursor.execute(f"""
+                    SELECT event_id, summary, keywords, source_hash
+                    FROM event_summaries
+                    WHERE event_id IN ({placeholders})
+                """, list(event_ids))
+                return {
+                    row['event_id']: {
+                        "summary": row['summary'],
+                        "keywords": row['keywords'],
+                        "source_hash": row['source_hash']
+                    }
+                    for row in cursor.fetchall()
+                }
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении кратких описаний мероприятий: {e}")
+            raise DatabaseError(f"Ошибка при получении кратких описаний мероприятий: {e}")
+
+    def save_event_summary(self, event_id: int, summary: str, keywords: str, source_hash: str):
+        """
+        Сохраняет краткое описание мероприятия
+
+        Args:
+            event_id: ID мероприятия
+            summary: Краткое описание
+            keywords: Ключевые слова через запятую
+            source_hash: Хэш данных мероприятия, по которым построено описание
+        """
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO event_summaries (event_id, summary, keywords, source_hash, updated_at)
+                    VALUES (?, ?, ?, ?, datetime('now'))
+                """, (event_id, summary, keywords, source_hash))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении краткого описания мероприятия: {e}")
+            raise DatabaseError(f"Ошибка при сохранении краткого описания мероприятия: {e}")
+
+    def replace_user_recommendations(self, recommendations: dict):
+        """
+        Заменяет списки рекомендаций пользователей одной транзакцией
+
+        Args:
+            recommendations: Словарь {ID пользователя: [(ID мероприятия, оценка), ...]} по убыванию оценки
+        """
+        if not recommendations:
+            return
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                user_ids = list(recommendations)
+                cursor.executemany(
+                    "DELETE FROM user_recommendations WHERE user_id = ?",
+                    [(user_id,) for user_id in user_ids]
+                )
+                cursor.executemany("""
+                    INSERT INTO user_recommendations (user_id, rank, event_id, score)
+                    VALUES (?, ?, ?, ?)
+                """, [
+                    (user_id, rank, event_id, score)
+                    for user_id, items in recommendations.items()
+                    for rank, (event_id, score) in enumerate(items)
+                ])
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO user_recommendation_runs (user_id, updated_at) VALUES (?, datetime('now'))",
+                    [(user_id,) for user_id in user_ids]
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении рекомендаций: {e}")
+            raise DatabaseError(f"Ошибка при сохранении рекомендаций: {e}")
+
+    def has_user_recommendations(self, user_id: int) -> bool:
+        """
+        Проверяет, рассчитывались ли рекомендации пользователя (в том числе пустые)
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            True, если рекомендации уже рассчитаны
+        """
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM user_recommendation_runs WHERE user_id = ?", (user_id,))
+                return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при проверке рекомендаций: {e}")
+            raise DatabaseError(f"Ошибка при проверке рекомендаций: {e}")
+
+    def get_user_recommendations(self, user_id: int, limit: int = 10) -> list:
+        """
+        Получает сохраненные рекомендации пользователя вместе с данными мероприятий
+
+        Args:
+            user_id: ID пользователя
+            limit: Максимальное количество мероприятий
+
+        Returns:
+            Список мероприятий по убыванию оценки рекомендации
+        """
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT e.id, e.name, e.description, e.event_date, e.start_time,
+                           e.city, e.creator, e.participation_points, e.participants_count,
+                           e.tags, e.code, e.owner, e.project_id, r.score
+                    FROM user_recommendations r
+                    JOIN events e ON e.id = r.event_id
+                    WHERE r.user_id = ?
+                    ORDER BY r.rank
+                    LIMIT ?
+                """, (user_id, limit))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении рекомендаций: {e}")
+            raise DatabaseError(f"Ошибка при получении рекомендаций: {e}")
+
+    def get_users_recommended_event(self, event_ids: list) -> list:
+        """
+        Возвращает пользователей, в рекомендациях которых есть указанные мероприятия
+
+        Args:
+            event_ids: Список ID мероприятий
+
+        Returns:
+            Список ID пользователей
+        """
+        if not event_ids:
+            return []
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                placeholders = ",".join("?" for _ in event_ids)
+                cursor.execute(
+                    f"SELECT DISTINCT user_id FROM user_recommendations WHERE event_id IN ({placeholders})",
+                    list(event_ids)
+                )
+                return [row['user_id'] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при поиске рекомендаций мероприятия: {e}")
+            raise DatabaseError(f"Ошибка при поиске рекомендаций мероприятия: {e}")
+
+    def replace_event_neighbors(self, neighbors: dict):
+        """
+        Заменяет списки похожих мероприятий одной транзакцией
+
+        Args:
+            neighbors: Словарь {ID мероприятия: [(ID похожего мероприятия, сходство), ...]} по убыванию сходства
+        """
+        if not neighbors:
+            return
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "DELETE FROM event_neighbors WHERE event_id = ?",
+                    [(event_id,) for event_id in neighbors]
+                )
+                cursor.executemany("""
+                    INSERT INTO event_neighbors (event_id, rank, neighbor_id, score)
+                    VALUES (?, ?, ?, ?)
+                """, [
+                    (event_id, rank, neighbor_id, score)
+                    for event_id, items in neighbors.items()
+                    for rank, (neighbor_id, score) in enumerate(items)
+                ])
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при сохранении похожих мероприятий: {e}")
+            raise DatabaseError(f"Ошибка при сохранении похожих мероприятий: {e}")
+
+    def get_event_neighbors(self, event_id: int, limit: int = 10) -> list:
+        """
+        Получает похожие мероприятия вместе с их данными
+
+        Args:
+            event_id: ID мероприятия
+            limit: Максимальное количество мероприятий
+
+        Returns:
+            Список мероприятий по убыванию сходства
+        """
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT e.id, e.name, e.description, e.event_date, e.start_time,
+                           e.city, e.creator, e.participation_points, e.participants_count,
+                           e.tags, e.code, e.owner, e.project_id, n.score
+                    FROM event_neighbors n
+                    JOIN events e ON e.id = n.neighbor_id
+                    WHERE n.event_id = ?
+                    ORDER BY n.rank
+                    LIMIT ?
+                """, (event_id, limit))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении похожих мероприятий: {e}")
+            raise DatabaseError(f"Ошибка при получении похожих мероприятий: {e}")
+
+    def get_event_neighbor_lists(self) -> dict:
+        """
+        Возвращает сохраненный граф похожих мероприятий без данных самих мероприятий
+
+        Returns:
+            Словарь {ID мероприятия: [(ID похожего мероприятия, сходство), ...]}
+        """
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT event_id, neighbor_id, score FROM event_neighbors ORDER BY event_id, rank")
+                result = {}
+                for row in cursor.fetchall():
+                    result.setdefault(row['event_id'], []).append((row['neighbor_id'], row['score']))
+                return result
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка при получении графа похожих мероприятий: {e}")
+            raise DatabaseError(f"Ошибка при получении графа похожих мероприятий: {e}")
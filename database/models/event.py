@@ -3,6 +3,7 @@ import sqlite3
 from datetime import datetime
 from ..core import Database
 from ..exceptions import DatabaseError
+from ..signals import notify_event_change, notify_user_change
 
 logger = logging.getLogger(__name__)
 
@@ -71,7 +72,7 @@ class EventModel(Database):
                     tags, code, owner, project_id
                 ))
                 conn.commit()
-                return cursor.lastrowid
+                event_id = cursor.lastrowid
             except sqlite3.IntegrityError as e:
                 conn.rollback()
                 raise DatabaseError(f"Ошибка при добавлении мероприятия: {str(e)}")
@@ -79,6 +80,8 @@ class EventModel(Database):
                 conn.rollback()
                 logger.error(f"Неожиданная ошибка при добавлении мероприятия: {e}")
                 raise DatabaseError(f"Неожиданная ошибка при добавлении мероприятия: {str(e)}")
+        notify_event_change(event_id, "added")
+        return event_id
 
     def search_events_by_tag(self, tag):
         with self.connect() as conn:
@@ -169,7 +172,10 @@ class EventModel(Database):
                     (event_id,)
                 )
                 conn.commit()
-                return cursor.rowcount > 0
+                changed = cursor.rowcount > 0
+            if changed:
+                notify_event_change(event_id, "participants")
+            return changed
         except Exception as e:
             logger.error(f"Ошибка при увеличении счетчика участников: {e}")
             return False
@@ -184,7 +190,10 @@ class EventModel(Database):
                     (event_id,)
                 )
                 conn.commit()
-                return cursor.rowcount > 0
+                changed = cursor.rowcount > 0
+            if changed:
+                notify_event_change(event_id, "participants")
+            return changed
         except Exception as e:
             logger.error(f"Ошибка при уменьшении счетчика участников: {e}")
             return False
@@ -225,14 +234,18 @@ class EventModel(Database):
                 
                 # Затем удаляем само мероприятие
                 cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
+                deleted = cursor.rowcount
+                cursor.execute("DELETE FROM event_summaries WHERE event_id = ?", (event_id,))
+                cursor.execute("DELETE FROM event_neighbors WHERE event_id = ?", (event_id,))
                 conn.commit()
                 
-                if cursor.rowcount == 0:
+                if deleted == 0:
                     logger.warning(f"Мероприятие с ID {event_id} не найдено при попытке удаления")
                     return False
                     
                 logger.info(f"Мероприятие с ID {event_id} успешно удалено")
-                return True
+            notify_event_change(event_id, "deleted")
+            return True
 
         except sqlite3.Error as e:
             logger.error(f"Ошибка при удалении мероприятия: {e}")
@@ -255,6 +268,7 @@ class EventModel(Database):
                 (user_id, event_id)
             )
             conn.commit()
+        notify_user_change(user_id, "completed")
 
     def update_event_field(self, event_id, field, new_value):
         with self.connect() as conn:
@@ -262,3 +276,4 @@ class EventModel(Database):
             query = f"UPDATE events SET {field} = ? WHERE id = ?"
             cursor.execute(query, (new_value, event_id))
             conn.commit()
+        notify_event_change(event_id, "updated")
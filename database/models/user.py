@@ -2,6 +2,7 @@ import logging
 import sqlite3
 from ..core import Database
 from ..exceptions import DatabaseError
+from ..signals import notify_user_change
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,7 @@ class UserModel(Database):
                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ''', (id, first_name, telegram_tag, "", role, 0, "", "", ""))
                 conn.commit()
+            notify_user_change(id, "added")
         except sqlite3.Error as e:
             logger.error(f"Ошибка при сохранении пользователя: {e}")
             raise DatabaseError(f"Ошибка при сохранении пользователя: {e}")
@@ -53,12 +55,14 @@ class UserModel(Database):
             cursor = conn.cursor()
             cursor.execute('UPDATE users SET role = ? WHERE id = ?', (new_role, user_id))
             conn.commit()
+        notify_user_change(user_id, "updated")
 
     def delete_user(self, user_id):
         with self.connect() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
             conn.commit()
+        notify_user_change(user_id, "deleted")
 
     def find_user_by_id(self, user_id):
         with self.connect() as conn:
@@ -116,12 +120,14 @@ class UserModel(Database):
             cursor = conn.cursor()
             cursor.execute('UPDATE users SET city = ? WHERE id = ?', (new_city, user_id))
             conn.commit()
+        notify_user_change(user_id, "updated")
 
     def update_user_tags(self, user_id, tags):
         with self.connect() as conn:
             cursor = conn.cursor()
             cursor.execute('UPDATE users SET tags = ? WHERE id = ?', (tags, user_id))
             conn.commit()
+        notify_user_change(user_id, "updated")
 
     def update_user_score(self, user_id, score):
         with self.connect() as conn:
@@ -135,6 +141,7 @@ class UserModel(Database):
             cursor = conn.cursor()
             cursor.execute("UPDATE users SET registered_events = ? WHERE id = ?", (registered_events, user_id))
             conn.commit()
+        notify_user_change(user_id, "registrations")
 
     def unregister_user_from_event(self, user_id, event_id):
         with self.connect() as conn:
@@ -154,6 +161,7 @@ class UserModel(Database):
                     cursor.execute('UPDATE users SET registered_events = ? WHERE id = ?',
                                  (new_registered_events, user_id))
                     conn.commit()
+                    notify_user_change(user_id, "registrations")
 
     def get_all_users(self):
         """Возвращает список всех пользователей из таблицы users в виде списка словарей."""
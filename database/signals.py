@@ -0,0 +1,74 @@
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Слушатель получает ID объекта (None - изменилось неизвестно что) и действие.
+# Для мероприятий: "added", "updated", "deleted" или "participants".
+# Для пользователей: "added", "updated", "deleted", "registrations" или "completed".
+ChangeListener = Callable[[Optional[int], str], None]
+
+_event_listeners: List[ChangeListener] = []
+_user_listeners: List[ChangeListener] = []
+_lock = threading.Lock()
+
+
+def _subscribe(listeners: List[ChangeListener], listener: ChangeListener) -> None:
+    with _lock:
+        if listener not in listeners:
+            listeners.append(listener)
+
+
+def _notify(listeners: List[ChangeListener], kind: str, object_id: Optional[int], action: str) -> None:
+    with _lock:
+        snapshot = list(listeners)
+    for listener in snapshot:
+        try:
+            listener(object_id, action)
+        except Exception as e:
+            logger.error(f"Ошибка в обработчике изменения ({kind} {object_id}): {e}")
+
+
+def on_event_change(listener: ChangeListener) -> None:
+    """
+    Подписывает функцию на изменения мероприятий в базе данных.
+    Используется кэшами и индексами, которые нужно обновлять при изменении событий.
+
+    Args:
+        listener: Функция listener(event_id, action)
+    """
+    _subscribe(_event_listeners, listener)
+
+
+def notify_event_change(event_id: Optional[int], action: str) -> None:
+    """
+    Оповещает подписчиков об изменении мероприятия.
+    Ошибка в подписчике логируется и не влияет на операцию с базой данных.
+
+    Args:
+        event_id: ID мероприятия
+        action: Тип изменения
+    """
+    _notify(_event_listeners, "мероприятие", event_id, action)
+
+
+def on_user_change(listener: ChangeListener) -> None:
+    """
+    Подписывает функцию на изменения профилей пользователей
+
+    Args:
+        listener: Функция listener(user_id, action)
+    """
+    _subscribe(_user_listeners, listener)
+
+
+def notify_user_change(user_id: Optional[int], action: str) -> None:
+    """
+    Оповещает подписчиков об изменении профиля пользователя
+
+    Args:
+        user_id: ID пользователя
+        action: Тип изменения
+    """
+    _notify(_user_listeners, "пользователь", user_id, action)
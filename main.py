@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import signal
 import sys
@@ -6,6 +7,13 @@ from telegram.ext import Application, CommandHandler, MessageHandler, Conversati
 from config import TOKEN, ADMIN_ID
 from bot.handlers.common import start, cancel, check_password, handle_successful_auth
 from database.core import Database
+from services.ai.event_summarizer import EventSummarizer
+from services.ai.recommendations import RecommendationBuilder
+from services.ai.event_similarity import EventSimilarityGraph
+from services.ai.session_history import SessionHistory
+from services.ai.memory_store import MemoryStore
+from services.ai.telemetry import Telemetry
+import config
 
 from bot.states import (ADMIN_MENU, MAIN_MENU, MOD_EVENT_TAGS, AI_CHAT,
                         VOLUNTEER_DASHBOARD, GUEST_DASHBOARD, PROFILE_MENU,
@@ -35,14 +43,14 @@ from bot.handlers.admin import (admin_command, handle_admin_id, handle_events_cs
                                 handle_report_participants, handle_report_photos, handle_report_summary,
                                 handle_report_feedback, handle_event_edit_value, handle_event_edit_field,
                                 handle_event_edit_select, moderator_handle_event_project, process_projects_csv_document,
-                                handle_project_export_input)
+                                handle_project_export_input, rebuild_index)
 
 from bot.handlers.user import (handle_event_details, handle_main_menu, handle_ai_chat, handle_volunteer_home,
                                handle_registration_tag_selection, handle_profile_menu, handle_contact_update,
                                handle_profile_tag_selection, handle_events_callbacks,
                                handle_registration_city_selection, handle_profile_city_selection,
                                handle_code_redemption, handle_employee_number, handle_employee_number_update,
-                               handle_event_tag_selection, handle_leaderboard_region_select)
+                               handle_event_tag_selection, handle_leaderboard_region_select, get_rag_agent)
 
 def admin_required(func):
     def wrapper(update: Update, context: CallbackContext):
@@ -79,8 +87,20 @@ class VolunteerBot:
             self.db = Database()
             self.logger.info("Database initialized successfully")
             
+            # Однократный перевод memory.db в режим инкрементальной очистки выполняется до начала
+            # обработки сообщений, а не в периодическом обслуживании
+            self.memory_store = MemoryStore()
+            try:
+                self.memory_store.enable_incremental_vacuum()
+            except Exception as e:
+                self.logger.error(f"Не удалось перевести memory.db в режим инкрементальной очистки: {e}")
+
+            # Краткие описания мероприятий строятся в фоне и обновляются при их изменении
+            EventSummarizer().start()
+            
             self.application = Application.builder().token(self.token).build()
             self.setup_handlers()
+            self.setup_jobs()
         except Exception as e:
             self.logger.critical(f"Критическая ошибка при инициализации бота: {e}")
             sys.exit(1)
@@ -103,6 +123,19 @@ class VolunteerBot:
                 self.application.stop()
                 self.application.shutdown()
                 
+            # Сохраняем несохраненные сообщения AI-чата
+            if SessionHistory._instance is not None:
+                SessionHistory().close()
+            if Telemetry._instance is not None:
+                Telemetry().close()
+            # Изменения векторного индекса, еще не записанные на диск
+            from services.ai.shared_embeddings import SharedEmbeddings
+            if SharedEmbeddings._store is not None:
+                SharedEmbeddings._store.publish_pending()
+                
+            if hasattr(self, 'memory_store'):
+                self.memory_store.close()
+                
             # Закрываем соединение с базой данных
             if hasattr(self, 'db'):
                 self.db.close()
@@ -114,6 +147,79 @@ class VolunteerBot:
             self.logger.critical(f"Ошибка при завершении работы бота: {e}")
             sys.exit(1)
 
+    def setup_jobs(self):
+        """Регистрирует периодические фоновые задачи"""
+        job_queue = self.application.job_queue
+        # RAG-агент создается сразу после запуска, а не в обработчике первого сообщения ИИ-чата
+        job_queue.run_once(self.init_rag_agent, when=0, name="rag_agent")
+        job_queue.run_repeating(
+            self.refresh_recommendations, interval=getattr(config, "RECOMMENDATIONS_INTERVAL", 600),
+            first=10, name="recommendations"
+        )
+        job_queue.run_repeating(
+            self.refresh_similar_events, interval=getattr(config, "SIMILAR_EVENTS_INTERVAL", 300),
+            first=5, name="similar_events"
+        )
+        job_queue.run_repeating(
+            self.refresh_vector_index, interval=getattr(config, "VECTOR_INDEX_REBUILD_INTERVAL", 900),
+            first=60, name="vector_index"
+        )
+        job_queue.run_repeating(
+            self.maintain_memory_store, interval=getattr(config, "MEMORY_MAINTENANCE_INTERVAL", 3600),
+            first=300, name="memory_maintenance"
+        )
+
+    async def init_rag_agent(self, context: CallbackContext):
+        """Создает RAG-агент вне цикла обработки сообщений"""
+        try:
+            await asyncio.to_thread(get_rag_agent)
+            self.logger.info("RAG-агент инициализирован")
+        except Exception as e:
+            self.logger.error(f"Ошибка при инициализации RAG-агента: {e}")
+
+    async def refresh_recommendations(self, context: CallbackContext):
+        """Пересчитывает персональные рекомендации вне цикла обработки сообщений"""
+        try:
+            updated = await asyncio.to_thread(RecommendationBuilder().refresh)
+            if updated:
+                self.logger.info(f"Рекомендации обновлены для {updated} пользователей")
+        except Exception as e:
+            self.logger.error(f"Ошибка при пересчете рекомендаций: {e}")
+
+    async def refresh_similar_events(self, context: CallbackContext):
+        """Обновляет граф похожих мероприятий для измененных мероприятий"""
+        try:
+            updated = await asyncio.to_thread(EventSimilarityGraph().refresh)
+            if updated:
+                self.logger.info(f"Похожие мероприятия обновлены для {updated} мероприятий")
+        except Exception as e:
+            self.logger.error(f"Ошибка при обновлении похожих мероприятий: {e}")
+
+    async def refresh_vector_index(self, context: CallbackContext):
+        """Запускает фоновую перестройку векторного индекса, если мероприятия менялись"""
+        try:
+            from services.ai.shared_embeddings import SharedEmbeddings
+            store = await asyncio.to_thread(lambda: SharedEmbeddings().get_store())
+            if store.rebuild_if_stale():
+                self.logger.info("Запущена перестройка векторного индекса")
+        except Exception as e:
+            self.logger.error(f"Ошибка при перестройке векторного индекса: {e}")
+
+    async def maintain_memory_store(self, context: CallbackContext):
+        """Очищает базу памяти агента от устаревших записей вне цикла обработки сообщений"""
+        try:
+            if not hasattr(self, 'memory_store'):
+                self.memory_store = MemoryStore()
+            report = await asyncio.to_thread(self.memory_store.maintenance)
+            deleted = ", ".join(f"{table}: {count}" for table, count in report["deleted"].items() if count)
+            tables = ", ".join(f"{table}: {count}" for table, count in report["tables"].items())
+            self.logger.info(
+                f"Обслуживание memory.db: удалено {deleted or 'ничего'}; строк в таблицах {tables}; "
+                f"размер {report['size_mb']:.1f} МБ, свободно {report['free_mb']:.1f} МБ"
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка при обслуживании базы памяти: {e}")
+
     def setup_handlers(self):
         conv_handler = ConversationHandler(
             entry_points=[CommandHandler("start", start)],
@@ -272,6 +378,7 @@ class VolunteerBot:
         
         self.application.add_handler(CommandHandler("admin", admin_required(admin_command)))
         self.application.add_handler(CommandHandler("set_admin", admin_required(set_admin)))
+        self.application.add_handler(CommandHandler("rebuild_index", admin_required(rebuild_index)))
         self.application.add_handler(CommandHandler("set_moderator", admin_required(set_moderator)))
         self.application.add_handler(CommandHandler("delete_user", admin_required(delete_user)))
         self.application.add_handler(CommandHandler("find_user_id", admin_required(find_user_id)))
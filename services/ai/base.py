@@ -1,12 +1,46 @@
 # services/ai/base.py
 from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+import bisect
+import copy
 import logging
+import threading
 from typing import Dict, List, Any, Optional
 import json
 import time
 
+from .telemetry import ActionRecord, Telemetry
+
 logger = logging.getLogger(__name__)
 
+# Размер кольцевых буферов краткосрочной памяти и истории действий агента
+SHORT_TERM_MEMORY_SIZE = 100
+ACTION_HISTORY_SIZE = 100
+# Границы корзин гистограммы задержек инструментов в секундах
+TOOL_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+DEFAULT_TOOL_CACHE_SIZE = 128
+
+
+def _freeze(value: Any) -> Any:
+    """Приводит аргументы к хэшируемому виду для ключа кэша"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+def _cache_key(args: tuple, kwargs: Dict[str, Any]) -> Optional[tuple]:
+    """Ключ кэша вызова инструмента; None, если аргументы нельзя хэшировать"""
+    try:
+        key = (_freeze(args), _freeze(kwargs))
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
 
 class AIAgent(ABC):
     """
@@ -29,12 +63,16 @@ class AIAgent(ABC):
         self.name = name
         self.autonomy_level = autonomy_level
         self.memory = {
-            "short_term": [],  # Краткосрочная память (текущий диалог)
+            "short_term": deque(maxlen=SHORT_TERM_MEMORY_SIZE),  # Краткосрочная память (текущий диалог)
             "long_term": {}  # Долгосрочная память (сохраняется между сессиями)
         }
-        self.action_history = []  # История действий для рефлексии
+        # История действий для рефлексии: последние вызовы инструментов в виде ActionRecord
+        self.action_history = deque(maxlen=ACTION_HISTORY_SIZE)
+        self.telemetry = Telemetry()
         self.current_reasoning = []  # Текущая цепочка рассуждений
         self.available_tools = {}  # Доступные инструменты
+        self._tool_stats: Dict[str, Dict[str, Any]] = {}  # Статистика вызовов инструментов
+        self._tools_lock = threading.Lock()
 
     @abstractmethod
     def process_query(self, query: str, **kwargs) -> str:
@@ -72,10 +110,8 @@ class AIAgent(ABC):
             memory_type: Тип памяти ("short_term" или "long_term")
         """
         if memory_type == "short_term":
+            # Буфер ограничен SHORT_TERM_MEMORY_SIZE, старые записи вытесняются
             self.memory["short_term"].append({key: value, "timestamp": time.time()})
-            # Ограничиваем размер краткосрочной памяти
-            if len(self.memory["short_term"]) > 100:
-                self.memory["short_term"] = self.memory["short_term"][-100:]
         else:
             self.memory["long_term"][key] = {"value": value, "timestamp": time.time()}
 
@@ -94,7 +130,7 @@ class AIAgent(ABC):
         """
         if memory_type == "short_term":
             if key is None:
-                return self.memory["short_term"]
+                return list(self.memory["short_term"])
 
             # Поиск в краткосрочной памяти
             for item in reversed(self.memory["short_term"]):
@@ -142,7 +178,8 @@ class AIAgent(ABC):
         else:
             return error_message
 
-    def register_tool(self, tool_name: str, tool_function: callable, description: str) -> None:
+    def register_tool(self, tool_name: str, tool_function: callable, description: str,
+                      cache_ttl: float = 0, cache_size: int = DEFAULT_TOOL_CACHE_SIZE) -> None:
         """
         Регистрирует новый инструмент для использования агентом
 
@@ -150,16 +187,31 @@ class AIAgent(ABC):
             tool_name: Название инструмента
             tool_function: Функция, реализующая инструмент
             description: Описание инструмента
+            cache_ttl: Сколько секунд результат вызова с теми же аргументами берется из кэша (0 - без кэша)
+            cache_size: Сколько результатов хранится в кэше инструмента
         """
         self.available_tools[tool_name] = {
             "function": tool_function,
-            "description": description
+            "description": description,
+            "cache_ttl": cache_ttl,
+            "cache_size": cache_size,
+            "cache": OrderedDict()
         }
+        self._tool_stats[tool_name] = self._empty_tool_stats()
         logger.info(f"Агент {self.name} зарегистрировал инструмент: {tool_name}")
 
+    @staticmethod
+    def _empty_tool_stats() -> Dict[str, Any]:
+        return {
+            "calls": 0, "errors": 0, "cache_hits": 0, "total_latency": 0.0, "max_latency": 0.0,
+            "histogram": [0] * (len(TOOL_LATENCY_BUCKETS) + 1)
+        }
+
     def use_tool(self, tool_name: str, *args, **kwargs) -> Any:
         """
-        Использует зарегистрированный инструмент
+        Использует зарегистрированный инструмент.
+        Для инструментов с cache_ttl повторный вызов с теми же аргументами возвращает копию
+        сохраненного результата.
 
         Args:
             tool_name: Название инструмента
@@ -174,15 +226,87 @@ class AIAgent(ABC):
         if tool_name not in self.available_tools:
             raise ValueError(f"Инструмент {tool_name} не найден")
 
-        action = f"Использование инструмента {tool_name} с аргументами: {args}, {kwargs}"
-        self.action_history.append({
-            "action": action,
-            "timestamp": time.time()
-        })
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Агент {self.name} использует инструмент {tool_name} с аргументами: {args}, {kwargs}")
+
+        tool = self.available_tools[tool_name]
+        key = _cache_key(args, kwargs) if tool["cache_ttl"] > 0 else None
+        started = time.perf_counter()
+        success = False
+        cache_hit = False
+        try:
+            if key is not None:
+                with self._tools_lock:
+                    cached = tool["cache"].get(key)
+                    if cached is not None and cached[0] > time.monotonic():
+                        tool["cache"].move_to_end(key)
+                        cache_hit = True
+                if cache_hit:
+                    success = True
+                    return copy.deepcopy(cached[1])
+
+            result = tool["function"](*args, **kwargs)
+            success = True
+            if key is not None:
+                with self._tools_lock:
+                    tool["cache"][key] = (time.monotonic() + tool["cache_ttl"], result)
+                    tool["cache"].move_to_end(key)
+                    while len(tool["cache"]) > tool["cache_size"]:
+                        tool["cache"].popitem(last=False)
+                return copy.deepcopy(result)
+            return result
+        finally:
+            duration = time.perf_counter() - started
+            self._record_tool_call(tool_name, duration, success, cache_hit)
+            self.action_history.append(ActionRecord(self.name, tool_name, duration, success, time.time()))
+            self.telemetry.record_action(self.name, tool_name, duration, success)
+
+    def _record_tool_call(self, tool_name: str, duration: float, success: bool, cache_hit: bool) -> None:
+        with self._tools_lock:
+            stats = self._tool_stats.setdefault(tool_name, self._empty_tool_stats())
+            stats["calls"] += 1
+            stats["errors"] += not success
+            stats["cache_hits"] += cache_hit
+            stats["total_latency"] += duration
+            stats["max_latency"] = max(stats["max_latency"], duration)
+            stats["histogram"][bisect.bisect_left(TOOL_LATENCY_BUCKETS, duration)] += 1
+
+    def clear_tool_cache(self, tool_name: str = None) -> None:
+        """
+        Очищает кэш результатов инструментов
+
+        Args:
+            tool_name: Название инструмента (если None, очищаются кэши всех инструментов)
+        """
+        with self._tools_lock:
+            for name, tool in self.available_tools.items():
+                if tool_name is None or name == tool_name:
+                    tool["cache"].clear()
 
-        logger.debug(f"Агент {self.name} {action}")
-        
-        return self.available_tools[tool_name]["function"](*args, **kwargs)
+    def get_tool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику вызовов инструментов
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {tool: {calls, errors, error_rate, cache_hits, cache_hit_rate,
+            avg_latency, max_latency, histogram}}, где histogram - {верхняя граница в секундах: число вызовов}
+        """
+        labels = [f"<={bound}s" for bound in TOOL_LATENCY_BUCKETS] + [f">{TOOL_LATENCY_BUCKETS[-1]}s"]
+        with self._tools_lock:
+            result = {}
+            for tool_name, stats in self._tool_stats.items():
+                calls = stats["calls"]
+                result[tool_name] = {
+                    "calls": calls,
+                    "errors": stats["errors"],
+                    "error_rate": stats["errors"] / calls if calls else 0.0,
+                    "cache_hits": stats["cache_hits"],
+                    "cache_hit_rate": stats["cache_hits"] / calls if calls else 0.0,
+                    "avg_latency": stats["total_latency"] / calls if calls else 0.0,
+                    "max_latency": stats["max_latency"],
+                    "histogram": dict(zip(labels, stats["histogram"])),
+                }
+            return result
 
     def can_perform_autonomously(self, action: str, criticality: int = 1) -> bool:
         """
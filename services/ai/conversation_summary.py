@@ -0,0 +1,205 @@
+# services/ai/conversation_summary.py
+import logging
+import queue
+import threading
+from typing import Dict, List, Optional, Set
+
+import config
+from .llm_router import LLMRouter
+from .memory_store import MemoryStore
+from .session_history import SessionHistory
+
+logger = logging.getLogger(__name__)
+
+# После скольких токенов несжатой истории ранние сообщения сворачиваются в краткое содержание
+DEFAULT_CONVERSATION_SUMMARY_TOKENS = 1000
+# Сколько последних сообщений остается несжатыми при сворачивании и всегда передается в промпт.
+# Кроме них в промпт дословно попадают все сообщения, еще не вошедшие в краткое содержание
+DEFAULT_CONVERSATION_TAIL_MESSAGES = 4
+# Грубая оценка для русского текста в токенизаторе GigaChat
+CHARS_PER_TOKEN = 4
+MAX_SUMMARY_LENGTH = 800
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Оценивает число токенов в сообщениях"""
+    return sum(len(message.get("content", "")) for message in messages) // CHARS_PER_TOKEN
+
+
+def format_messages(messages: List[Dict]) -> str:
+    """Форматирует сообщения для промпта"""
+    return "".join(
+        f"{'Пользователь' if message['role'] == 'user' else 'Ассистент'}: {message['content']}\n"
+        for message in messages
+    )
+
+
+class ConversationSummarizer:
+    """
+    Синглтон, который сворачивает раннюю часть разговора в краткое содержание.
+    Когда несжатая история в memory.db превышает порог токенов, фоновый поток
+    объединяет прежнее содержание с ранними сообщениями; последние сообщения
+    остаются дословными. Промпты получают содержание и все сообщения после него
+    (не больше порога токенов), поэтому их размер не растет с длиной разговора.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ConversationSummarizer, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.memory_store = MemoryStore()
+        self.llm = LLMRouter()
+        self.token_threshold = getattr(config, "CONVERSATION_SUMMARY_TOKENS", DEFAULT_CONVERSATION_SUMMARY_TOKENS)
+        self.tail_messages = getattr(config, "CONVERSATION_TAIL_MESSAGES", DEFAULT_CONVERSATION_TAIL_MESSAGES)
+        self._queue = queue.Queue()
+        self._queued: Set[int] = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._initialized = True
+
+    def _start(self) -> None:
+        # Вызывается под self._lock
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._worker, name="ConversationSummarizer", daemon=True)
+        self._thread.start()
+
+    def schedule(self, user_id: int, history: List[Dict]) -> None:
+        """
+        Ставит пользователя в очередь на сжатие, если окно истории превысило порог
+
+        Args:
+            user_id: ID пользователя
+            history: Текущее окно истории разговора
+        """
+        older = history[:-self.tail_messages] if self.tail_messages else history
+        if estimate_tokens(older) < self.token_threshold:
+            return
+        with self._lock:
+            if user_id in self._queued:
+                return
+            self._queued.add(user_id)
+            self._start()
+        self._queue.put(user_id)
+
+    def _worker(self) -> None:
+        while True:
+            user_id = self._queue.get()
+            with self._lock:
+                self._queued.discard(user_id)
+            try:
+                # Последние сообщения могут еще ждать фоновой записи в memory.db
+                SessionHistory().flush()
+                self.summarize(user_id)
+            except Exception as e:
+                logger.error(f"Error summarizing conversation of user {user_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def summarize(self, user_id: int) -> bool:
+        """
+        Сворачивает сообщения, не вошедшие в краткое содержание, кроме последних
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            bool: True, если краткое содержание обновлено
+        """
+        current = self.memory_store.get_conversation_summary(user_id)
+        after = current["last_message_id"] if current else 0
+        messages = self.memory_store.get_conversation_messages(user_id, after)
+        if estimate_tokens(messages) < self.token_threshold:
+            return False
+
+        older = messages[:-self.tail_messages] if self.tail_messages else messages
+        if not older:
+            return False
+
+        previous = current["summary"] if current else "нет"
+        prompt = f"""
+        Обнови краткое содержание диалога пользователя с чат-ботом волонтерского центра.
+        Сохрани то, что важно для продолжения разговора: интересы, регион, упомянутые
+        мероприятия и даты, договоренности и открытые вопросы. Не более 5 предложений.
+
+        Прежнее краткое содержание:
+        {previous}
+
+        Новые сообщения:
+        {format_messages(older)}
+
+        Верни только обновленное краткое содержание.
+        """
+
+        summary = self.llm.generate(prompt, route="summary").strip()
+        if not summary:
+            return False
+        self.memory_store.save_conversation_summary(user_id, summary[:MAX_SUMMARY_LENGTH], older[-1]["id"])
+        logger.info(f"Conversation summary for user {user_id} updated with {len(older)} messages")
+        return True
+
+    def build_context(self, user_id: Optional[int], history: List[Dict], exclude_last: bool = False,
+                      recalled: Optional[List[Dict]] = None) -> str:
+        """
+        Формирует контекст диалога для промпта: краткое содержание, относящиеся
+        к запросу прошлые ходы и последние сообщения
+
+        Args:
+            user_id: ID пользователя
+            history: Окно истории разговора
+            exclude_last: Не включать последнее сообщение (текущий запрос)
+            recalled: Прошлые ходы [{query, response}, ...], найденные TurnMemory
+
+        Returns:
+            str: Контекст диалога
+        """
+        current = self.memory_store.get_conversation_summary(user_id) if user_id else None
+        tail = self._unsummarized_tail(user_id, history, current)
+        if exclude_last:
+            tail = tail[:-1]
+        context = ""
+        if current and current["summary"]:
+            context = f"Краткое содержание предыдущего разговора: {current['summary']}\n"
+        if recalled:
+            context += "Относящиеся к запросу фрагменты прошлых разговоров:\n"
+            for turn in recalled:
+                context += format_messages([
+                    {"role": "user", "content": turn["query"]},
+                    {"role": "assistant", "content": turn["response"]},
+                ])
+            context += "Последние сообщения:\n"
+        context += format_messages(tail)
+        return context
+
+    def _unsummarized_tail(self, user_id: Optional[int], history: List[Dict],
+                           current: Optional[Dict]) -> List[Dict]:
+        """
+        Возвращает сообщения окна истории, не вошедшие в краткое содержание.
+        Если они превышают порог токенов (содержание еще не обновлено), ранние
+        отбрасываются, но последние tail_messages остаются всегда
+
+        Args:
+            user_id: ID пользователя
+            history: Окно истории разговора, последнее сообщение - текущий запрос
+            current: Краткое содержание {summary, last_message_id} или None
+
+        Returns:
+            List[Dict]: Сообщения в хронологическом порядке
+        """
+        count = len(history)
+        if current:
+            # Сообщения после содержания: записанные в базу и ожидающие записи. Текущий запрос
+            # может еще не попасть в сессию, поэтому он добавляется сверху: в худшем случае
+            # повторится одно сообщение из содержания, но ни одно не потеряется
+            count = min(count, 1 + self.memory_store.count_conversation_messages(user_id, current["last_message_id"])
+                        + SessionHistory().pending_count(user_id))
+        tail = history[-count:] if count else []
+        while len(tail) > self.tail_messages and estimate_tokens(tail) > self.token_threshold:
+            tail = tail[1:]
+        return tail
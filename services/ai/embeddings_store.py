@@ -1,109 +1,558 @@
+import hashlib
 import logging
-from typing import List, Dict, Any
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
 import json
-from langchain_gigachat import GigaChatEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
 from database.core import Database
+from database.signals import on_event_change
+from .gigachat_embeddings import GigaChatEmbeddings
+from .vector_index import VectorIndex, create_index, open_published_index, publish_index, read_manifest
 import config
 
 logger = logging.getLogger(__name__)
 
+# Сколько дней прошедшее мероприятие остается в горячем уровне индекса
+DEFAULT_HOT_TIER_DAYS = 7
+DEFAULT_VECTOR_INDEX_DIR = "./database/vector_index"
+DEFAULT_VECTOR_INDEX_BACKEND = "faiss"
+# Через сколько секунд после изменения мероприятия уровень публикуется на диск
+DEFAULT_VECTOR_INDEX_PUBLISH_DELAY = 5
+# Как часто поиск проверяет, не опубликовал ли другой процесс новое поколение, в секундах
+DEFAULT_VECTOR_INDEX_RELOAD_INTERVAL = 5
+# Через сколько секунд после изменения мероприятия в базе оно переиндексируется
+DEFAULT_VECTOR_INDEX_SYNC_DELAY = 2
+
+# Названия опубликованных индексов уровней
+HOT_TIER = "events_hot"
+ARCHIVE_TIER = "events_archive"
+
+
+def _event_date(value: Any) -> Optional[date]:
+    try:
+        return datetime.strptime(str(value).strip(), "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+def _relevance(cosine: float) -> float:
+    # Та же шкала, что у FAISS.similarity_search_with_relevance_scores в langchain для
+    # нормированных векторов: 1 - L2^2 / sqrt(2), где L2^2 = 2 - 2cos. Пороги поиска подобраны под нее.
+    return 1.0 - (2.0 - 2.0 * cosine) / 2 ** 0.5
+
 
 class EmbeddingsStore:
     """
     Класс для работы с embeddings и векторным хранилищем.
-    Использует GigaChat для генерации embeddings и FAISS для хранения.
+    Использует API эмбеддингов GigaChat и VectorIndex (FAISS или NumPy) для хранения.
+    Индекс разделен на горячий уровень (предстоящие и недавние мероприятия),
+    по которому идет обычный поиск, и архив прошедших мероприятий, который
+    подключается только для вопросов об истории. Мероприятия переносятся
+    в архив по мере прохождения дат вместе с уже вычисленными векторами.
+    Уровни публикуются в VECTOR_INDEX_DIR и открываются с отображением в память,
+    поэтому несколько процессов бота делят одну копию индекса. Синхронизация
+    с базой данных выполняется фоновой перестройкой с атомарной подменой индекса.
     """
 
     def __init__(self):
         self.db = Database()
-        self.embeddings = GigaChatEmbeddings(
-            credentials=config.AUTHORIZATION_KEY,
-            model="Embeddings",
-            verify_ssl_certs=False
-        )
-        self.vector_store = None
+        self.embeddings = GigaChatEmbeddings()
+        self.hot_tier_days = getattr(config, "VECTOR_HOT_TIER_DAYS", DEFAULT_HOT_TIER_DAYS)
+        self.index_dir = getattr(config, "VECTOR_INDEX_DIR", DEFAULT_VECTOR_INDEX_DIR)
+        self.backend = getattr(config, "VECTOR_INDEX_BACKEND", DEFAULT_VECTOR_INDEX_BACKEND)
+        self.vector_store: Optional[VectorIndex] = None
+        self.archive_store: Optional[VectorIndex] = None
+        self._tiers_lock = threading.RLock()
+        self._rotated_on = None
+        self._manifest_mtimes: Dict[str, int] = {}
+        self.publish_delay = getattr(config, "VECTOR_INDEX_PUBLISH_DELAY", DEFAULT_VECTOR_INDEX_PUBLISH_DELAY)
+        self.reload_interval = getattr(config, "VECTOR_INDEX_RELOAD_INTERVAL", DEFAULT_VECTOR_INDEX_RELOAD_INTERVAL)
+        self._reload_checked_at = 0.0
+        self._unpublished = set()
+        self._publish_timer: Optional[threading.Timer] = None
+        self._publish_lock = threading.Lock()
+        self.sync_delay = getattr(config, "VECTOR_INDEX_SYNC_DELAY", DEFAULT_VECTOR_INDEX_SYNC_DELAY)
+        self._pending_sync = set()
+        self._sync_timer: Optional[threading.Timer] = None
+        self._sync_lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self._touched = set()
+        self._stale = False
+        self._rebuild_stats = {
+            "runs": 0, "failures": 0, "running": False, "last_status": None, "last_error": None,
+            "last_started": None, "last_duration": None, "total_duration": 0.0, "last_embedded": 0, "events": 0
+        }
+        on_event_change(self._on_event_change)
         self._initialize_store()
 
-    def _initialize_store(self):
+    def _build_record(self, event_id: int, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Создает запись индекса для мероприятия
+        
+        Args:
+            event_id: ID мероприятия
+            event_data: Данные мероприятия
+            
+        Returns:
+            Метаданные мероприятия с текстом для embeddings и его хэшем
         """
-        Инициализация векторного хранилища
+        text = f"""
+        Название: {event_data['name']}
+        Описание: {event_data['description']}
+        Дата: {event_data['event_date']}
+        Время: {event_data['start_time']}
+        Город: {event_data['city']}
+        Теги: {event_data['tags']}
         """
+        return {
+            "id": event_id,
+            "name": event_data["name"],
+            "date": event_data["event_date"],
+            "time": event_data["start_time"],
+            "city": event_data["city"],
+            "tags": event_data["tags"],
+            "text": text,
+            "text_hash": hashlib.sha1(text.encode("utf-8")).hexdigest()
+        }
+
+    def _tier_cutoff(self) -> date:
+        return date.today() - timedelta(days=self.hot_tier_days)
+
+    def _is_archived(self, event_date: Any) -> bool:
+        parsed = _event_date(event_date)
+        return parsed is not None and parsed < self._tier_cutoff()
+
+    def _get_tier(self, name: str) -> Optional[VectorIndex]:
+        return self.vector_store if name == HOT_TIER else self.archive_store
+
+    def _set_tier(self, name: str, index: Optional[VectorIndex]):
+        if name == HOT_TIER:
+            self.vector_store = index
+        else:
+            self.archive_store = index
+
+    def _open_tier(self, name: str) -> Optional[VectorIndex]:
         try:
-            # Получаем все мероприятия из базы данных
-            events = self.db.get_all_events()
-            
-            if not events:
-                logger.warning("No events found in database")
-                return
-                
-            # Подготавливаем тексты для embeddings
-            texts = []
-            metadatas = []
+            path = os.path.join(self.index_dir, f"{name}.json")
+            mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            index = open_published_index(self.index_dir, name)
+            if mtime is not None:
+                self._manifest_mtimes[name] = mtime
+            return index
+        except Exception as e:
+            logger.error(f"Error opening published vector index {name}: {e}")
+            return None
+
+    def _schedule_publish(self, names: List[str]):
+        """
+        Отмечает уровни для публикации. Запись на диск выполняется позже и вне
+        _tiers_lock, поэтому поиск не ждет сохранения индекса, а серия изменений
+        публикуется одним поколением. Вызывается под _tiers_lock.
+        """
+        if not names:
+            return
+        self._unpublished.update(names)
+        if self._publish_timer is None:
+            self._publish_timer = threading.Timer(self.publish_delay, self.publish_pending)
+            self._publish_timer.daemon = True
+            self._publish_timer.start()
+
+    def publish_pending(self):
+        """Публикует отмеченные уровни для других процессов"""
+        with self._publish_lock:
+            with self._tiers_lock:
+                if self._publish_timer is not None:
+                    self._publish_timer.cancel()
+                    self._publish_timer = None
+                names, self._unpublished = sorted(self._unpublished), set()
+                # Копия снимается под блокировкой, сохранение идет уже без нее
+                snapshots = {}
+                for name in names:
+                    index = self._get_tier(name)
+                    if index is not None:
+                        snapshots[name] = (index, index.copy())
+
+            for name, (index, snapshot) in snapshots.items():
+                try:
+                    generation = publish_index(snapshot, self.index_dir, name)
+                    mtime = os.stat(os.path.join(self.index_dir, f"{name}.json")).st_mtime_ns
+                except Exception as e:
+                    logger.error(f"Error publishing vector index {name}: {e}")
+                    continue
+                with self._tiers_lock:
+                    index.generation = generation
+                    self._manifest_mtimes[name] = mtime
+
+    def _reload_published(self):
+        """Переоткрывает уровни, если другой процесс опубликовал новое поколение"""
+        now = time.monotonic()
+        # Во время своей публикации манифест меняется, но это не чужое поколение
+        if now - self._reload_checked_at < self.reload_interval or self._publish_lock.locked():
+            return
+        self._reload_checked_at = now
+        for name in (HOT_TIER, ARCHIVE_TIER):
+            # Свои неопубликованные изменения не заменяются чужим поколением
+            if name in self._unpublished:
+                continue
+            try:
+                mtime = os.stat(os.path.join(self.index_dir, f"{name}.json")).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._manifest_mtimes.get(name):
+                continue
+            manifest = read_manifest(self.index_dir, name)
+            current = self._get_tier(name)
+            if manifest and current is not None and manifest["generation"] == current.generation:
+                self._manifest_mtimes[name] = mtime
+                continue
+            index = self._open_tier(name)
+            if index is not None:
+                with self._tiers_lock:
+                    self._set_tier(name, index)
+                logger.info(f"Reloaded vector index {name} generation {index.generation}")
+
+    def _initialize_store(self):
+        """
+        Инициализация векторного хранилища: сразу открывает опубликованные уровни,
+        чтобы поиск работал с момента запуска, а синхронизацию с базой данных
+        выполняет фоновой перестройкой
+        """
+        with self._tiers_lock:
+            for name in (HOT_TIER, ARCHIVE_TIER):
+                self._set_tier(name, self._open_tier(name))
+        self.rebuild()
+
+    def rebuild(self, wait: bool = False) -> bool:
+        """
+        Перестраивает индекс по базе данных в новых объектах и атомарно подменяет им текущий.
+        Поиск во время перестройки идет по старому индексу; при ошибке старый индекс остается.
+        
+        Args:
+            wait: Дождаться окончания перестройки
             
-            for event in events:
-                # Создаем текст для embeddings
-                text = f"""
-                Название: {event['name']}
-                Описание: {event['description']}
-                Дата: {event['event_date']}
-                Время: {event['start_time']}
-                Город: {event['city']}
-                Теги: {event['tags']}
-                """
-                
-                # Создаем метаданные
-                metadata = {
-                    "id": event['id'],
-                    "name": event['name'],
-                    "date": event['event_date'],
-                    "time": event['start_time'],
-                    "city": event['city'],
-                    "tags": event['tags']
-                }
-                
-                texts.append(text)
-                metadatas.append(metadata)
+        Returns:
+            True, если перестройка запущена, False - если она уже выполняется
+        """
+        if not self._rebuild_lock.acquire(blocking=False):
+            logger.info("Vector index rebuild is already running")
+            return False
+        with self._tiers_lock:
+            self._rebuilding = True
+            self._touched = set()
+            self._stale = False
+            self._rebuild_stats["running"] = True
+        if wait:
+            self._run_rebuild()
+        else:
+            threading.Thread(target=self._run_rebuild, name="VectorIndexRebuild", daemon=True).start()
+        return True
+
+    def rebuild_if_stale(self) -> bool:
+        """
+        Запускает перестройку, если после предыдущей менялись мероприятия
+        
+        Returns:
+            True, если перестройка запущена
+        """
+        return self._stale and self.rebuild()
+
+    def _run_rebuild(self):
+        started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            tiers, embedded, total = self._build_tiers()
+            self._validate_tiers(tiers, total)
+            with self._tiers_lock:
+                self._apply_touched(tiers)
+                changed = [name for name in (HOT_TIER, ARCHIVE_TIER) if tiers[name] is not self._get_tier(name)]
+                for name in changed:
+                    self._set_tier(name, tiers[name])
+                self._rotated_on = date.today()
+                self._schedule_publish(changed)
+            self.publish_pending()
             
-            # Создаем документы
-            documents = [
-                Document(page_content=text, metadata=metadata)
-                for text, metadata in zip(texts, metadatas)
+            duration = time.perf_counter() - started
+            self._record_rebuild(started_at, duration, "ok", None, embedded, total)
+            logger.info(
+                f"Vector index rebuilt in {duration:.2f}s: {total} events, {embedded} embedded, "
+                f"replaced tiers: {', '.join(changed) or 'none'}"
+            )
+        except Exception as e:
+            duration = time.perf_counter() - started
+            self._record_rebuild(started_at, duration, "failed", str(e), 0, 0)
+            logger.error(f"Vector index rebuild failed after {duration:.2f}s, keeping the current index: {e}")
+        finally:
+            with self._tiers_lock:
+                self._rebuilding = False
+                self._touched = set()
+                self._rebuild_stats["running"] = False
+            self._rebuild_lock.release()
+
+    def _build_tiers(self):
+        """
+        Строит уровни индекса по базе данных, не изменяя текущие.
+        Векторы мероприятий с неизменным текстом берутся из текущего индекса.
+        
+        Returns:
+            Кортеж ({уровень: индекс}, число векторизованных мероприятий, число мероприятий)
+        """
+        with self._tiers_lock:
+            current = {name: self._get_tier(name) for name in (HOT_TIER, ARCHIVE_TIER)}
+            vectors, hashes = {}, {}
+            for index in current.values():
+                if index is None:
+                    continue
+                stored = index.get_records(index.ids())
+                for event_id, vector in index.get_vectors().items():
+                    vectors[event_id] = vector
+                    hashes[event_id] = stored[event_id]["text_hash"]
+        
+        # Получаем все мероприятия из базы данных
+        events = self.db.get_all_events()
+        if not events:
+            logger.warning("No events found in database")
+        records = {event['id']: self._build_record(event['id'], event) for event in events}
+        
+        # Векторизуем одним пакетом только новые и измененные мероприятия
+        missing = [event_id for event_id, record in records.items() if hashes.get(event_id) != record["text_hash"]]
+        if missing:
+            embedded = self.embeddings.embed_documents([records[event_id]["text"] for event_id in missing])
+            vectors.update(zip(missing, embedded))
+        
+        tiers = {}
+        for name in (HOT_TIER, ARCHIVE_TIER):
+            ids = [
+                event_id for event_id, record in records.items()
+                if (ARCHIVE_TIER if self._is_archived(record["date"]) else HOT_TIER) == name
             ]
+            index = current[name]
+            # Уровень без изменений не перестраивается и не публикуется заново
+            if (index is not None and index.backend == self.backend and set(index.ids()) == set(ids)
+                    and not set(ids) & set(missing)):
+                tiers[name] = index
+            elif ids:
+                tiers[name] = create_index(self.backend, len(vectors[ids[0]]))
+                tiers[name].add(ids, [vectors[event_id] for event_id in ids], [records[event_id] for event_id in ids])
+            else:
+                tiers[name] = create_index(self.backend, index.dimension) if index is not None else None
+        return tiers, len(missing), len(records)
+
+    def _validate_tiers(self, tiers: Dict[str, Optional[VectorIndex]], expected: int):
+        """Проверяет новый индекс перед подменой"""
+        built = [index for index in tiers.values() if index is not None]
+        total = sum(len(index) for index in built)
+        if total != expected:
+            raise ValueError(f"index has {total} events, database has {expected}")
+        if len({index.dimension for index in built if len(index)}) > 1:
+            raise ValueError("tiers have different vector dimensions")
+        for index in built:
+            if not len(index):
+                continue
+            # Вектор мероприятия должен находиться поиском как ближайший к самому себе
+            event_id = index.ids()[0]
+            vector = index.get_vectors()[event_id]
+            found = index.search(vector, 1)
+            if not found or found[0][1] < 0.99:
+                raise ValueError(f"self-search check failed for event {event_id}")
+
+    def _apply_touched(self, tiers: Dict[str, Optional[VectorIndex]]):
+        """Переносит в новый индекс изменения мероприятий, сделанные во время перестройки"""
+        for event_id in self._touched:
+            for name, index in tiers.items():
+                if index is not None and index is not self._get_tier(name) and event_id in index:
+                    index.remove([event_id])
+            for name in (HOT_TIER, ARCHIVE_TIER):
+                current = self._get_tier(name)
+                if current is None or event_id not in current or tiers[name] is current:
+                    continue
+                if tiers[name] is None:
+                    tiers[name] = create_index(self.backend, current.dimension)
+                record = current.get_records([event_id])[event_id]
+                tiers[name].add([event_id], [current.get_vectors()[event_id]], [record])
+
+    def _touch(self, ids: List[int]):
+        # Вызывается под _tiers_lock при изменении текущего индекса
+        if self._rebuilding:
+            self._touched.update(ids)
+
+    def _on_event_change(self, event_id: Optional[int], action: str):
+        if action == "participants":
+            return
+        if event_id is None:
+            self._stale = True
+            return
+        # Измененные мероприятия переиндексируются вскоре после изменения одним пакетом,
+        # не дожидаясь периодической перестройки
+        with self._sync_lock:
+            self._pending_sync.add(event_id)
+            if self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.sync_delay, self.sync_pending)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def sync_pending(self) -> int:
+        """
+        Переиндексирует мероприятия, измененные в базе после последней синхронизации.
+        Векторизуются только мероприятия с измененным текстом; удаленные убираются из индекса.
+        При ошибке индекс помечается устаревшим и исправляется периодической перестройкой.
+        
+        Returns:
+            Количество мероприятий, изменившихся в индексе
+        """
+        with self._sync_lock:
+            event_ids, self._pending_sync = sorted(self._pending_sync), set()
+            self._sync_timer = None
+        if not event_ids:
+            return 0
+        try:
+            events = {event["id"]: event for event in self.db.get_events_by_ids(event_ids)}
+            records = {event_id: self._build_record(event_id, event) for event_id, event in events.items()}
+            with self._tiers_lock:
+                indexed = {}
+                for name in (HOT_TIER, ARCHIVE_TIER):
+                    index = self._get_tier(name)
+                    if index is not None:
+                        indexed.update(index.get_records([event_id for event_id in event_ids if event_id in index]))
+            missing = [
+                event_id for event_id, record in records.items()
+                if indexed.get(event_id, {}).get("text_hash") != record["text_hash"]
+            ]
+            vectors = self.embeddings.embed_documents([records[event_id]["text"] for event_id in missing]) if missing else []
             
-            # Инициализируем векторное хранилище
-            self.vector_store = FAISS.from_documents(documents, self.embeddings)
-            logger.info(f"Initialized embeddings store with {len(events)} events")
-            
+            with self._tiers_lock:
+                changed = set()
+                deleted = [event_id for event_id in event_ids if event_id not in events and event_id in indexed]
+                for event_id in deleted:
+                    changed.update(self._remove_from_tiers(event_id))
+                for event_id, vector in zip(missing, vectors):
+                    record = records[event_id]
+                    target = ARCHIVE_TIER if self._is_archived(record["date"]) else HOT_TIER
+                    changed.update(self._remove_from_tiers(event_id))
+                    self._add_to_tier(target, [event_id], [vector], [record])
+                    changed.add(target)
+                self._touch(deleted + missing)
+                self._schedule_publish(sorted(changed))
+            if missing or deleted:
+                logger.info(f"Vector index synced: {len(missing)} reindexed, {len(deleted)} removed")
+            return len(missing) + len(deleted)
         except Exception as e:
-            logger.error(f"Error initializing embeddings store: {e}")
-            raise
+            logger.error(f"Error syncing changed events to vector index: {e}")
+            self._stale = True
+            return 0
 
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    def _record_rebuild(self, started_at: datetime, duration: float, status: str,
+                        error: Optional[str], embedded: int, events: int):
+        with self._tiers_lock:
+            stats = self._rebuild_stats
+            stats["runs"] += 1
+            stats["failures"] += status != "ok"
+            stats["total_duration"] += duration
+            stats.update({
+                "last_status": status,
+                "last_error": error,
+                "last_started": started_at.strftime("%d.%m.%Y %H:%M:%S"),
+                "last_duration": duration,
+                "last_embedded": embedded,
+            })
+            if status == "ok":
+                stats["events"] = events
+
+    def get_rebuild_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики перестроек индекса
+        
+        Returns:
+            Словарь {runs, failures, running, stale, last_status, last_error, last_started,
+            last_duration, avg_duration, last_embedded, events, current, archived}
+        """
+        with self._tiers_lock:
+            stats = dict(self._rebuild_stats)
+            stats["current"] = len(self.vector_store) if self.vector_store is not None else 0
+            stats["archived"] = len(self.archive_store) if self.archive_store is not None else 0
+        stats["stale"] = self._stale
+        stats["avg_duration"] = stats.pop("total_duration") / stats["runs"] if stats["runs"] else 0.0
+        return stats
+
+    def _add_to_tier(self, name: str, ids: List[int], vectors: List[Any], records: List[Dict[str, Any]]):
+        index = self._get_tier(name)
+        if index is None:
+            index = create_index(self.backend, len(vectors[0]))
+            self._set_tier(name, index)
+        index.add(ids, vectors, records)
+
+    def _rotate_tiers(self):
+        """
+        Переносит прошедшие мероприятия из горячего уровня в архив.
+        Векторы берутся из индекса, поэтому embeddings не пересчитываются.
+        """
+        today = date.today()
+        if self._rotated_on == today:
+            return
+        with self._tiers_lock:
+            if self._rotated_on == today or self.vector_store is None:
+                self._rotated_on = today
+                return
+            
+            records = self.vector_store.get_records(self.vector_store.ids())
+            expired = [event_id for event_id, record in records.items() if self._is_archived(record.get("date"))]
+            
+            if expired:
+                vectors = self.vector_store.get_vectors()
+                self._add_to_tier(
+                    ARCHIVE_TIER, expired, [vectors[event_id] for event_id in expired],
+                    [records[event_id] for event_id in expired]
+                )
+                self.vector_store.remove(expired)
+                self._touch(expired)
+                self._schedule_publish([HOT_TIER, ARCHIVE_TIER])
+                logger.info(f"Moved {len(expired)} past events to the archive tier")
+            self._rotated_on = today
+
+    def search(self, query: str, k: int = 5, include_archive: bool = False,
+               embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
         Поиск релевантных мероприятий
         
         Args:
             query: Текст запроса
             k: Количество результатов
+            include_archive: Искать также среди прошедших мероприятий из архива
+            embedding: Готовый эмбеддинг запроса, если он уже вычислен
             
         Returns:
             Список релевантных мероприятий
+            
+        Raises:
+            Exception: Ошибка API эмбеддингов или индекса
         """
         try:
-            if not self.vector_store:
+            self._reload_published()
+            self._rotate_tiers()
+            stores = [self.vector_store] + ([self.archive_store] if include_archive else [])
+            stores = [store for store in stores if store is not None]
+            if not stores:
                 logger.warning("Vector store not initialized")
                 return []
-                
-            # Поиск релевантных документов
-            results = self.vector_store.similarity_search_with_score(query, k=k)
+            
+            # Запрос векторизуется один раз для обоих уровней
+            if embedding is None:
+                embedding = self.embeddings.embed_query(query)
+            results = []
+            records = {}
+            with self._tiers_lock:
+                for store in stores:
+                    found = store.search(embedding, k)
+                    results.extend((event_id, _relevance(cosine)) for event_id, cosine in found)
+                    records.update(store.get_records([event_id for event_id, _ in found]))
+            results = sorted(results, key=lambda item: item[1], reverse=True)[:k]
             
             # Преобразуем результаты в формат мероприятий
             events = []
-            for doc, score in results:
-                metadata = doc.metadata
-                event_id = metadata["id"]
+            for event_id, score in results:
+                metadata = records.get(event_id) or {"id": event_id, "name": "", "date": "", "time": "", "city": "", "tags": ""}
                 
                 # Получаем полные данные о событии из базы данных
                 try:
@@ -129,6 +578,7 @@ class EmbeddingsStore:
                                 "tags": db_event['tags'],
                                 "creator": db_event['creator'],
                                 "points": db_event['participation_points'],
+                                "participants_count": db_event['participants_count'],
                                 "code": db_event['code'],
                                 "owner": db_event['owner'],
                                 "relevance_score": float(score)
@@ -166,8 +616,23 @@ class EmbeddingsStore:
             return events
             
         except Exception as e:
+            # Ошибка не маскируется пустым результатом: его нельзя отличить от "ничего не найдено"
             logger.error(f"Error searching events: {e}")
-            return []
+            raise
+
+    def get_event_vectors(self) -> Dict[int, Any]:
+        """
+        Возвращает векторы мероприятий из векторного хранилища
+        
+        Returns:
+            Словарь {ID мероприятия: вектор}
+        """
+        vectors = {}
+        with self._tiers_lock:
+            for store in (self.archive_store, self.vector_store):
+                if store is not None:
+                    vectors.update(store.get_vectors())
+        return vectors
 
     def add_event(self, event_data: Dict[str, Any]):
         """
@@ -180,34 +645,8 @@ class EmbeddingsStore:
             # Добавляем мероприятие в базу данных
             event_id = self.db.add_event(event_data)
             
-            # Создаем текст для embeddings
-            text = f"""
-            Название: {event_data['name']}
-            Описание: {event_data['description']}
-            Дата: {event_data['event_date']}
-            Время: {event_data['start_time']}
-            Город: {event_data['city']}
-            Теги: {event_data['tags']}
-            """
-            
-            # Создаем метаданные
-            metadata = {
-                "id": event_id,
-                "name": event_data["name"],
-                "date": event_data["event_date"],
-                "time": event_data["start_time"],
-                "city": event_data["city"],
-                "tags": event_data["tags"]
-            }
-            
-            # Создаем документ
-            document = Document(page_content=text, metadata=metadata)
-            
-            # Добавляем в векторное хранилище
-            if self.vector_store:
-                self.vector_store.add_documents([document])
-            else:
-                self.vector_store = FAISS.from_documents([document], self.embeddings)
+            # Новое мероприятие попадает в уровень по своей дате
+            self._index_event(event_id, event_data)
                 
             logger.info(f"Added event {event_id} to embeddings store")
             
@@ -227,35 +666,8 @@ class EmbeddingsStore:
             # Обновляем мероприятие в базе данных
             self.db.update_event(event_id, event_data)
             
-            # Создаем новый текст для embeddings
-            text = f"""
-            Название: {event_data['name']}
-            Описание: {event_data['description']}
-            Дата: {event_data['event_date']}
-            Время: {event_data['start_time']}
-            Город: {event_data['city']}
-            Теги: {event_data['tags']}
-            """
-            
-            # Создаем новые метаданные
-            metadata = {
-                "id": event_id,
-                "name": event_data["name"],
-                "date": event_data["event_date"],
-                "time": event_data["start_time"],
-                "city": event_data["city"],
-                "tags": event_data["tags"]
-            }
-            
-            # Создаем новый документ
-            document = Document(page_content=text, metadata=metadata)
-            
-            # Обновляем в векторном хранилище
-            if self.vector_store:
-                # Удаляем старый документ
-                self.vector_store.delete([{"id": event_id}])
-                # Добавляем новый
-                self.vector_store.add_documents([document])
+            # Заменяем вектор; при изменении даты мероприятие может перейти в другой уровень
+            self._index_event(event_id, event_data)
                 
             logger.info(f"Updated event {event_id} in embeddings store")
             
@@ -275,11 +687,33 @@ class EmbeddingsStore:
             self.db.delete_event(event_id)
             
             # Удаляем из векторного хранилища
-            if self.vector_store:
-                self.vector_store.delete([{"id": event_id}])
+            with self._tiers_lock:
+                changed = self._remove_from_tiers(event_id)
+                self._touch([event_id])
+                self._schedule_publish(changed)
                 
             logger.info(f"Deleted event {event_id} from embeddings store")
             
         except Exception as e:
             logger.error(f"Error deleting event from embeddings store: {e}")
-            raise 
\ No newline at end of file
+            raise 
+
+    def _index_event(self, event_id: int, event_data: Dict[str, Any]):
+        record = self._build_record(event_id, event_data)
+        vector = self.embeddings.embed_documents([record["text"]])[0]
+        target = ARCHIVE_TIER if self._is_archived(record["date"]) else HOT_TIER
+        with self._tiers_lock:
+            changed = set(self._remove_from_tiers(event_id))
+            self._add_to_tier(target, [event_id], [vector], [record])
+            self._touch([event_id])
+            changed.add(target)
+            self._schedule_publish(sorted(changed))
+
+    def _remove_from_tiers(self, event_id: int) -> List[str]:
+        changed = []
+        for name in (HOT_TIER, ARCHIVE_TIER):
+            index = self._get_tier(name)
+            if index is not None and event_id in index:
+                index.remove([event_id])
+                changed.append(name)
+        return changed
@@ -0,0 +1,185 @@
+# services/ai/event_index.py
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from database.core import Database
+from database.signals import on_event_change
+from .text_utils import normalize_text, stem, trigrams
+
+logger = logging.getLogger(__name__)
+
+# Слова, которые встречаются в названиях многих мероприятий и не помогают их различить
+NAME_STOPWORDS = {"акция", "мероприятие", "проект", "день", "для", "при", "под", "над"}
+
+MIN_TOKEN_LENGTH = 3
+MIN_FUZZY_LENGTH = 4
+MIN_TOKEN_SIMILARITY = 0.6
+MIN_EVENT_SCORE = 0.6
+
+
+class _NameIndexSnapshot(NamedTuple):
+    """Согласованное состояние индекса; не изменяется после построения"""
+    names: Dict[int, str]
+    event_tokens: Dict[int, List[str]]
+    token_events: Dict[str, Set[int]]
+    trigram_index: Dict[str, Set[str]]
+    token_trigrams: Dict[str, Set[str]]
+
+
+_EMPTY_SNAPSHOT = _NameIndexSnapshot({}, {}, {}, {}, {})
+
+
+class EventNameIndex:
+    """
+    Синглтон с индексом названий мероприятий в памяти.
+    Находит упоминания мероприятий в запросе по точному вхождению названия
+    и по основам слов с учетом опечаток (триграммный индекс).
+    Индекс помечается устаревшим при изменении мероприятий и
+    перестраивается при следующем обращении.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EventNameIndex, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._dirty = True
+            cls._instance._snapshot = _EMPTY_SNAPSHOT
+            on_event_change(cls._instance._on_event_change)
+        return cls._instance
+
+    def _on_event_change(self, event_id: Optional[int], action: str) -> None:
+        # Изменение числа участников не затрагивает названия
+        if action != "participants":
+            self._dirty = True
+
+    def _ensure_fresh(self) -> None:
+        if not self._dirty:
+            return
+        with self._lock:
+            if self._dirty:
+                self._dirty = False
+                try:
+                    self._rebuild()
+                except Exception as e:
+                    self._dirty = True
+                    logger.error(f"Error rebuilding event name index: {e}")
+
+    def _rebuild(self) -> None:
+        """Перестраивает индекс по всем мероприятиям из базы данных"""
+        names: Dict[int, str] = {}
+        event_tokens: Dict[int, List[str]] = {}
+        token_events: Dict[str, Set[int]] = defaultdict(set)
+        trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        token_trigrams: Dict[str, Set[str]] = {}
+
+        for row in Database().get_all_events():
+            event_id, name = row["id"], normalize_text(row["name"])
+            if not name:
+                continue
+            names[event_id] = name
+            tokens = [
+                stem(word) for word in name.split()
+                if len(word) >= MIN_TOKEN_LENGTH and word not in NAME_STOPWORDS
+            ]
+            event_tokens[event_id] = tokens
+            for token in tokens:
+                token_events[token].add(event_id)
+                if token not in token_trigrams and len(token) >= MIN_FUZZY_LENGTH:
+                    token_trigrams[token] = trigrams(token)
+                    for gram in token_trigrams[token]:
+                        trigram_index[gram].add(token)
+
+        # Подменяется одна ссылка, поэтому параллельный поиск видит либо старый, либо новый индекс целиком
+        self._snapshot = _NameIndexSnapshot(
+            names, event_tokens, dict(token_events), dict(trigram_index), token_trigrams
+        )
+        logger.info(f"Event name index rebuilt with {len(names)} events")
+
+    def search(self, text: str, limit: int = 3) -> List[Tuple[int, float]]:
+        """
+        Находит мероприятия, упомянутые в тексте
+
+        Args:
+            text: Текст запроса
+            limit: Максимальное количество результатов
+
+        Returns:
+            List[Tuple[int, float]]: Пары (ID мероприятия, уверенность 0..1), по убыванию уверенности
+        """
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        names, event_tokens, token_events = snapshot.names, snapshot.event_tokens, snapshot.token_events
+
+        query = normalize_text(text)
+        if not query:
+            return []
+        padded_query = f" {query} "
+
+        # Сходство каждого слова из названий с лучшим словом запроса
+        hits: Dict[str, float] = {}
+        for word in query.split():
+            if len(word) < MIN_TOKEN_LENGTH or word in NAME_STOPWORDS:
+                continue
+            word_stem = stem(word)
+            if word_stem in token_events:
+                hits[word_stem] = 1.0
+            elif len(word_stem) >= MIN_FUZZY_LENGTH:
+                for token, similarity in self._fuzzy_tokens(snapshot, word_stem):
+                    hits[token] = max(hits.get(token, 0.0), similarity)
+
+        scores: Dict[int, float] = {}
+        candidates = set()
+        for token in hits:
+            candidates.update(token_events.get(token, ()))
+        for event_id in candidates:
+            tokens = event_tokens[event_id]
+            scores[event_id] = sum(hits.get(token, 0.0) for token in tokens) / len(tokens)
+
+        # Точное вхождение полного названия надежнее совпадения по словам
+        for event_id, name in names.items():
+            if f" {name} " in padded_query:
+                scores[event_id] = 1.0
+
+        ranked = sorted(
+            ((event_id, score) for event_id, score in scores.items() if score >= MIN_EVENT_SCORE),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked[:limit]
+
+    @staticmethod
+    def _fuzzy_tokens(snapshot: _NameIndexSnapshot, word_stem: str) -> List[Tuple[str, float]]:
+        """Возвращает слова названий, похожие на основу по коэффициенту Дайса"""
+        grams = trigrams(word_stem)
+        common: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for token in snapshot.trigram_index.get(gram, ()):
+                common[token] += 1
+
+        result = []
+        for token, count in common.items():
+            similarity = 2 * count / (len(grams) + len(snapshot.token_trigrams[token]))
+            if similarity >= MIN_TOKEN_SIMILARITY:
+                result.append((token, similarity))
+        return result
+
+    def best(self, text: str) -> Optional[Tuple[int, float]]:
+        """
+        Возвращает наиболее вероятное упомянутое мероприятие
+
+        Args:
+            text: Текст запроса
+
+        Returns:
+            Optional[Tuple[int, float]]: (ID мероприятия, уверенность) или None
+        """
+        matches = self.search(text, limit=2)
+        if not matches:
+            return None
+        # Два равноценных кандидата - запрос неоднозначен, решение оставляем за вызывающим кодом
+        if len(matches) > 1 and matches[0][1] == matches[1][1] and matches[0][1] < 1.0:
+            return None
+        return matches[0]
@@ -0,0 +1,245 @@
+# services/ai/event_similarity.py
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import config
+from database.core import Database
+from database.signals import on_event_change
+from .text_utils import tokenize, stem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILAR_EVENTS_K = 10
+# Раз в сколько секунд граф пересчитывается полностью с новыми IDF
+DEFAULT_SIMILAR_EVENTS_FULL_REBUILD_INTERVAL = 24 * 3600
+# Теги выбираются модератором из справочника и надежнее слов описания
+TAG_TERM_WEIGHT = 3
+# Пары с меньшим сходством не считаются похожими
+MIN_NEIGHBOR_SIMILARITY = 0.05
+
+
+def _event_terms(event: Dict[str, Any]) -> Counter:
+    """Термы мероприятия: основы слов названия и описания и теги целиком"""
+    terms = Counter(stem(word) for word in tokenize(f"{event.get('name', '')} {event.get('description', '')}"))
+    for tag in str(event.get("tags") or "").split(","):
+        tag = tag.strip().lower()
+        if tag:
+            terms[f"#{tag}"] += TAG_TERM_WEIGHT
+    return terms
+
+
+class EventSimilarityGraph:
+    """
+    Синглтон графа похожих мероприятий.
+    Мероприятия представляются разреженными TF-IDF векторами названия, описания
+    и тегов, для каждого сохраняются k ближайших соседей в таблице event_neighbors.
+    Векторы и обратный индекс термов держатся в памяти: при изменении мероприятия
+    пересчитываются только его список и списки, на которые оно влияет. IDF
+    фиксируется при полном пересчете, чтобы новые оценки сходства были сравнимы
+    с сохраненными; полный пересчет выполняется раз в
+    SIMILAR_EVENTS_FULL_REBUILD_INTERVAL секунд. Показ похожих мероприятий -
+    только чтение из таблицы, пересчетом занимается фоновая задача.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EventSimilarityGraph, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.db = Database()
+        self.k = getattr(config, "SIMILAR_EVENTS_K", DEFAULT_SIMILAR_EVENTS_K)
+        self.full_rebuild_interval = getattr(
+            config, "SIMILAR_EVENTS_FULL_REBUILD_INTERVAL", DEFAULT_SIMILAR_EVENTS_FULL_REBUILD_INTERVAL
+        )
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._dirty: Set[int] = set()
+        self._full_rebuild = True
+        # Состояние ниже меняется только под self._build_lock
+        self._idf: Dict[str, float] = {}
+        self._default_idf = 1.0
+        self._vectors: Dict[int, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        self._built_at = 0.0
+        on_event_change(self._on_event_change)
+        self._initialized = True
+
+    def _on_event_change(self, event_id: Optional[int], action: str) -> None:
+        # Число участников на сходство не влияет
+        if action == "participants":
+            return
+        with self._lock:
+            if event_id is None:
+                self._full_rebuild = True
+            else:
+                self._dirty.add(event_id)
+
+    def refresh(self) -> int:
+        """
+        Пересчитывает соседей измененных мероприятий и тех, на чьи списки они влияют
+
+        Returns:
+            int: Количество мероприятий, для которых обновлен список соседей
+        """
+        with self._build_lock:
+            with self._lock:
+                full = self._full_rebuild or time.monotonic() - self._built_at >= self.full_rebuild_interval
+                dirty = set(self._dirty)
+                self._full_rebuild = False
+                self._dirty.clear()
+
+            if not full and not dirty:
+                return 0
+
+            try:
+                return self._build_full() if full else self._update(dirty)
+            except Exception:
+                with self._lock:
+                    self._full_rebuild = self._full_rebuild or full
+                    self._dirty.update(dirty)
+                raise
+
+    def _vectorize(self, terms: Counter) -> Dict[str, float]:
+        """Строит нормированный разреженный TF-IDF вектор с зафиксированными IDF"""
+        vector = {
+            term: (1.0 + math.log(count)) * self._idf.get(term, self._default_idf)
+            for term, count in terms.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def _add_vector(self, event_id: int, vector: Dict[str, float]) -> None:
+        self._vectors[event_id] = vector
+        for term, weight in vector.items():
+            self._postings.setdefault(term, {})[event_id] = weight
+
+    def _remove_vector(self, event_id: int) -> None:
+        for term in self._vectors.pop(event_id, {}):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(event_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def _scores(self, event_id: int) -> Dict[int, float]:
+        """Косинусное сходство мероприятия со всеми, у кого есть общие термы"""
+        scores: Dict[int, float] = {}
+        for term, weight in self._vectors.get(event_id, {}).items():
+            for other_id, other_weight in self._postings[term].items():
+                if other_id != event_id:
+                    scores[other_id] = scores.get(other_id, 0.0) + weight * other_weight
+        return scores
+
+    def _top(self, scores: Dict[int, float]) -> List[Tuple[int, float]]:
+        candidates = [(event_id, score) for event_id, score in scores.items() if score >= MIN_NEIGHBOR_SIMILARITY]
+        return heapq.nlargest(self.k, candidates, key=lambda item: (item[1], -item[0]))
+
+    def _build_full(self) -> int:
+        """
+        Пересчитывает IDF, векторы и все списки соседей
+
+        Returns:
+            int: Количество обновленных списков соседей
+        """
+        documents = {event["id"]: _event_terms(dict(event)) for event in self.db.get_all_events()}
+        document_frequency = Counter(term for terms in documents.values() for term in terms)
+        total = len(documents)
+        self._idf = {
+            term: math.log((1.0 + total) / (1.0 + frequency)) + 1.0
+            for term, frequency in document_frequency.items()
+        }
+        self._default_idf = math.log(1.0 + total) + 1.0
+
+        self._vectors, self._postings = {}, {}
+        for event_id, terms in documents.items():
+            self._add_vector(event_id, self._vectorize(terms))
+
+        result = {event_id: self._top(self._scores(event_id)) for event_id in documents}
+        # Списки удаленных мероприятий, оставшиеся в таблице
+        for event_id in set(self.db.get_event_neighbor_lists()) - set(documents):
+            result[event_id] = []
+        self.db.replace_event_neighbors(result)
+        self._neighbors = {event_id: items for event_id, items in result.items() if event_id in documents}
+        self._built_at = time.monotonic()
+        logger.info(f"Similar events rebuilt for {len(documents)} events")
+        return len(documents)
+
+    def _update(self, dirty: Set[int]) -> int:
+        """
+        Обновляет векторы измененных мероприятий и затронутые ими списки соседей
+
+        Args:
+            dirty: ID измененных мероприятий
+
+        Returns:
+            int: Количество обновленных списков соседей
+        """
+        for event_id in dirty:
+            self._remove_vector(event_id)
+        present = set()
+        for event in self.db.get_events_by_ids(sorted(dirty)):
+            present.add(event["id"])
+            self._add_vector(event["id"], self._vectorize(_event_terms(dict(event))))
+
+        # Пересчитываем списки измененных мероприятий, списки, в которых они были,
+        # и списки, в которые они теперь попадают
+        affected = set(present)
+        for event_id, items in self._neighbors.items():
+            if any(neighbor_id in dirty for neighbor_id, _ in items):
+                affected.add(event_id)
+        for event_id in present:
+            for other_id, score in self._scores(event_id).items():
+                items = self._neighbors.get(other_id, [])
+                threshold = items[-1][1] if len(items) >= self.k else MIN_NEIGHBOR_SIMILARITY
+                if score > threshold:
+                    affected.add(other_id)
+
+        result = {event_id: [] for event_id in dirty - present}
+        for event_id in affected - result.keys():
+            result[event_id] = self._top(self._scores(event_id))
+        self.db.replace_event_neighbors(result)
+        for event_id, items in result.items():
+            if event_id in present or event_id in self._vectors:
+                self._neighbors[event_id] = items
+            else:
+                self._neighbors.pop(event_id, None)
+        logger.info(f"Similar events updated for {len(result)} of {len(self._vectors)} events")
+        return len(result)
+
+    def get_similar(self, event_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Возвращает предстоящие мероприятия, похожие на указанное.
+        Только читает сохраненный граф: только что измененное мероприятие
+        получит новых соседей при ближайшем фоновом пересчете.
+
+        Args:
+            event_id: ID мероприятия
+            limit: Максимальное количество мероприятий
+
+        Returns:
+            List[Dict[str, Any]]: Мероприятия по убыванию сходства
+        """
+        today = date.today()
+        result = []
+        for event in self.db.get_event_neighbors(event_id, self.k):
+            try:
+                if datetime.strptime(event['event_date'], "%d.%m.%Y").date() < today:
+                    continue
+            except (TypeError, ValueError):
+                continue
+            result.append(event)
+            if len(result) >= limit:
+                break
+        return result
@@ -0,0 +1,158 @@
+# services/ai/event_summarizer.py
+import hashlib
+import logging
+import queue
+import threading
+from typing import Dict, Any, List, Optional
+
+from database.models.event import EventModel
+from database.signals import on_event_change
+from .llm_router import LLMRouter
+from .structured_output import parse_llm_json, REQUIRED
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SCHEMA = {"summary": (str, REQUIRED), "keywords": (list, list)}
+
+MAX_SUMMARY_LENGTH = 200
+MAX_KEYWORDS = 6
+
+
+def event_source_hash(event: Dict[str, Any]) -> str:
+    """
+    Вычисляет хэш полей мероприятия, от которых зависит краткое описание
+
+    Args:
+        event: Словарь с информацией о мероприятии
+
+    Returns:
+        str: Хэш данных мероприятия
+    """
+    source = "\n".join(str(event.get(field, "")) for field in ("name", "description", "tags", "city"))
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+class EventSummarizer:
+    """
+    Синглтон, который в фоновом потоке один раз строит краткое описание
+    и ключевые слова для каждого мероприятия и сохраняет их в event_summaries.
+    Описание перестраивается только при изменении данных мероприятия,
+    а промпты используют его вместо полного текста описания.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EventSummarizer, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.event_db = EventModel()
+        self.llm = LLMRouter()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        on_event_change(self._on_event_change)
+        self._initialized = True
+
+    def _on_event_change(self, event_id: Optional[int], action: str) -> None:
+        # Число участников в описание не входит
+        if event_id is not None and action in ("added", "updated"):
+            self._queue.put(event_id)
+
+    def start(self) -> None:
+        """Запускает фоновый поток и ставит в очередь мероприятия без актуального описания"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._worker, name="EventSummarizer", daemon=True)
+            self._thread.start()
+
+        try:
+            events = self.event_db.get_all_events()
+            summaries = self.event_db.get_event_summaries([event["id"] for event in events])
+            stale = [
+                event["id"] for event in events
+                if summaries.get(event["id"], {}).get("source_hash") != event_source_hash(event)
+            ]
+            for event_id in stale:
+                self._queue.put(event_id)
+            if stale:
+                logger.info(f"Queued {len(stale)} events for summarization")
+        except Exception as e:
+            logger.error(f"Error scheduling event summaries: {e}")
+
+    def _worker(self) -> None:
+        while True:
+            event_id = self._queue.get()
+            try:
+                self.summarize(event_id)
+            except Exception as e:
+                logger.error(f"Error summarizing event {event_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def summarize(self, event_id: int) -> bool:
+        """
+        Строит и сохраняет краткое описание мероприятия, если данные изменились
+
+        Args:
+            event_id: ID мероприятия
+
+        Returns:
+            bool: True, если описание было обновлено
+        """
+        event = self.event_db.get_event_by_id(event_id)
+        if not event:
+            return False
+
+        source_hash = event_source_hash(event)
+        current = self.event_db.get_event_summaries([event_id]).get(event_id)
+        if current and current["source_hash"] == source_hash:
+            return False
+
+        prompt = f"""
+        Составь краткое описание волонтерского мероприятия для справочника.
+
+        Название: {event['name']}
+        Регион: {event['city']}
+        Теги: {event['tags']}
+        Описание: {event['description']}
+
+        Верни ответ в формате JSON:
+        {{
+            "summary": "одно-два предложения о сути мероприятия и задачах волонтеров",
+            "keywords": ["до {MAX_KEYWORDS} ключевых слов"]
+        }}
+        """
+
+        response = self.llm.generate(prompt, route="summary")
+        result = parse_llm_json(response, SUMMARY_SCHEMA, "event_summary")
+        if not result or not result["summary"]:
+            return False
+
+        summary = result["summary"][:MAX_SUMMARY_LENGTH]
+        keywords = ", ".join(str(keyword).strip() for keyword in result["keywords"][:MAX_KEYWORDS] if str(keyword).strip())
+        self.event_db.save_event_summary(event_id, summary, keywords, source_hash)
+        logger.info(f"Summary for event {event_id} updated")
+        return True
+
+    def get_summaries(self, event_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """
+        Возвращает сохраненные краткие описания мероприятий
+
+        Args:
+            event_ids: Список ID мероприятий
+
+        Returns:
+            Dict[int, Dict[str, str]]: {ID мероприятия: {"summary", "keywords", "source_hash"}}
+        """
+        ids = [event_id for event_id in event_ids if event_id is not None]
+        try:
+            return self.event_db.get_event_summaries(ids)
+        except Exception as e:
+            logger.error(f"Error loading event summaries: {e}")
+            return {}
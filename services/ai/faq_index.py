@@ -0,0 +1,260 @@
+# services/ai/faq_index.py
+import logging
+import math
+import re
+import textwrap
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import config
+from .bot_info import BOT_INFO, get_volunteering_definition
+from .event_index import EventNameIndex
+from .text_utils import tokenize, stem
+
+logger = logging.getLogger(__name__)
+
+# Служебные слова, не несущие смысла для определения вопроса
+FAQ_STOPWORDS = {
+    "как", "что", "где", "кто", "это", "для", "мне", "меня", "можно", "нужно", "надо",
+    "какие", "какой", "какая", "такое", "такие", "есть", "или", "его", "мой", "моя",
+    "про", "расскажи", "подскажи", "скажи", "пожалуйста", "хочу", "бот", "бота", "боте"
+}
+
+# Примеры вопросов для каждого раздела справочника BOT_INFO
+FAQ_QUESTIONS = {
+    "registration_process": [
+        "как зарегистрироваться",
+        "регистрация в боте",
+        "как пройти регистрацию",
+        "какой пароль нужен для входа",
+        "зачем вводить табельный номер",
+        "как начать пользоваться",
+    ],
+    "event_registration": [
+        "как записаться на мероприятие",
+        "как зарегистрироваться на мероприятие",
+        "запись на мероприятие",
+        "регистрация на мероприятие",
+        "где взять код мероприятия",
+        "как подтвердить участие",
+    ],
+    "points_system": [
+        "как начисляются баллы",
+        "за что дают баллы",
+        "сколько баллов за мероприятие",
+        "когда начислят баллы",
+    ],
+    "leaderboard": [
+        "что такое лидерборд",
+        "рейтинг волонтеров",
+        "топ волонтеров",
+        "как попасть в лидерборд",
+    ],
+    "curator_info": [
+        "кто организатор мероприятия",
+        "кто куратор",
+        "с кем связаться по мероприятию",
+    ],
+    "available_regions": [
+        "какие регионы доступны",
+        "в каких регионах работает",
+        "список регионов",
+        "в каких городах проходят мероприятия",
+    ],
+    "volunteering_types": [
+        "какие виды волонтерства",
+        "какие бывают направления волонтерства",
+        "типы волонтерства",
+    ],
+    "volunteering_definition": [
+        "что такое волонтерство",
+        "кто такие волонтеры",
+        "зачем быть волонтером",
+    ],
+    "description": [
+        "что ты умеешь",
+        "что ты можешь",
+        "расскажи о себе",
+        "для чего нужен",
+        "что умеет",
+    ],
+}
+
+# Вводные фразы для разделов-списков
+FAQ_LIST_TITLES = {
+    "available_regions": "Бот работает в следующих регионах:",
+    "volunteering_types": "В боте доступны следующие виды волонтерства:",
+}
+
+# Вопросы о собственных данных пользователя ("сколько баллов у меня", "мои мероприятия")
+# справочник не отвечает, даже если они похожи на общий вопрос
+PERSONAL_QUERY_RE = re.compile(r"(?<!\w)(у меня|я|мо[йяеёи]|мо(?:его|ему|им|ем|ей|ею|их|ими))(?!\w)", re.IGNORECASE)
+
+DEFAULT_FAQ_MIN_SIMILARITY = 0.6
+# Какая доля значимых слов вопроса должна встречаться в примерах раздела: одно общее
+# слово ("топ мероприятий на выходных" и "топ волонтеров") не делает вопрос справочным
+DEFAULT_FAQ_MIN_COVERAGE = 0.75
+TERM_PREFIX_LENGTH = 7
+
+
+def _terms(text: str) -> List[str]:
+    """Возвращает значимые термины текста: основы слов без возвратных окончаний"""
+    terms = []
+    for word in tokenize(text):
+        if len(word) < 3 or word in FAQ_STOPWORDS:
+            continue
+        if len(word) > 6 and word.endswith(("ся", "сь")):
+            word = word[:-2]
+        terms.append(stem(word)[:TERM_PREFIX_LENGTH])
+    return terms
+
+
+class FAQIndex:
+    """
+    Синглтон для ответов на вопросы о работе бота по справочнику bot_info.
+    Вопрос сопоставляется с примерами по косинусной близости TF-IDF векторов
+    основ слов; при достаточной близости ответ берется из справочника
+    без обращения к GigaChat API. Вопросы о данных пользователя и о конкретных
+    мероприятиях (найденных EventNameIndex) передаются модели.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(FAQIndex, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._stats = {"deflected": 0, "missed": 0}
+            cls._instance.min_similarity = getattr(config, "FAQ_MIN_SIMILARITY", DEFAULT_FAQ_MIN_SIMILARITY)
+            cls._instance.min_coverage = getattr(config, "FAQ_MIN_COVERAGE", DEFAULT_FAQ_MIN_COVERAGE)
+            cls._instance._build()
+        return cls._instance
+
+    def _build(self):
+        """Строит TF-IDF векторы примеров вопросов и готовит ответы"""
+        self._answers: Dict[str, str] = {key: self._render_answer(key) for key in FAQ_QUESTIONS}
+
+        examples = []
+        for key, questions in FAQ_QUESTIONS.items():
+            for question in questions:
+                terms = _terms(question)
+                if not terms:
+                    logger.warning(f"FAQ example '{question}' has no significant words and is never matched")
+                examples.append((key, terms))
+        # Словарь раздела - значимые слова всех его примеров
+        self._topic_terms: Dict[str, set] = {key: set() for key in FAQ_QUESTIONS}
+        for key, terms in examples:
+            self._topic_terms[key].update(terms)
+        document_frequency = Counter(term for _, terms in examples for term in set(terms))
+        total = len(examples)
+        self._idf = {term: math.log(1 + total / count) for term, count in document_frequency.items()}
+        # Незнакомое слово весит как самое редкое: запрос о другом снижает близость к справочнику
+        self._unknown_idf = math.log(1 + total)
+
+        self._vectors: List[Tuple[str, Dict[str, float]]] = [
+            (key, self._vectorize(terms)) for key, terms in examples if terms
+        ]
+        logger.info(f"FAQ index built with {len(self._vectors)} questions for {len(self._answers)} topics")
+
+    @staticmethod
+    def _render_answer(key: str) -> str:
+        if key == "volunteering_definition":
+            return textwrap.dedent(get_volunteering_definition()).strip()
+        value = BOT_INFO.get(key, "")
+        if isinstance(value, list):
+            return FAQ_LIST_TITLES.get(key, "") + "\n" + "\n".join(f"- {item}" for item in value)
+        return textwrap.dedent(value).strip()
+
+    def _vectorize(self, terms: List[str]) -> Dict[str, float]:
+        counts = Counter(terms)
+        vector = {term: count * self._idf.get(term, self._unknown_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def match(self, query: str) -> Optional[Tuple[str, float]]:
+        """
+        Находит раздел справочника, ближайший к вопросу
+
+        Args:
+            query: Вопрос пользователя
+
+        Returns:
+            Optional[Tuple[str, float]]: (ключ раздела, косинусная близость) или None
+        """
+        query_vector = self._vectorize(_terms(query))
+        if not query_vector:
+            return None
+
+        best = None
+        for key, vector in self._vectors:
+            similarity = sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items())
+            if best is None or similarity > best[1]:
+                best = (key, similarity)
+        return best
+
+    def answer(self, query: str) -> Optional[str]:
+        """
+        Возвращает готовый ответ из справочника, если вопрос похож на один из примеров
+
+        Args:
+            query: Вопрос пользователя
+
+        Returns:
+            Optional[str]: Ответ или None, если вопрос нужно обработать моделью
+        """
+        match = self.match(query)
+        if (not match or match[1] < self.min_similarity or self._coverage(query, match[0]) < self.min_coverage
+                or self._is_specific(query)):
+            with self._lock:
+                self._stats["missed"] += 1
+            return None
+
+        key, similarity = match
+        with self._lock:
+            self._stats["deflected"] += 1
+        logger.info(f"FAQ answer '{key}' (similarity {similarity:.2f}) served without LLM call")
+        return self._answers[key]
+
+    def _coverage(self, query: str, key: str) -> float:
+        """
+        Доля значимых слов вопроса, встречающихся в примерах раздела
+
+        Args:
+            query: Вопрос пользователя
+            key: Ключ раздела справочника
+
+        Returns:
+            float: Доля от 0 до 1
+        """
+        terms = set(_terms(query))
+        return len(terms & self._topic_terms[key]) / len(terms) if terms else 0.0
+
+    @staticmethod
+    def _is_specific(query: str) -> bool:
+        """
+        Проверяет, относится ли вопрос к данным пользователя или к конкретному мероприятию
+
+        Args:
+            query: Вопрос пользователя
+
+        Returns:
+            bool: True, если общий ответ справочника не подходит
+        """
+        if PERSONAL_QUERY_RE.search(query):
+            return True
+        return bool(EventNameIndex().search(query, limit=1))
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику обращений к справочнику
+
+        Returns:
+            Dict[str, float]: {deflected, missed, deflection_rate}
+        """
+        with self._lock:
+            total = self._stats["deflected"] + self._stats["missed"]
+            return {
+                "deflected": self._stats["deflected"],
+                "missed": self._stats["missed"],
+                "deflection_rate": self._stats["deflected"] / total if total else 0.0,
+            }
@@ -0,0 +1,207 @@
+# services/ai/gazetteer.py
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from bot.constants import CITIES
+from .text_utils import tokenize, stem, trigrams
+
+logger = logging.getLogger(__name__)
+
+# Населенные пункты и альтернативные названия для каждого региона из CITIES.
+# Многословные названия сопоставляются целиком по префиксам основ (например, "великих луках").
+REGION_ALIASES = {
+    "Санкт-Петербург и Ленинградская область": [
+        "Санкт-Петербург", "Петербург", "Питер", "СПб", "Ленинград", "Ленинградская", "ЛО", "Ленобласть",
+        "Гатчина", "Выборг", "Всеволожск", "Тихвин", "Кингисепп", "Сосновый Бор", "Кириши",
+        "Петергоф", "Кронштадт", "Колпино", "Волхов"
+    ],
+    "Калининградская область": [
+        "Калининград", "Калининградская", "Кенигсберг", "Светлогорск"
+    ],
+    "Республика Карелия": [
+        "Карелия", "Петрозаводск", "Кондопога", "Сегежа", "Костомукша", "Сортавала",
+        "Медвежьегорск", "Кемь", "Беломорск"
+    ],
+    "Новгородская область": [
+        "Новгород", "Великий Новгород", "Новгородская", "Боровичи", "Старая Русса", "Валдай"
+    ],
+    "Псковская область": [
+        "Псков", "Псковская", "Великие Луки", "Печоры", "Невель", "Порхов"
+    ],
+    "Республика Коми": [
+        "Коми", "Сыктывкар", "Ухта", "Воркута", "Печора", "Инта", "Усинск"
+    ],
+    "Архангельская область и НАО": [
+        "Архангельск", "Архангельская", "Северодвинск", "Котлас", "Новодвинск", "Коряжма",
+        "Нарьян-Мар", "НАО", "Ненецкий", "Онега"
+    ],
+    "Вологодская область": [
+        "Вологда", "Вологодская", "Череповец", "Великий Устюг", "Устюг", "Тотьма"
+    ],
+    "Мурманская область": [
+        "Мурманск", "Мурманская", "Североморск", "Мончегорск", "Кандалакша", "Оленегорск"
+    ],
+    # Региона нет в CITIES, но без него "в Нижнем Новгороде" определялось бы как Новгородская область
+    "Нижегородская область": [
+        "Нижний Новгород", "Нижегородская", "Дзержинск", "Арзамас"
+    ],
+}
+
+
+def _town_forms(name: str) -> List[str]:
+    """Падежные формы названия города на -ск: Советск, Советска, Советску, Советском, Советске"""
+    name = name.lower()
+    return [name + ending for ending in ("", "а", "у", "ом", "е")]
+
+
+# Короткие названия, для которых основа слишком коротка, и названия, основа которых совпадает
+# с обычными словами (Советск - "советский", "совет"; Кировск - "Кировский район";
+# Балтийск - "балтийский"): перечисляем формы явно и не ищем их по основам и опечаткам
+SHORT_FORMS = {
+    "Республика Коми": ["коми", "ухта", "ухты", "ухте", "ухту", "ухтой", "инта", "инты", "инте", "инту", "интой"],
+    "Республика Карелия": ["кемь", "кеми"],
+    "Санкт-Петербург и Ленинградская область": ["спб", "ло"],
+    "Архангельская область и НАО": ["нао"],
+    "Калининградская область": (
+        _town_forms("Советск") + _town_forms("Черняховск") + _town_forms("Балтийск") + _town_forms("Зеленоградск")
+    ),
+    "Мурманская область": (
+        _town_forms("Кировск") + ["апатиты", "апатитов", "апатитам", "апатитами", "апатитах"]
+    ),
+}
+
+CONFIDENT_SCORE = 0.75
+MIN_FUZZY_SCORE = 0.55
+MIN_FUZZY_LENGTH = 5
+
+
+class RegionGazetteer:
+    """
+    Синглтон для локального определения региона по тексту запроса.
+    Ищет названия регионов, городов и их сокращений с учетом падежей
+    (по основам слов) и опечаток (по триграммному индексу), без обращения к сети.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RegionGazetteer, cls).__new__(cls)
+            cls._instance._build()
+        return cls._instance
+
+    def _build(self):
+        """Строит индексы основ и триграмм по справочнику"""
+        self._phrases: Dict[Tuple[str, ...], Set[str]] = defaultdict(set)
+        self._multiword: List[Tuple[Tuple[str, ...], str]] = []
+        self._exact: Dict[str, Set[str]] = defaultdict(set)
+
+        regions = list(CITIES) + [region for region in REGION_ALIASES if region not in CITIES]
+        for region in regions:
+            names = [region] + REGION_ALIASES.get(region, [])
+            for name in names:
+                words = tokenize(name)
+                # Служебные слова названий регионов не должны давать совпадений сами по себе
+                words = [word for word in words if word not in ("область", "республика", "и")]
+                if not words:
+                    continue
+                key = tuple(stem(word) for word in words)
+                if len(key) == 1:
+                    self._phrases[key].add(region)
+                else:
+                    # Префикс без последней буквы основы покрывает падежные формы
+                    prefixes = tuple(word[:max(3, len(word) - 1)] for word in key)
+                    self._multiword.append((prefixes, region))
+
+        for region, forms in SHORT_FORMS.items():
+            for form in forms:
+                self._exact[form].add(region)
+
+        # Триграммный индекс по основам однословных названий
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        self._stem_trigrams: Dict[str, Set[str]] = {}
+        for key in self._phrases:
+            if len(key[0]) >= MIN_FUZZY_LENGTH:
+                grams = trigrams(key[0])
+                self._stem_trigrams[key[0]] = grams
+                for gram in grams:
+                    self._trigram_index[gram].add(key[0])
+
+        logger.info(f"Region gazetteer built with {len(self._phrases)} names")
+
+    def match(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Находит упомянутые в тексте регионы
+
+        Args:
+            text: Текст запроса
+
+        Returns:
+            List[Tuple[str, float]]: Пары (регион, уверенность 0..1), по убыванию уверенности
+        """
+        words = tokenize(text)
+        stems = [stem(word) for word in words]
+        scores: Dict[str, float] = {}
+
+        def add(regions: Set[str], score: float):
+            # Неоднозначное название (например, Печора/Печоры) снижает уверенность
+            if len(regions) > 1:
+                score *= 0.6
+            for region in regions:
+                scores[region] = max(scores.get(region, 0.0), score)
+
+        matched_positions = set()
+        for prefixes, region in self._multiword:
+            size = len(prefixes)
+            for start in range(len(words) - size + 1):
+                if all(words[start + i].startswith(prefix) for i, prefix in enumerate(prefixes)):
+                    add({region}, 1.0)
+                    matched_positions.update(range(start, start + size))
+
+        for pos, word in enumerate(words):
+            if pos in matched_positions:
+                continue
+            if (stems[pos],) in self._phrases:
+                add(self._phrases[(stems[pos],)], 1.0)
+            elif word in self._exact:
+                add(self._exact[word], 1.0)
+            elif len(stems[pos]) >= MIN_FUZZY_LENGTH:
+                fuzzy = self._fuzzy_lookup(stems[pos])
+                if fuzzy:
+                    fuzzy_stem, score = fuzzy
+                    add(self._phrases[(fuzzy_stem,)], score)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def _fuzzy_lookup(self, word_stem: str) -> Optional[Tuple[str, float]]:
+        """Ищет ближайшую основу по коэффициенту Дайса на триграммах"""
+        grams = trigrams(word_stem)
+        candidates: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                candidates[candidate] += 1
+
+        best = None
+        for candidate, common in candidates.items():
+            score = 2 * common / (len(grams) + len(self._stem_trigrams[candidate]))
+            if score >= MIN_FUZZY_SCORE and (best is None or score > best[1]):
+                best = (candidate, score)
+        return best
+
+    def best(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        Возвращает наиболее вероятный регион
+
+        Args:
+            text: Текст запроса
+
+        Returns:
+            Optional[Tuple[str, float]]: (регион, уверенность) или None
+        """
+        matches = self.match(text)
+        if not matches:
+            return None
+        # Если одинаково уверенно упомянуты несколько регионов, ответ неоднозначен
+        if len(matches) > 1 and matches[1][1] == matches[0][1]:
+            return matches[0][0], matches[0][1] * 0.6
+        return matches[0]
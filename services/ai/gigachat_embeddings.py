@@ -0,0 +1,74 @@
+# services/ai/gigachat_embeddings.py
+import logging
+from typing import List
+
+import requests
+
+import config
+from .gigachat_llm import GigaChatLLM
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDINGS_MODEL = "Embeddings"
+# Сколько текстов отправляется в одном запросе к API
+DEFAULT_EMBEDDINGS_BATCH_SIZE = 16
+
+
+class GigaChatEmbeddings:
+    """
+    Клиент API эмбеддингов GigaChat на requests.
+    Использует тот же токен доступа, что и GigaChatLLM, и не требует langchain.
+    """
+
+    def __init__(self, model: str = None, batch_size: int = None):
+        self.model = model or getattr(config, "EMBEDDINGS_MODEL", DEFAULT_EMBEDDINGS_MODEL)
+        self.batch_size = batch_size or getattr(config, "EMBEDDINGS_BATCH_SIZE", DEFAULT_EMBEDDINGS_BATCH_SIZE)
+        self.url = getattr(
+            config, "GIGACHAT_EMBEDDINGS_URL",
+            config.GIGACHAT_API_URL.replace("/chat/completions", "/embeddings")
+        )
+        self._auth = GigaChatLLM()
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        headers = {
+            'Authorization': f'Bearer {self._auth.get_access_token()}',
+            'Accept': 'application/json',
+        }
+        try:
+            response = requests.post(self.url, headers=headers, json={"model": self.model, "input": texts}, verify=False)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка при запросе эмбеддингов GigaChat: {e}")
+            raise Exception(f"Ошибка при запросе эмбеддингов GigaChat: {e}")
+
+        data = sorted(response.json().get("data", []), key=lambda item: item.get("index", 0))
+        if len(data) != len(texts):
+            raise Exception(f"GigaChat вернул {len(data)} эмбеддингов вместо {len(texts)}")
+        return [item["embedding"] for item in data]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Вычисляет эмбеддинги текстов пакетами
+
+        Args:
+            texts: Список текстов
+
+        Returns:
+            List[List[float]]: Эмбеддинги в том же порядке
+        """
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._request(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Вычисляет эмбеддинг запроса
+
+        Args:
+            text: Текст запроса
+
+        Returns:
+            List[float]: Эмбеддинг
+        """
+        return self._request([text])[0]
@@ -6,9 +6,10 @@ from config import AUTHORIZATION_KEY, GIGACHAT_TOKEN_URL, GIGACHAT_API_URL, MODE
 logger = logging.getLogger(__name__)
 
 class GigaChatLLM:
-    def __init__(self, temperature: float = TEMPERATURE, max_tokens: int = 150):
+    def __init__(self, temperature: float = TEMPERATURE, max_tokens: int = 150, model: str = MODEL_NAME):
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.model = model
         self.access_token = None
         self.token_expires_at = 0
 
@@ -39,7 +40,19 @@ class GigaChatLLM:
         self.token_expires_at = time.time() + expires_in
         return self.access_token
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, model: str = None, temperature: float = None, max_tokens: int = None) -> str:
+        """
+        Генерирует ответ модели
+
+        Args:
+            prompt: Текст запроса
+            model: Модель для этого вызова (по умолчанию self.model)
+            temperature: Температура для этого вызова (по умолчанию self.temperature)
+            max_tokens: Лимит токенов для этого вызова (по умолчанию self.max_tokens)
+
+        Returns:
+            str: Ответ модели
+        """
         token = self.get_access_token()
         headers = {
             'Authorization': f'Bearer {token}',
@@ -73,10 +86,10 @@ class GigaChatLLM:
         enhanced_prompt = safety_wrapper + "\n\n" + prompt
 
         payload = {
-            "model": MODEL_NAME,
+            "model": model or self.model,
             "messages": [{"role": "user", "content": enhanced_prompt}],
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
+            "temperature": self.temperature if temperature is None else temperature,
+            "max_tokens": max_tokens or self.max_tokens,
         }
         try:
             response = requests.post(GIGACHAT_API_URL, headers=headers, json=payload, verify=False)
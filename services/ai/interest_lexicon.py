@@ -0,0 +1,163 @@
+# services/ai/interest_lexicon.py
+import logging
+from collections import deque
+from typing import Dict, List, Tuple
+
+from bot.constants import TAGS
+from .text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Шаблоны ищутся в нормализованном тексте, окруженном пробелами.
+# Ведущий пробел означает начало слова, завершающий пробел - точное слово,
+# без него шаблон работает как основа ("животн" -> "животные", "животным").
+# Основа допустима, только если она не начинает общеупотребительных слов другого
+# смысла: для "парк" ("парковка"), "стих" ("стихи") и подобных перечисляются формы слова.
+# Вес показывает, насколько надежно шаблон указывает на вид волонтерства.
+INTEREST_LEXICON = {
+    "Социальное": {
+        1.0: [" социальн"],
+        0.8: [" пожил", " пенсионер", " ветеран", " инвалид", " сирот", " детдом", " детский дом",
+              " детских домов", " бездомн", " малоимущ", " многодетн", " нуждающ", " одиноки"],
+        0.5: [" дети ", " детей ", " детям ", " детьми ", " ребен", " подрост", " семьям", " семей ",
+              " помощь людям", " помогать людям", " благотворит"],
+    },
+    "Экологическое": {
+        1.0: [" эколог"],
+        0.8: [" природ", " животн", " приют", " субботник", " мусор", " переработ", " макулатур",
+              " раздельн", " озеленен", " саженц", " зоозащит", " бездомных животн", " экопатрул"],
+        0.6: [" парк ", " парка ", " парке ", " парку ", " парком ", " парки ", " парков ", " паркам ",
+              " парках ", " уборк", " деревь", " дерево ", " дерева ", " лес ", " леса ", " лесу ", " лесн",
+              " собак", " кошек", " кошк", " птиц", " пляж", " берег ", " берега ", " берегу ", " берегов",
+              " набережн", " сквер"],
+    },
+    "Спортивное": {
+        1.0: [" спорт"],
+        0.8: [" марафон", " забег", " турнир", " соревнован", " чемпионат", " футбол", " хоккей",
+              " баскетбол", " волейбол", " лыж", " велосипед", " велопробег", " гто "],
+        0.5: [" бег ", " фитнес", " матч", " стадион", " зож "],
+    },
+    "Медицинское": {
+        1.0: [" медицин", " медик"],
+        0.8: [" донор", " сдать кровь", " сдача крови", " больниц", " госпитал", " хоспис",
+              " поликлиник", " врач", " медсестр", " первой помощ", " первая помощ", " пациент"],
+        0.5: [" кровь ", " крови ", " кровью ", " здоровь", " здравоохранен", " лечен", " реабилитац"],
+    },
+    "Культурное": {
+        1.0: [" культур"],
+        0.8: [" музе", " театр", " концерт", " фестивал", " выставк", " библиотек", " искусств",
+              " наследи", " памятник", " краевед"],
+        0.5: [" кино ", " кинотеатр", " творчес", " историческ", " истории город", " истории края",
+              " истории россии", " музык", " экскурс"],
+    },
+    "Корпоративное": {
+        1.0: [" корпоратив"],
+        0.8: [" тимбилдинг", " коллег", " сотрудник", " командообразован"],
+        0.5: [" офис", " нашей компани", " своей компани", " от компании ", " на работе ", " по работе ",
+              " с работы "],
+    },
+    "Чрезвычайное": {
+        1.0: [" чрезвычайн"],
+        0.8: [" чс ", " пожар", " наводнен", " паводк", " спасат", " поисково", " поиск пропав",
+              " пропавш", " эвакуац", " катастроф", " бедстви", " лизаалерт", " лиза алерт"],
+        0.5: [" авари", " стихийн", " экстренн"],
+    },
+    "Образовательное": {
+        1.0: [" образован"],
+        0.8: [" обучен", " мастер-класс", " мастер класс", " лекци", " репетитор", " наставни",
+              " менторств", " просвещ", " тренинг", " учебн", " преподава"],
+        0.5: [" школ", " урок", " курс", " студент", " учить", " научить", " обучать"],
+    },
+}
+
+MIN_INTEREST_SCORE = 0.5
+
+
+class InterestLexicon:
+    """
+    Синглтон, сопоставляющий свободный текст с видами волонтерства из TAGS.
+    Все шаблоны словаря собраны в один автомат Ахо-Корасик, поэтому текст
+    просматривается за один проход независимо от количества шаблонов.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(InterestLexicon, cls).__new__(cls)
+            cls._instance._build()
+        return cls._instance
+
+    def _build(self):
+        """Компилирует шаблоны словаря в автомат Ахо-Корасик"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, float]]] = [[]]
+
+        for tag in TAGS:
+            for weight, patterns in INTEREST_LEXICON.get(tag, {}).items():
+                for pattern in patterns:
+                    self._add_pattern(pattern, tag, weight)
+
+        # Суффиксные ссылки строятся обходом в ширину
+        queue = deque()
+        for state in self._goto[0].values():
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        logger.info(f"Interest lexicon compiled into {len(self._goto)} automaton states")
+
+    def _add_pattern(self, pattern: str, tag: str, weight: float):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((tag, weight))
+
+    def match(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Находит виды волонтерства, упомянутые в тексте
+
+        Args:
+            text: Свободный текст
+
+        Returns:
+            List[Tuple[str, float]]: Пары (тег, оценка 0..1), по убыванию оценки
+        """
+        normalized = f" {normalize_text(text)} "
+        # Оценки объединяются по схеме noisy-OR: несколько слабых совпадений усиливают друг друга
+        misses: Dict[str, float] = {}
+        state = 0
+        for char in normalized:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for tag, weight in self._output[state]:
+                misses[tag] = misses.get(tag, 1.0) * (1.0 - weight)
+
+        scores = [(tag, round(1.0 - miss, 3)) for tag, miss in misses.items()]
+        return sorted(scores, key=lambda item: item[1], reverse=True)
+
+    def tags(self, text: str, min_score: float = MIN_INTEREST_SCORE) -> List[str]:
+        """
+        Возвращает теги из TAGS, упомянутые в тексте с достаточной уверенностью
+
+        Args:
+            text: Свободный текст
+            min_score: Минимальная оценка тега
+
+        Returns:
+            List[str]: Теги по убыванию оценки
+        """
+        return [tag for tag, score in self.match(text) if score >= min_score]
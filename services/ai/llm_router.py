@@ -0,0 +1,129 @@
+# services/ai/llm_router.py
+import logging
+import threading
+import time
+from typing import Dict, Any
+
+import config
+from .gigachat_llm import GigaChatLLM
+
+logger = logging.getLogger(__name__)
+
+# Маршруты по умолчанию, если в config.py не задан LLM_ROUTES
+DEFAULT_LLM_ROUTES = {
+    "intent": {"model": "GigaChat", "temperature": 0.1, "max_tokens": 200},
+    "extraction": {"model": "GigaChat", "temperature": 0.1, "max_tokens": 150},
+    "rewrite": {"model": "GigaChat", "temperature": 0.3, "max_tokens": 60},
+    "summary": {"model": "GigaChat", "temperature": 0.2, "max_tokens": 150},
+    # Лимит финального ответа - общий MAX_TOKENS, как до разделения вызовов по маршрутам
+    "final_answer": {
+        "model": getattr(config, "MODEL_NAME", "GigaChat"), "temperature": 0.7,
+        "max_tokens": getattr(config, "MAX_TOKENS", 200)
+    },
+}
+
+DEFAULT_ROUTE = "final_answer"
+
+
+class LLMRouter:
+    """
+    Синглтон, выбирающий модель, температуру и лимит токенов
+    в зависимости от типа вызова (intent, extraction, rewrite, summary, final_answer).
+    Ведет статистику задержек и ошибок по каждому маршруту.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LLMRouter, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.routes = dict(DEFAULT_LLM_ROUTES)
+        self.routes.update(getattr(config, "LLM_ROUTES", {}))
+        # Один клиент на все маршруты, чтобы не запрашивать токен для каждой модели
+        self.llm = GigaChatLLM()
+        self._lock = threading.Lock()
+        self._stats = {route: self._empty_stats() for route in self.routes}
+        self._initialized = True
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {"calls": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0}
+
+    def get_route(self, route: str) -> Dict[str, Any]:
+        """
+        Возвращает параметры маршрута
+
+        Args:
+            route: Название маршрута
+
+        Returns:
+            Dict[str, Any]: Параметры модели для маршрута
+        """
+        if route not in self.routes:
+            logger.warning(f"Unknown LLM route '{route}', using '{DEFAULT_ROUTE}'")
+            route = DEFAULT_ROUTE
+        return self.routes[route]
+
+    def generate(self, prompt: str, route: str = DEFAULT_ROUTE) -> str:
+        """
+        Генерирует ответ моделью, выбранной для маршрута
+
+        Args:
+            prompt: Текст запроса
+            route: Тип вызова (intent, extraction, rewrite, summary, final_answer)
+
+        Returns:
+            str: Ответ модели
+        """
+        if route not in self.routes:
+            route = DEFAULT_ROUTE
+        params = self.routes[route]
+
+        start = time.perf_counter()
+        failed = False
+        try:
+            return self.llm.generate(
+                prompt,
+                model=params.get("model"),
+                temperature=params.get("temperature"),
+                max_tokens=params.get("max_tokens")
+            )
+        except Exception:
+            failed = True
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats.setdefault(route, self._empty_stats())
+                stats["calls"] += 1
+                stats["total_latency"] += latency
+                stats["max_latency"] = max(stats["max_latency"], latency)
+                if failed:
+                    stats["errors"] += 1
+            logger.debug(f"LLM route '{route}' ({params.get('model')}) took {latency:.3f}s")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику по маршрутам
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {route: {calls, errors, error_rate, avg_latency, max_latency}}
+        """
+        with self._lock:
+            result = {}
+            for route, stats in self._stats.items():
+                calls = stats["calls"]
+                result[route] = {
+                    "model": self.routes.get(route, {}).get("model"),
+                    "calls": calls,
+                    "errors": stats["errors"],
+                    "error_rate": stats["errors"] / calls if calls else 0.0,
+                    "avg_latency": stats["total_latency"] / calls if calls else 0.0,
+                    "max_latency": stats["max_latency"],
+                }
+            return result
@@ -2,16 +2,61 @@
 import sqlite3
 import json
 import logging
+import threading
 import time
+import weakref
 from contextlib import contextmanager
 from typing import Dict, List, Any, Optional, Union
 
+import config
+
 logger = logging.getLogger(__name__)
 
+# Сколько последних сообщений пользователя хранится в conversation_history
+DEFAULT_CONVERSATION_HISTORY_LIMIT = 50
+# Сколько миллисекунд ждать снятия блокировки базы другим соединением
+DEFAULT_MEMORY_DB_BUSY_TIMEOUT = 5000
+# Размер кэша подготовленных запросов каждого соединения
+STATEMENT_CACHE_SIZE = 64
+# Сколько ходов разговора с эмбеддингами хранится для пользователя (services/ai/turn_memory.py)
+DEFAULT_TURN_MEMORY_LIMIT = 200
+# Сколько последних цепочек рассуждений хранится для агента
+DEFAULT_REASONING_CHAINS_LIMIT = 500
+# Сколько строк удаляется одной транзакцией при обслуживании базы
+DEFAULT_MEMORY_MAINTENANCE_BATCH = 500
+# Сколько свободных страниц освобождается за одно обслуживание
+MAX_VACUUM_PAGES = 2000
+# Сколько последних действий (вызовов инструментов) хранится для агента
+DEFAULT_AGENT_ACTIONS_LIMIT = 5000
+MEMORY_TABLES = (
+    "memory", "conversation_history", "conversation_summaries", "conversation_turns",
+    "reasoning_chains", "agent_actions"
+)
+
+
+def _close_connection(conn: sqlite3.Connection):
+    try:
+        conn.close()
+    except sqlite3.Error as e:
+        logger.error(f"Ошибка при закрытии соединения с базой памяти: {e}")
+
+
+class _ThreadConnection:
+    """Соединение одного потока; закрывается финализатором, когда поток завершается"""
+    __slots__ = ("conn", "finalizer", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.finalizer = weakref.finalize(self, _close_connection, conn)
+
 
 class MemoryStore:
     """
-    Хранилище долгосрочной памяти для AI-агентов, использующее SQLite
+    Хранилище долгосрочной памяти для AI-агентов, использующее SQLite.
+    Каждый поток работает через свое долгоживущее соединение в режиме WAL,
+    поэтому параллельные AI-чаты читают без ожидания записи и не открывают
+    базу заново на каждую операцию. Соединение короткоживущего потока
+    закрывается при завершении этого потока.
     """
 
     def __init__(self, db_path: str = "./database/memory.db"):
@@ -22,24 +67,64 @@ class MemoryStore:
             db_path: Путь к файлу базы данных SQLite
         """
         self.db_path = db_path
+        self.history_limit = getattr(config, "CONVERSATION_HISTORY_LIMIT", DEFAULT_CONVERSATION_HISTORY_LIMIT)
+        self.busy_timeout = getattr(config, "MEMORY_DB_BUSY_TIMEOUT", DEFAULT_MEMORY_DB_BUSY_TIMEOUT)
+        self.turns_limit = getattr(config, "TURN_MEMORY_LIMIT", DEFAULT_TURN_MEMORY_LIMIT)
+        self.reasoning_chains_limit = getattr(config, "REASONING_CHAINS_LIMIT", DEFAULT_REASONING_CHAINS_LIMIT)
+        self.agent_actions_limit = getattr(config, "AGENT_ACTIONS_LIMIT", DEFAULT_AGENT_ACTIONS_LIMIT)
+        self._local = threading.local()
+        # Слабые ссылки: хранилище не продлевает жизнь соединений завершившихся потоков
+        self._connections = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
         self._create_tables()
 
+    def _open_connection(self) -> sqlite3.Connection:
+        """Открывает соединение текущего потока и настраивает его"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        # Новая база создается сразу в режиме инкрементальной очистки (до переключения в WAL,
+        # которое записывает заголовок файла); существующая переводится enable_incremental_vacuum
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL позволяет читать параллельно с записью, а synchronous=NORMAL
+        # в этом режиме не вызывает fsync на каждый коммит
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        return conn
+
     @contextmanager
     def _connect(self):
         """
-        Контекстный менеджер для соединения с базой данных
+        Контекстный менеджер для соединения текущего потока с базой данных.
+        Соединение не закрывается после операции; незавершенная транзакция откатывается.
 
         Yields:
             sqlite3.Connection: Соединение с базой данных
         """
-        conn = None
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._open_connection())
+            with self._connections_lock:
+                self._connections.add(holder)
+        conn = holder.conn
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
             yield conn
         finally:
-            if conn:
-                conn.close()
+            if conn.in_transaction:
+                conn.rollback()
+
+    def close(self):
+        """Закрывает соединения всех потоков"""
+        with self._connections_lock:
+            holders, self._connections = list(self._connections), weakref.WeakSet()
+        for holder in holders:
+            holder.finalizer()
+        self._local = threading.local()
 
     def _create_tables(self):
         """Создает таблицы в базе данных, если они еще не существуют"""
@@ -84,6 +169,34 @@ class MemoryStore:
                     ON conversation_history (user_id)
                 ''')
 
+                # Краткое содержание ранней части разговора: сообщения до last_message_id
+                # сжаты в summary, более новые берутся из conversation_history как есть
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS conversation_summaries (
+                        user_id INTEGER PRIMARY KEY,
+                        summary TEXT NOT NULL,
+                        last_message_id INTEGER NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                ''')
+
+                # Ходы разговора (запрос и ответ) с эмбеддингами для поиска прошлых реплик по смыслу
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS conversation_turns (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        query TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        vector BLOB NOT NULL,
+                        timestamp REAL NOT NULL
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_conversation_turns_user
+                    ON conversation_turns (user_id)
+                ''')
+
                 # Таблица для хранения цепочек рассуждений
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS reasoning_chains (
@@ -96,6 +209,18 @@ class MemoryStore:
                     )
                 ''')
 
+                # Таблица для хранения действий агентов (вызовов инструментов)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS agent_actions (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        agent_id TEXT NOT NULL,
+                        tool TEXT NOT NULL,
+                        duration REAL NOT NULL,
+                        success INTEGER NOT NULL,
+                        timestamp REAL NOT NULL
+                    )
+                ''')
+
                 conn.commit()
         except Exception as e:
             logger.error(f"Ошибка при создании таблиц: {e}")
@@ -306,7 +431,7 @@ class MemoryStore:
             limit: Максимальное количество сообщений
 
         Returns:
-            List[Dict]: История сообщений в формате [{role, content, timestamp}, ...]
+            List[Dict]: История сообщений в формате [{role, content}, ...]
         """
         try:
             with self._connect() as conn:
@@ -316,7 +441,7 @@ class MemoryStore:
                     SELECT message, role, timestamp 
                     FROM conversation_history 
                     WHERE user_id = ? 
-                    ORDER BY timestamp DESC 
+                    ORDER BY id DESC 
                     LIMIT ?
                     ''',
                     (user_id, limit)
@@ -324,28 +449,220 @@ class MemoryStore:
 
                 results = cursor.fetchall()
 
-                if results:
-                    # Преобразуем результаты в подходящий формат и сортируем по времени
-                    history = [
-                        {
-                            "role": row['role'],
-                            "content": row['message'],
-                            "timestamp": row['timestamp']
-                        }
-                        for row in results
-                    ]
-                    history.sort(key=lambda x: x["timestamp"])
+                # Сообщения одного хода записываются с одинаковым timestamp,
+                # поэтому хронологический порядок восстанавливается по id
+                return [{"role": row['role'], "content": row['message']} for row in reversed(results)]
+        except Exception as e:
+            logger.error(f"Ошибка при получении истории разговора: {e}")
+            return []
 
-                    # Удаляем timestamp, так как он не нужен для дальнейшей обработки
-                    for item in history:
-                        del item["timestamp"]
+    def get_conversation_messages(self, user_id: int, after_id: int = 0) -> List[Dict]:
+        """
+        Получает сообщения разговора, записанные после указанного
 
-                    return history
-                return []
+        Args:
+            user_id: ID пользователя
+            after_id: ID последнего уже обработанного сообщения
+
+        Returns:
+            List[Dict]: Сообщения в формате [{id, role, content}, ...] в хронологическом порядке
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    '''
+                    SELECT id, message, role
+                    FROM conversation_history
+                    WHERE user_id = ? AND id > ?
+                    ORDER BY id
+                    ''',
+                    (user_id, after_id)
+                )
+                return [
+                    {"id": row['id'], "role": row['role'], "content": row['message']}
+                    for row in cursor.fetchall()
+                ]
         except Exception as e:
             logger.error(f"Ошибка при получении истории разговора: {e}")
             return []
 
+    def count_conversation_messages(self, user_id: int, after_id: int = 0) -> int:
+        """
+        Считает сообщения разговора, записанные после указанного
+
+        Args:
+            user_id: ID пользователя
+            after_id: ID последнего уже обработанного сообщения
+
+        Returns:
+            int: Количество сообщений
+        """
+        try:
+            with self._connect() as conn:
+                return conn.execute(
+                    "SELECT COUNT(*) FROM conversation_history WHERE user_id = ? AND id > ?",
+                    (user_id, after_id)
+                ).fetchone()[0]
+        except Exception as e:
+            logger.error(f"Ошибка при подсчете сообщений разговора: {e}")
+            return 0
+
+    def start_new_conversation(self, user_id: int) -> bool:
+        """
+        Отмечает начало нового диалога: краткое содержание очищается, а сообщения,
+        записанные до этого момента, больше не попадают ни в содержание, ни в контекст
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            bool: True в случае успеха, False в случае ошибки
+        """
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    '''
+                    INSERT INTO conversation_summaries (user_id, summary, last_message_id, updated_at)
+                    VALUES (?, '', (SELECT COALESCE(MAX(id), 0) FROM conversation_history WHERE user_id = ?), ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        summary = excluded.summary,
+                        last_message_id = excluded.last_message_id,
+                        updated_at = excluded.updated_at
+                    ''',
+                    (user_id, user_id, time.time())
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при начале нового диалога: {e}")
+            return False
+
+    def get_conversation_summary(self, user_id: int) -> Optional[Dict]:
+        """
+        Получает краткое содержание ранней части разговора
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            Optional[Dict]: {summary, last_message_id, updated_at} или None
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT summary, last_message_id, updated_at FROM conversation_summaries WHERE user_id = ?",
+                    (user_id,)
+                )
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Ошибка при получении краткого содержания разговора: {e}")
+            return None
+
+    def save_conversation_summary(self, user_id: int, summary: str, last_message_id: int) -> bool:
+        """
+        Сохраняет краткое содержание разговора
+
+        Args:
+            user_id: ID пользователя
+            summary: Краткое содержание
+            last_message_id: ID последнего сообщения, вошедшего в содержание
+
+        Returns:
+            bool: True в случае успеха, False в случае ошибки
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    '''
+                    INSERT INTO conversation_summaries (user_id, summary, last_message_id, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET
+                        summary = excluded.summary,
+                        last_message_id = excluded.last_message_id,
+                        updated_at = excluded.updated_at
+                    ''',
+                    (user_id, summary, last_message_id, time.time())
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении краткого содержания разговора: {e}")
+            return False
+
+    def store_conversation_turns(self, turns: List[Dict], limit: int) -> List[int]:
+        """
+        Сохраняет ходы разговора с векторами одной транзакцией.
+        У каждого пользователя остаются только limit последних ходов.
+
+        Args:
+            turns: Ходы в формате [{user_id, query, response, vector (bytes)}, ...]
+            limit: Сколько ходов хранить для пользователя
+
+        Returns:
+            List[int]: ID сохраненных ходов в порядке turns (пустой список при ошибке)
+        """
+        if not turns:
+            return []
+        try:
+            now = time.time()
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                ids = []
+                for turn in turns:
+                    cursor.execute(
+                        '''
+                        INSERT INTO conversation_turns (user_id, query, response, vector, timestamp)
+                        VALUES (?, ?, ?, ?, ?)
+                        ''',
+                        (turn["user_id"], turn["query"], turn["response"], turn["vector"], now)
+                    )
+                    ids.append(cursor.lastrowid)
+                for user_id in {turn["user_id"] for turn in turns}:
+                    cursor.execute(
+                        '''
+                        DELETE FROM conversation_turns
+                        WHERE user_id = ? AND id <= (
+                            SELECT id FROM conversation_turns
+                            WHERE user_id = ?
+                            ORDER BY id DESC
+                            LIMIT 1 OFFSET ?
+                        )
+                        ''',
+                        (user_id, user_id, limit)
+                    )
+                conn.commit()
+                return ids
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении ходов разговора: {e}")
+            return []
+
+    def get_conversation_turns(self, user_id: int, after_id: int = 0) -> List[Dict]:
+        """
+        Получает сохраненные ходы разговора пользователя с векторами
+
+        Args:
+            user_id: ID пользователя
+            after_id: Вернуть только ходы с ID больше указанного
+
+        Returns:
+            List[Dict]: Ходы в формате [{id, query, response, vector (bytes)}, ...] по возрастанию id
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, query, response, vector FROM conversation_turns WHERE user_id = ? AND id > ? ORDER BY id",
+                    (user_id, after_id)
+                )
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении ходов разговора: {e}")
+            return []
+
     def store_reasoning_chain(self, agent_id: str, query: str, reasoning_steps: List[str], result: str = None) -> bool:
         """
         Сохраняет цепочку рассуждений агента
@@ -379,6 +696,46 @@ class MemoryStore:
             logger.error(f"Ошибка при сохранении цепочки рассуждений: {e}")
             return False
 
+    def store_telemetry(self, reasoning_chains: List[tuple], actions: List[tuple]) -> bool:
+        """
+        Сохраняет пакет телеметрии агентов одной транзакцией
+
+        Args:
+            reasoning_chains: Цепочки рассуждений [(agent_id, query, reasoning_steps, result, timestamp), ...]
+            actions: Действия агентов [(agent_id, tool, duration, success, timestamp), ...]
+
+        Returns:
+            bool: True в случае успеха, False в случае ошибки
+        """
+        if not reasoning_chains and not actions:
+            return True
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    '''
+                    INSERT INTO reasoning_chains 
+                    (agent_id, query, reasoning_steps, result, timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                    ''',
+                    [
+                        (agent_id, query, json.dumps(list(steps), ensure_ascii=False), result, timestamp)
+                        for agent_id, query, steps, result, timestamp in reasoning_chains
+                    ]
+                )
+                cursor.executemany(
+                    '''
+                    INSERT INTO agent_actions (agent_id, tool, duration, success, timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                    ''',
+                    actions
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении телеметрии агентов: {e}")
+            return False
+
     def get_reasoning_chains(self, agent_id: str, limit: int = 5) -> List[Dict]:
         """
         Получает последние цепочки рассуждений агента
@@ -422,6 +779,127 @@ class MemoryStore:
             logger.error(f"Ошибка при получении цепочек рассуждений: {e}")
             return []
 
+    def _delete_batch(self, sql: str, params: tuple) -> int:
+        """Удаляет одну порцию строк отдельной транзакцией, чтобы не задерживать запись обработчиков"""
+        with self._connect() as conn:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+
+    def _delete_over_cap(self, table: str, group_column: str, cap: int, batch_size: int) -> int:
+        """Удаляет строки сверх cap последних в каждой группе порциями по batch_size"""
+        with self._connect() as conn:
+            groups = [
+                row[0] for row in conn.execute(
+                    f"SELECT {group_column} FROM {table} GROUP BY {group_column} HAVING COUNT(*) > ?",
+                    (cap,)
+                ).fetchall()
+            ]
+        deleted = 0
+        for group in groups:
+            while True:
+                count = self._delete_batch(
+                    f'''
+                    DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM {table}
+                        WHERE {group_column} = ?
+                        ORDER BY id DESC
+                        LIMIT ? OFFSET ?
+                    )
+                    ''',
+                    (group, batch_size, cap)
+                )
+                deleted += count
+                if count < batch_size:
+                    break
+        return deleted
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Однократная миграция: переводит базу, созданную без auto_vacuum, в режим
+        INCREMENTAL полным VACUUM. Блокирует базу на время перезаписи файла,
+        поэтому вызывается при запуске бота, а не из периодического обслуживания
+
+        Returns:
+            bool: True, если база была переведена в режим INCREMENTAL
+        """
+        with self._connect() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            logger.info(f"Перевод memory.db ({page_size * page_count / 2 ** 20:.1f} МБ) в режим auto_vacuum=INCREMENTAL")
+            started = time.perf_counter()
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        logger.info(f"memory.db переведена в режим auto_vacuum=INCREMENTAL за {time.perf_counter() - started:.1f} с")
+        return True
+
+    def maintenance(self, batch_size: int = None) -> Dict[str, Any]:
+        """
+        Обслуживание базы памяти: удаляет истекшие записи и строки сверх лимитов
+        порциями, освобождает место инкрементальной очисткой и обновляет статистику планировщика
+
+        Args:
+            batch_size: Сколько строк удаляется одной транзакцией
+
+        Returns:
+            Dict[str, Any]: {deleted: {таблица: строк}, tables: {таблица: строк}, size_mb, free_mb}
+        """
+        batch_size = batch_size or getattr(config, "MEMORY_MAINTENANCE_BATCH", DEFAULT_MEMORY_MAINTENANCE_BATCH)
+        deleted = {}
+
+        expired = 0
+        while True:
+            count = self._delete_batch(
+                '''
+                DELETE FROM memory WHERE id IN (
+                    SELECT id FROM memory
+                    WHERE expires_at IS NOT NULL AND expires_at <= ?
+                    LIMIT ?
+                )
+                ''',
+                (time.time(), batch_size)
+            )
+            expired += count
+            if count < batch_size:
+                break
+        deleted["memory"] = expired
+        deleted["conversation_history"] = self._delete_over_cap(
+            "conversation_history", "user_id", self.history_limit, batch_size
+        )
+        deleted["conversation_turns"] = self._delete_over_cap(
+            "conversation_turns", "user_id", self.turns_limit, batch_size
+        )
+        deleted["reasoning_chains"] = self._delete_over_cap(
+            "reasoning_chains", "agent_id", self.reasoning_chains_limit, batch_size
+        )
+        deleted["agent_actions"] = self._delete_over_cap(
+            "agent_actions", "agent_id", self.agent_actions_limit, batch_size
+        )
+
+        with self._connect() as conn:
+            # Инкрементальная очистка работает только при auto_vacuum=INCREMENTAL; полный VACUUM
+            # для перевода старой базы в этот режим выполняет только enable_incremental_vacuum
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                conn.execute(f"PRAGMA incremental_vacuum({MAX_VACUUM_PAGES})").fetchall()
+            conn.execute("PRAGMA optimize")
+
+            tables = {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in MEMORY_TABLES
+            }
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        return {
+            "deleted": deleted,
+            "tables": tables,
+            "size_mb": page_size * page_count / 2 ** 20,
+            "free_mb": page_size * freelist / 2 ** 20,
+        }
+
     def get_conversation(self, user_id: int) -> List[Dict]:
         """
         Получает историю разговора с пользователем в формате, совместимом с UnifiedRAGAgent
@@ -438,9 +916,77 @@ class MemoryStore:
             logger.error(f"Ошибка при получении истории разговора: {e}")
             return []
             
+    def append_conversation(self, user_id: int, messages: List[Dict]) -> bool:
+        """
+        Дописывает новые сообщения в историю разговора одной транзакцией.
+        Сообщения сверх лимита CONVERSATION_HISTORY_LIMIT удаляются одним ограниченным DELETE,
+        поэтому число записей на ход не зависит от длины истории.
+
+        Args:
+            user_id: ID пользователя
+            messages: Новые сообщения в формате [{role, content}, ...]
+
+        Returns:
+            bool: True в случае успеха, False в случае ошибки
+        """
+        return self.append_conversations({user_id: messages})
+
+    def append_conversations(self, conversations: Dict[int, List[Dict]]) -> bool:
+        """
+        Дописывает новые сообщения нескольких пользователей одной транзакцией
+
+        Args:
+            conversations: Словарь {ID пользователя: [{role, content}, ...]}
+
+        Returns:
+            bool: True в случае успеха, False в случае ошибки
+        """
+        now = time.time()
+        rows = [
+            (user_id, message["content"], message["role"], message.get("timestamp", now))
+            for user_id, messages in conversations.items()
+            for message in messages if "role" in message and "content" in message
+        ]
+        if not rows:
+            return True
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    '''
+                    INSERT INTO conversation_history 
+                    (user_id, message, role, timestamp)
+                    VALUES (?, ?, ?, ?)
+                    ''',
+                    rows
+                )
+                for user_id in {row[0] for row in rows}:
+                    self._trim_conversation(cursor, user_id)
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении разговора: {e}")
+            return False
+
+    def _trim_conversation(self, cursor: sqlite3.Cursor, user_id: int):
+        """Оставляет в истории пользователя только последние history_limit сообщений"""
+        cursor.execute(
+            '''
+            DELETE FROM conversation_history
+            WHERE user_id = ? AND id <= (
+                SELECT id FROM conversation_history
+                WHERE user_id = ?
+                ORDER BY id DESC
+                LIMIT 1 OFFSET ?
+            )
+            ''',
+            (user_id, user_id, self.history_limit)
+        )
+
     def save_conversation(self, user_id: int, conversation: List[Dict]) -> bool:
         """
-        Сохраняет историю разговора с пользователем
+        Заменяет историю разговора с пользователем целиком.
+        Для сохранения очередного хода используется append_conversation.
         
         Args:
             user_id: ID пользователя
@@ -449,22 +995,29 @@ class MemoryStore:
         Returns:
             bool: True в случае успеха, False в случае ошибки
         """
+        now = time.time()
+        rows = [
+            (user_id, message["content"], message["role"], now)
+            for message in conversation if "role" in message and "content" in message
+        ]
         try:
-            # Очищаем старую историю
             with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "DELETE FROM conversation_history WHERE user_id = ?",
                     (user_id,)
                 )
+                cursor.executemany(
+                    '''
+                    INSERT INTO conversation_history 
+                    (user_id, message, role, timestamp)
+                    VALUES (?, ?, ?, ?)
+                    ''',
+                    rows
+                )
+                self._trim_conversation(cursor, user_id)
                 conn.commit()
-                
-            # Сохраняем новую историю
-            for message in conversation:
-                if "role" in message and "content" in message:
-                    self.store_conversation(user_id, message["content"], message["role"])
-                    
             return True
         except Exception as e:
             logger.error(f"Ошибка при сохранении истории разговора: {e}")
-            return False
\ No newline at end of file
+            return False
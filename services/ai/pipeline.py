@@ -0,0 +1,104 @@
+# services/ai/pipeline.py
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """
+    Граф этапов обработки запроса.
+    Каждый этап получает словарь результатов своих зависимостей и запускается,
+    как только они готовы; независимые этапы выполняются одновременно.
+    Синхронные функции выполняются в пуле потоков через asyncio.to_thread.
+    После выполнения в лог пишется критический путь - цепочка этапов,
+    определившая общее время обработки.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def add_stage(self, name: str, func: Callable[[Dict[str, Any]], Any],
+                  depends_on: Iterable[str] = (), optional: bool = False) -> "StageGraph":
+        """
+        Добавляет этап в граф
+
+        Args:
+            name: Название этапа
+            func: Функция func(results), где results - результаты зависимостей
+            depends_on: Названия этапов, результаты которых нужны этому этапу
+            optional: Если True, ошибка этапа не прерывает обработку, а результат равен None
+
+        Returns:
+            StageGraph: Граф для цепочки вызовов
+        """
+        depends_on = tuple(depends_on)
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self._stages[name] = {"func": func, "depends_on": depends_on, "optional": optional}
+        return self
+
+    async def run(self, label: str = "") -> Dict[str, Any]:
+        """
+        Выполняет все этапы графа
+
+        Args:
+            label: Подпись для лога (например, ID пользователя)
+
+        Returns:
+            Dict[str, Any]: Результаты этапов по названиям
+        """
+        started = time.perf_counter()
+        timings: Dict[str, tuple] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str, stage: Dict[str, Any]) -> Any:
+            inputs = {}
+            for dependency in stage["depends_on"]:
+                inputs[dependency] = await tasks[dependency]
+            stage_start = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(stage["func"]):
+                    return await stage["func"](inputs)
+                return await asyncio.to_thread(stage["func"], inputs)
+            except Exception as e:
+                if not stage["optional"]:
+                    raise
+                logger.warning(f"Optional stage '{name}' of {self.name} failed: {e}")
+                return None
+            finally:
+                timings[name] = (stage_start - started, time.perf_counter() - started)
+
+        # Этапы добавляются только после своих зависимостей, поэтому порядок создания задач корректен
+        for name, stage in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, stage))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        self._log_critical_path(timings, time.perf_counter() - started, label)
+        return {name: task.result() for name, task in tasks.items()}
+
+    def _log_critical_path(self, timings: Dict[str, tuple], total: float, label: str) -> None:
+        """Восстанавливает цепочку этапов, закончившихся последними, и пишет ее в лог"""
+        if not timings:
+            return
+        path: List[str] = []
+        current: Optional[str] = max(timings, key=lambda name: timings[name][1])
+        while current:
+            start, end = timings[current]
+            path.append(f"{current} {end - start:.3f}s")
+            dependencies = [dependency for dependency in self._stages[current]["depends_on"] if dependency in timings]
+            current = max(dependencies, key=lambda name: timings[name][1]) if dependencies else None
+
+        suffix = f" [{label}]" if label else ""
+        logger.info(f"{self.name}{suffix}: total {total:.3f}s, critical path: {' -> '.join(reversed(path))}")
@@ -0,0 +1,310 @@
+# services/ai/recommendations.py
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Set
+
+import numpy as np
+
+import config
+from bot.constants import TAGS
+from database.core import Database
+from database.signals import on_event_change, on_user_change
+from .reranker import EventReranker, DATE_SCALE_DAYS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECOMMENDATIONS_TOP_N = 10
+# Вес тегов завершенных мероприятий относительно тегов, выбранных в профиле
+COMPLETED_TAG_WEIGHT = 0.5
+
+
+def _split(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+class RecommendationBuilder:
+    """
+    Синглтон для пакетного построения персональных рекомендаций.
+    Для пользователей строится вектор интересов (теги профиля и завершенных
+    мероприятий, эмбеддинги посещенных мероприятий), который одним матричным
+    умножением сравнивается с матрицей предстоящих мероприятий. Результат
+    сохраняется в user_recommendations; пересчитываются только пользователи,
+    затронутые изменениями профиля или мероприятий.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RecommendationBuilder, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.db = Database()
+        self.top_n = getattr(config, "RECOMMENDATIONS_TOP_N", DEFAULT_RECOMMENDATIONS_TOP_N)
+        self.weights = EventReranker().weight_map
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._dirty_users: Set[int] = set()
+        self._dirty_events: Set[int] = set()
+        self._full_rebuild = True
+        self._built_on: Optional[date] = None
+        on_user_change(self._on_user_change)
+        on_event_change(self._on_event_change)
+        self._initialized = True
+
+    def _on_user_change(self, user_id: Optional[int], action: str) -> None:
+        with self._lock:
+            if user_id is None:
+                self._full_rebuild = True
+            else:
+                self._dirty_users.add(user_id)
+
+    def _on_event_change(self, event_id: Optional[int], action: str) -> None:
+        with self._lock:
+            if event_id is None:
+                self._full_rebuild = True
+            else:
+                self._dirty_events.add(event_id)
+
+    def refresh(self) -> int:
+        """
+        Пересчитывает рекомендации пользователей, затронутых изменениями.
+        Раз в сутки пересчитываются все пользователи, чтобы убрать прошедшие мероприятия.
+
+        Returns:
+            int: Количество пересчитанных пользователей
+        """
+        with self._build_lock:
+            with self._lock:
+                full = self._full_rebuild or self._built_on != date.today()
+                dirty_users = set(self._dirty_users)
+                dirty_events = set(self._dirty_events)
+                self._full_rebuild = False
+                self._dirty_users.clear()
+                self._dirty_events.clear()
+
+            if not full and not dirty_users and not dirty_events:
+                return 0
+
+            try:
+                count = self._build(None if full else dirty_users, dirty_events)
+                if full:
+                    self._built_on = date.today()
+                return count
+            except Exception:
+                # Не потерять изменения: при следующем запуске пересчет повторится
+                with self._lock:
+                    self._full_rebuild = self._full_rebuild or full
+                    self._dirty_users.update(dirty_users)
+                    self._dirty_events.update(dirty_events)
+                raise
+
+    def refresh_user(self, user_id: int) -> None:
+        """
+        Пересчитывает рекомендации одного пользователя без ожидания периодической задачи.
+        Загружаются только профиль и история этого пользователя.
+
+        Args:
+            user_id: ID пользователя
+        """
+        with self._build_lock:
+            with self._lock:
+                self._dirty_users.discard(user_id)
+            self._build({user_id}, set())
+
+    def _build(self, user_ids: Optional[Set[int]], dirty_events: Set[int]) -> int:
+        """
+        Строит рекомендации для указанных пользователей (None - для всех)
+
+        Args:
+            user_ids: ID пользователей для пересчета
+            dirty_events: ID измененных мероприятий
+
+        Returns:
+            int: Количество пересчитанных пользователей
+        """
+        today = date.today()
+        with self.db.connect() as conn:
+            cursor = conn.cursor()
+            if user_ids is None or dirty_events:
+                # Пользователей, затронутых мероприятиями, ищем среди всех
+                cursor.execute("SELECT id, city, tags, registered_events FROM users")
+                users = [dict(row) for row in cursor.fetchall()]
+                cursor.execute("SELECT user_id, event_id FROM completed_events")
+            else:
+                placeholders = ",".join("?" for _ in user_ids)
+                cursor.execute(
+                    f"SELECT id, city, tags, registered_events FROM users WHERE id IN ({placeholders})",
+                    list(user_ids)
+                )
+                users = [dict(row) for row in cursor.fetchall()]
+                cursor.execute(
+                    f"SELECT user_id, event_id FROM completed_events WHERE user_id IN ({placeholders})",
+                    list(user_ids)
+                )
+            completed: Dict[int, Set[int]] = {}
+            for row in cursor.fetchall():
+                completed.setdefault(row['user_id'], set()).add(int(row['event_id']))
+            cursor.execute("SELECT id, event_date, city, tags FROM events")
+            all_events = [dict(row) for row in cursor.fetchall()]
+
+        existing_users = {user['id'] for user in users}
+        deleted_users = set(user_ids or ()) - existing_users
+
+        events = []
+        days = []
+        for event in all_events:
+            try:
+                event_date = datetime.strptime(event['event_date'], "%d.%m.%Y").date()
+            except (TypeError, ValueError):
+                continue
+            if event_date >= today:
+                events.append(event)
+                days.append((event_date - today).days)
+
+        # Пользователи, затронутые измененными мероприятиями: у кого они были в рекомендациях
+        # и чьи интересы или регион совпадают с ними
+        if user_ids is not None and dirty_events:
+            user_ids = set(user_ids) | set(self.db.get_users_recommended_event(list(dirty_events)))
+            changed = [event for event in all_events if event['id'] in dirty_events]
+            changed_tags = {tag for event in changed for tag in _split(event['tags'])}
+            changed_cities = {event['city'] for event in changed}
+            for user in users:
+                if user['city'] in changed_cities or changed_tags & set(_split(user['tags'])):
+                    user_ids.add(user['id'])
+
+        targets = users if user_ids is None else [user for user in users if user['id'] in user_ids]
+        result: Dict[int, List[tuple]] = {user_id: [] for user_id in deleted_users}
+        if targets and events:
+            history_tags = {event['id']: _split(event['tags']) for event in all_events}
+            result.update(self._score(targets, events, np.array(days, dtype=np.float32), completed, history_tags))
+        elif targets:
+            result.update({user['id']: [] for user in targets})
+
+        self.db.replace_user_recommendations(result)
+        logger.info(f"Recommendations rebuilt for {len(result)} users over {len(events)} upcoming events")
+        return len(result)
+
+    def _score(self, users: List[Dict[str, Any]], events: List[Dict[str, Any]],
+               days: np.ndarray, completed: Dict[int, Set[int]],
+               history_tags: Dict[int, List[str]]) -> Dict[int, List[tuple]]:
+        """Оценивает все пары пользователь-мероприятие одним проходом NumPy"""
+        tag_index = {tag: i for i, tag in enumerate(TAGS)}
+        event_index = {event['id']: i for i, event in enumerate(events)}
+        event_ids = np.array([event['id'] for event in events])
+
+        # Матрица тегов мероприятий (мероприятия x теги), строки нормированы
+        event_tags = np.zeros((len(events), len(TAGS)), dtype=np.float32)
+        for i, event in enumerate(events):
+            for tag in _split(event['tags']):
+                if tag in tag_index:
+                    event_tags[i, tag_index[tag]] = 1.0
+        event_tags /= np.maximum(np.linalg.norm(event_tags, axis=1, keepdims=True), 1e-6)
+
+        user_tags = np.zeros((len(users), len(TAGS)), dtype=np.float32)
+        excluded = np.zeros((len(users), len(events)), dtype=bool)
+        history: List[List[int]] = []
+        for u, user in enumerate(users):
+            for tag in _split(user['tags']):
+                if tag in tag_index:
+                    user_tags[u, tag_index[tag]] = 1.0
+            done = completed.get(user['id'], set())
+            for event_id in done:
+                for tag in history_tags.get(event_id, []):
+                    if tag in tag_index:
+                        user_tags[u, tag_index[tag]] += COMPLETED_TAG_WEIGHT
+            registered = {int(event_id) for event_id in _split(user['registered_events']) if event_id.isdigit()}
+            for event_id in done | registered:
+                if event_id in event_index:
+                    excluded[u, event_index[event_id]] = True
+            history.append(list(done | registered))
+        user_tags /= np.maximum(np.linalg.norm(user_tags, axis=1, keepdims=True), 1e-6)
+
+        scores = self.weights["tags"] * (user_tags @ event_tags.T)
+        scores += self.weights["similarity"] * self._embedding_scores(history, events)
+
+        cities = np.array([event['city'] for event in events])
+        user_cities = np.array([user['city'] or "" for user in users])
+        scores += self.weights["region"] * (user_cities[:, None] == cities[None, :])
+        scores += self.weights["date"] * np.exp(-days / DATE_SCALE_DAYS)[None, :]
+        scores[excluded] = -np.inf
+
+        top_n = min(self.top_n, len(events))
+        top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+        result = {}
+        for u, user in enumerate(users):
+            row = top[u][np.argsort(-scores[u, top[u]], kind="stable")]
+            result[user['id']] = [
+                (int(event_ids[i]), float(scores[u, i])) for i in row if np.isfinite(scores[u, i])
+            ]
+        return result
+
+    def _embedding_scores(self, history: List[List[int]], events: List[Dict[str, Any]]) -> np.ndarray:
+        """Сходство эмбеддингов предстоящих мероприятий со средним вектором посещенных пользователем"""
+        scores = np.zeros((len(history), len(events)), dtype=np.float32)
+        if not any(history):
+            return scores
+        try:
+            from .shared_embeddings import SharedEmbeddings
+            vectors = SharedEmbeddings().get_store().get_event_vectors()
+        except Exception as e:
+            logger.warning(f"Event embeddings unavailable, using tags only: {e}")
+            return scores
+        if not vectors:
+            return scores
+
+        dimension = len(next(iter(vectors.values())))
+        event_matrix = np.zeros((len(events), dimension), dtype=np.float32)
+        for i, event in enumerate(events):
+            if event['id'] in vectors:
+                event_matrix[i] = vectors[event['id']]
+        event_matrix /= np.maximum(np.linalg.norm(event_matrix, axis=1, keepdims=True), 1e-6)
+
+        profile = np.zeros((len(history), dimension), dtype=np.float32)
+        for u, event_ids in enumerate(history):
+            known = [vectors[event_id] for event_id in event_ids if event_id in vectors]
+            if known:
+                profile[u] = np.mean(known, axis=0)
+        profile /= np.maximum(np.linalg.norm(profile, axis=1, keepdims=True), 1e-6)
+
+        # Косинусное сходство переводим из [-1, 1] в [0, 1], как релевантность поиска
+        return np.where(profile.any(axis=1, keepdims=True), (profile @ event_matrix.T + 1.0) / 2.0, 0.0)
+
+    def get_recommendations(self, user_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Возвращает сохраненные рекомендации пользователя, исключая прошедшие мероприятия
+
+        Args:
+            user_id: ID пользователя
+            limit: Максимальное количество мероприятий
+
+        Returns:
+            List[Dict[str, Any]]: Мероприятия по убыванию оценки
+        """
+        today = date.today()
+        stored = self.db.get_user_recommendations(user_id, self.top_n)
+        # Пустой список - обычный результат для пользователя без подходящих мероприятий;
+        # сразу считаем только тех, кто еще не попал в периодический пересчет
+        if not stored and not self.db.has_user_recommendations(user_id):
+            self.refresh_user(user_id)
+            stored = self.db.get_user_recommendations(user_id, self.top_n)
+
+        result = []
+        for event in stored:
+            try:
+                if datetime.strptime(event['event_date'], "%d.%m.%Y").date() < today:
+                    continue
+            except (TypeError, ValueError):
+                continue
+            result.append(event)
+            if len(result) >= limit:
+                break
+        return result
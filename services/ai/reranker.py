@@ -0,0 +1,162 @@
+# services/ai/reranker.py
+import logging
+from datetime import datetime, date
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Порядок признаков в матрице; веса задаются в config.RERANK_WEIGHTS
+RERANK_FEATURES = ("similarity", "tags", "region", "date", "availability", "registered", "past")
+
+DEFAULT_RERANK_WEIGHTS = {
+    "similarity": 0.4,     # релевантность из векторного поиска (0..1)
+    "tags": 0.25,          # доля тегов мероприятия, совпавших с интересами пользователя
+    "region": 0.15,        # мероприятие в регионе пользователя или запроса
+    "date": 0.1,           # близость даты: ближайшие мероприятия выше
+    "availability": 0.05,  # свободные места; без поля capacity - меньше участников относительно других
+    "registered": -0.5,    # пользователь уже записан
+    "past": -1.0,          # мероприятие уже прошло
+}
+
+# Через сколько дней вклад близости даты уменьшается в e раз
+DATE_SCALE_DAYS = 14.0
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value: str) -> Optional[date]:
+    # Даты мероприятий повторяются от запроса к запросу, strptime заметно дороже поиска в кэше
+    try:
+        return datetime.strptime(value.strip(), "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+def _split_tags(tags: Any) -> set:
+    if not tags:
+        return set()
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return {str(tag).strip().lower() for tag in tags if str(tag).strip()}
+
+
+class EventReranker:
+    """
+    Синглтон для переранжирования найденных мероприятий по локальным признакам:
+    релевантности векторного поиска, совпадению тегов, региону, близости даты,
+    наличию мест и записи пользователя. Итоговая оценка - взвешенная сумма
+    признаков, вычисляемая одним матричным умножением NumPy.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EventReranker, cls).__new__(cls)
+            weights = dict(DEFAULT_RERANK_WEIGHTS)
+            weights.update(getattr(config, "RERANK_WEIGHTS", {}))
+            cls._instance.weight_map = weights
+            cls._instance.weights = np.array([weights[name] for name in RERANK_FEATURES], dtype=np.float32)
+        return cls._instance
+
+    def features(self, events: List[Dict[str, Any]], interests: Iterable[str] = (),
+                 city: Optional[str] = None, registered_events: Iterable[Any] = (),
+                 today: Optional[date] = None) -> np.ndarray:
+        """
+        Строит матрицу признаков мероприятий
+
+        Args:
+            events: Мероприятия-кандидаты
+            interests: Теги и интересы пользователя
+            city: Регион пользователя или запроса
+            registered_events: ID мероприятий, на которые пользователь уже записан
+            today: Текущая дата (для тестов и пересчета)
+
+        Returns:
+            np.ndarray: Матрица размера (число мероприятий, число признаков)
+        """
+        count = len(events)
+        wanted = _split_tags(interests)
+        registered = {str(event_id) for event_id in registered_events}
+        today = today or date.today()
+        city = (city or "").lower()
+
+        similarity = np.zeros(count, dtype=np.float32)
+        tags = np.zeros(count, dtype=np.float32)
+        region = np.zeros(count, dtype=np.float32)
+        days = np.full(count, np.nan, dtype=np.float32)
+        participants = np.zeros(count, dtype=np.float32)
+        capacity = np.zeros(count, dtype=np.float32)
+        is_registered = np.zeros(count, dtype=np.float32)
+
+        for i, event in enumerate(events):
+            similarity[i] = event.get("relevance_score") or 0.0
+            event_tags = _split_tags(event.get("tags"))
+            if wanted and event_tags:
+                tags[i] = len(event_tags & wanted) / min(len(event_tags), len(wanted))
+            if city and city in str(event.get("city", "")).lower():
+                region[i] = 1.0
+            raw_date = event.get("event_date") or event.get("date")
+            event_date = _parse_date(str(raw_date)) if raw_date else None
+            if event_date:
+                days[i] = (event_date - today).days
+            participants[i] = event.get("participants_count") or 0
+            capacity[i] = event.get("capacity") or 0
+            is_registered[i] = str(event.get("id")) in registered
+
+        known = ~np.isnan(days)
+        upcoming = np.where(known, np.maximum(days, 0), 0)
+        date_score = np.where(known, np.exp(-upcoming / DATE_SCALE_DAYS), 0.0)
+        past = (known & (days < 0)).astype(np.float32)
+
+        # Если вместимость известна, считаем долю свободных мест, иначе сравниваем заполненность между кандидатами
+        busiest = max(float(participants.max()) if count else 0.0, 1.0)
+        availability = np.where(
+            capacity > 0,
+            np.clip((capacity - participants) / np.maximum(capacity, 1.0), 0.0, 1.0),
+            1.0 - participants / busiest
+        )
+
+        return np.column_stack((similarity, tags, region, date_score, availability, is_registered, past)).astype(np.float32)
+
+    def rerank(self, events: List[Dict[str, Any]], user_info: Optional[Dict[str, Any]] = None,
+               interests: Iterable[str] = (), city: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Переранжирует мероприятия с учетом профиля пользователя
+
+        Args:
+            events: Мероприятия-кандидаты
+            user_info: Профиль пользователя (tags, city, registered_events)
+            interests: Дополнительные интересы из запроса
+            city: Регион из запроса (по умолчанию - регион пользователя)
+            limit: Максимальное количество результатов
+
+        Returns:
+            List[Dict[str, Any]]: Мероприятия по убыванию rerank_score
+        """
+        if not events:
+            return []
+        user_info = user_info or {}
+        wanted = list(interests) + list(user_info.get("tags") or [])
+        matrix = self.features(
+            events,
+            interests=wanted,
+            city=city or user_info.get("city"),
+            registered_events=user_info.get("registered_events") or []
+        )
+        scores = matrix @ self.weights
+
+        # Устойчивая сортировка сохраняет порядок векторного поиска при равных оценках
+        order = np.argsort(-scores, kind="stable")
+        if limit:
+            order = order[:limit]
+        result = []
+        for index in order:
+            event = dict(events[index])
+            event["rerank_score"] = float(scores[index])
+            result.append(event)
+        return result
@@ -0,0 +1,215 @@
+# services/ai/session_history.py
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List
+
+import config
+from .memory_store import MemoryStore
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних сообщений разговора держится в памяти для каждого пользователя
+DEFAULT_SESSION_HISTORY_WINDOW = 20
+# Сколько сессий держится в памяти; давно неактивные вытесняются
+DEFAULT_SESSION_CACHE_SIZE = 1000
+# Период фоновой записи новых сообщений в memory.db в секундах
+DEFAULT_SESSION_FLUSH_INTERVAL = 5
+# Сколько несохраненных сообщений запускает запись, не дожидаясь периода
+DEFAULT_SESSION_FLUSH_BATCH = 100
+# Предел несохраненных сообщений, если база памяти недоступна
+MAX_PENDING_FACTOR = 10
+
+
+class SessionHistory:
+    """
+    Синглтон истории разговоров AI-чата.
+    Для каждого пользователя в памяти хранится ограниченное окно последних
+    сообщений; при первом сообщении после перезапуска окно загружается из
+    memory.db. Новые сообщения записываются в базу фоновым потоком пакетами
+    одной транзакцией, неактивные сессии вытесняются по LRU.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(SessionHistory, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.memory_store = MemoryStore()
+        self.window = getattr(config, "SESSION_HISTORY_WINDOW", DEFAULT_SESSION_HISTORY_WINDOW)
+        self.cache_size = getattr(config, "SESSION_CACHE_SIZE", DEFAULT_SESSION_CACHE_SIZE)
+        self.flush_interval = getattr(config, "SESSION_FLUSH_INTERVAL", DEFAULT_SESSION_FLUSH_INTERVAL)
+        self.flush_batch = getattr(config, "SESSION_FLUSH_BATCH", DEFAULT_SESSION_FLUSH_BATCH)
+        self._sessions: "OrderedDict[int, Deque[Dict[str, str]]]" = OrderedDict()
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._writer = None
+        self._initialized = True
+
+    def get(self, user_id: int) -> List[Dict[str, str]]:
+        """
+        Возвращает окно истории разговора пользователя
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            List[Dict[str, str]]: Копия истории в формате [{role, content}, ...]
+        """
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._sessions.move_to_end(user_id)
+                return list(session)
+
+        # Чтение из базы выполняется без self._lock, чтобы не задерживать другие сессии,
+        # но не во время записи, иначе сообщения из очереди могут потеряться
+        with self._flush_lock:
+            stored = self.memory_store.get_conversation_history(user_id, limit=self.window)
+            with self._lock:
+                session = self._sessions.get(user_id)
+                if session is None:
+                    # Сообщения, вытесненные до записи в базу, еще лежат в очереди
+                    pending = [
+                        {"role": role, "content": content}
+                        for pending_user, role, content, _ in self._pending if pending_user == user_id
+                    ]
+                    session = deque(stored + pending, maxlen=self.window)
+                    self._store_session(user_id, session)
+                return list(session)
+
+    def append(self, user_id: int, messages: List[Dict[str, str]]):
+        """
+        Добавляет сообщения в историю; в базу они попадут при ближайшей фоновой записи
+
+        Args:
+            user_id: ID пользователя
+            messages: Сообщения в формате [{role, content}, ...]
+        """
+        messages = [message for message in messages if "role" in message and "content" in message]
+        if not messages:
+            return
+        self.get(user_id)
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = deque(maxlen=self.window)
+                self._store_session(user_id, session)
+            for message in messages:
+                session.append({"role": message["role"], "content": message["content"]})
+                self._pending.append((user_id, message["role"], message["content"], now))
+            self._sessions.move_to_end(user_id)
+            full = len(self._pending) >= self.flush_batch
+        self._ensure_writer()
+        if full:
+            self._wakeup.set()
+
+    def reset(self, user_id: int):
+        """
+        Начинает новый диалог: окно истории очищается, а краткое содержание прежнего
+        диалога сбрасывается. Сохраненная история в базе остается.
+        Обращается к базе, поэтому из асинхронного кода вызывается через asyncio.to_thread
+
+        Args:
+            user_id: ID пользователя
+        """
+        with self._lock:
+            self._store_session(user_id, deque(maxlen=self.window))
+        # Граница нового диалога ставится после всех сообщений прежнего, в том числе еще не записанных
+        self.flush()
+        self.memory_store.start_new_conversation(user_id)
+
+    def pending_count(self, user_id: int) -> int:
+        """
+        Возвращает количество сообщений пользователя, еще не записанных в базу
+
+        Args:
+            user_id: ID пользователя
+
+        Returns:
+            int: Количество сообщений
+        """
+        with self._lock:
+            return sum(1 for pending_user, *_ in self._pending if pending_user == user_id)
+
+    def _store_session(self, user_id: int, session: Deque[Dict[str, str]]):
+        # Вызывается под self._lock
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        while len(self._sessions) > self.cache_size:
+            self._sessions.popitem(last=False)
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is not None or self._stopped:
+                return
+            self._writer = threading.Thread(target=self._run_writer, name="SessionHistoryWriter", daemon=True)
+            self._writer.start()
+
+    def _run_writer(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Записывает накопленные сообщения в memory.db одной транзакцией
+
+        Returns:
+            int: Количество записанных сообщений
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            conversations: Dict[int, List[Dict]] = {}
+            for user_id, role, content, timestamp in batch:
+                conversations.setdefault(user_id, []).append(
+                    {"role": role, "content": content, "timestamp": timestamp}
+                )
+            if self.memory_store.append_conversations(conversations):
+                return len(batch)
+
+            # Не потерять сообщения: они будут записаны при следующей попытке
+            with self._lock:
+                self._pending = batch + self._pending
+                limit = self.flush_batch * MAX_PENDING_FACTOR
+                if len(self._pending) > limit:
+                    logger.warning(f"Dropping {len(self._pending) - limit} unsaved conversation messages")
+                    self._pending = self._pending[-limit:]
+            return 0
+
+    def close(self):
+        """Останавливает фоновую запись и сохраняет оставшиеся сообщения"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join(timeout=self.flush_interval)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Возвращает размер кэша сессий
+
+        Returns:
+            Dict[str, int]: {sessions, messages, pending}
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(session) for session in self._sessions.values()),
+                "pending": len(self._pending),
+            }
@@ -0,0 +1,221 @@
+# services/ai/structured_output.py
+import ast
+import json
+import logging
+import re
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Маркер обязательного поля в схеме
+REQUIRED = object()
+
+_CODE_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_UNQUOTED_KEY_RE = re.compile(r'([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)\s*:')
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "«": '"', "»": '"'})
+
+
+class StructuredOutputParser:
+    """
+    Синглтон для разбора JSON-ответов LLM.
+    Извлекает JSON из текста (код-блоки, пояснения до и после), чинит
+    типичные ошибки форматирования и проверяет результат по схеме.
+
+    Схема - словарь {поле: (тип, значение по умолчанию)}. Если значение
+    по умолчанию равно REQUIRED, отсутствие поля считается ошибкой.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StructuredOutputParser, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._stats = {}
+        return cls._instance
+
+    def parse(self, text: str, schema: Dict[str, Tuple[type, Any]], name: str = "default") -> Optional[Dict[str, Any]]:
+        """
+        Разбирает ответ модели и приводит его к схеме
+
+        Args:
+            text: Сырой ответ модели
+            schema: Схема ожидаемого объекта
+            name: Имя вызова для статистики
+
+        Returns:
+            Optional[Dict[str, Any]]: Проверенный объект или None, если разобрать не удалось
+        """
+        data, outcome = self._load(text or "")
+        if data is None:
+            self._record(name, "failed")
+            logger.error(f"Failed to parse LLM response for {name}: {text[:200] if text else text!r}")
+            return None
+
+        result = self._validate(data, schema)
+        if result is None:
+            self._record(name, "invalid")
+            logger.error(f"LLM response for {name} does not match schema: {data}")
+            return None
+
+        self._record(name, outcome)
+        return result
+
+    def _load(self, text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Возвращает (объект, исход), где исход - 'clean' или 'repaired'"""
+        try:
+            data = json.loads(text)
+            if isinstance(data, dict):
+                return data, "clean"
+        except (json.JSONDecodeError, TypeError):
+            pass
+
+        candidate = self._extract_object(text)
+        if candidate is None:
+            return None, "failed"
+
+        repaired = self._repair(candidate)
+        for attempt in (candidate, repaired, _UNQUOTED_KEY_RE.sub(r'\1"\2":', repaired)):
+            try:
+                data = json.loads(attempt)
+                if isinstance(data, dict):
+                    return data, "repaired"
+            except json.JSONDecodeError:
+                continue
+
+        # Последняя попытка: одинарные кавычки и литералы в стиле Python
+        try:
+            pythonish = re.sub(r"\btrue\b", "True", repaired)
+            pythonish = re.sub(r"\bfalse\b", "False", pythonish)
+            pythonish = re.sub(r"\bnull\b", "None", pythonish)
+            data = ast.literal_eval(pythonish)
+            if isinstance(data, dict):
+                return data, "repaired"
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+
+        return None, "failed"
+
+    @staticmethod
+    def _extract_object(text: str) -> Optional[str]:
+        """Находит первый JSON-объект в тексте, закрывая его, если ответ обрезан"""
+        fenced = _CODE_FENCE_RE.search(text)
+        if fenced:
+            text = fenced.group(1)
+
+        start = text.find("{")
+        if start == -1:
+            return None
+
+        stack = []
+        in_string = False
+        quote = ""
+        escaped = False
+        for pos in range(start, len(text)):
+            char = text[pos]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == quote:
+                    in_string = False
+                continue
+            if char in "\"'":
+                in_string = True
+                quote = char
+            elif char in "{[":
+                stack.append("}" if char == "{" else "]")
+            elif char in "}]":
+                if stack:
+                    stack.pop()
+                if not stack:
+                    return text[start:pos + 1]
+
+        # Ответ оборван по лимиту токенов - закрываем строку и скобки
+        tail = text[start:].rstrip()
+        if in_string:
+            tail += quote
+        tail = tail.rstrip(",:")
+        return tail + "".join(reversed(stack))
+
+    @staticmethod
+    def _repair(candidate: str) -> str:
+        """Исправляет типографские кавычки, висячие запятые и литералы Python"""
+        repaired = candidate.translate(_SMART_QUOTES)
+        repaired = _TRAILING_COMMA_RE.sub(r"\1", repaired)
+        repaired = re.sub(r"\bTrue\b", "true", repaired)
+        repaired = re.sub(r"\bFalse\b", "false", repaired)
+        repaired = re.sub(r"\bNone\b", "null", repaired)
+        return repaired
+
+    @staticmethod
+    def _validate(data: Dict[str, Any], schema: Dict[str, Tuple[type, Any]]) -> Optional[Dict[str, Any]]:
+        """Приводит поля к типам схемы и подставляет значения по умолчанию"""
+        result = dict(data)
+        for field, (field_type, default) in schema.items():
+            value = data.get(field)
+            if value is None or (value == "" and field_type is not str):
+                if default is REQUIRED:
+                    return None
+                result[field] = default() if callable(default) else default
+                continue
+
+            try:
+                if field_type is float:
+                    value = float(str(value).replace(",", ".")) if isinstance(value, str) else float(value)
+                elif field_type is int:
+                    value = int(float(value))
+                elif field_type is str:
+                    value = value if isinstance(value, str) else str(value)
+                    value = value.strip()
+                elif field_type is list:
+                    if isinstance(value, str):
+                        value = [item.strip() for item in value.split(",") if item.strip()]
+                    elif not isinstance(value, list):
+                        value = [value]
+                elif field_type is dict and not isinstance(value, dict):
+                    raise ValueError(f"{field} is not an object")
+            except (TypeError, ValueError):
+                if default is REQUIRED:
+                    return None
+                value = default() if callable(default) else default
+
+            result[field] = value
+        return result
+
+    def _record(self, name: str, outcome: str) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, {"clean": 0, "repaired": 0, "failed": 0, "invalid": 0})
+            stats[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает статистику разбора по именам вызовов
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {name: {clean, repaired, failed, invalid, failure_rate}}
+        """
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                total = sum(stats.values())
+                result[name] = dict(stats)
+                result[name]["failure_rate"] = (stats["failed"] + stats["invalid"]) / total if total else 0.0
+            return result
+
+
+def parse_llm_json(text: str, schema: Dict[str, Tuple[type, Any]], name: str = "default") -> Optional[Dict[str, Any]]:
+    """
+    Разбирает JSON-ответ модели общим парсером
+
+    Args:
+        text: Сырой ответ модели
+        schema: Схема ожидаемого объекта
+        name: Имя вызова для статистики
+
+    Returns:
+        Optional[Dict[str, Any]]: Проверенный объект или None
+    """
+    return StructuredOutputParser().parse(text, schema, name)
@@ -0,0 +1,166 @@
+# services/ai/telemetry.py
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+
+import config
+from .memory_store import MemoryStore
+
+logger = logging.getLogger(__name__)
+
+# Доля запросов, для которых сохраняется цепочка рассуждений (при уровне DEBUG - все)
+DEFAULT_TELEMETRY_REASONING_SAMPLE_RATE = 0.0
+# Доля вызовов инструментов, которые записываются в agent_actions
+DEFAULT_TELEMETRY_ACTION_SAMPLE_RATE = 1.0
+# Сколько записей ждет фоновой записи; при переполнении теряются самые старые
+DEFAULT_TELEMETRY_QUEUE_SIZE = 1000
+# Период фоновой записи в секундах
+DEFAULT_TELEMETRY_FLUSH_INTERVAL = 10
+# Сколько символов запроса и результата сохраняется в цепочке рассуждений
+MAX_TEXT_LENGTH = 200
+
+
+class ReasoningRecord(NamedTuple):
+    agent_id: str
+    query: str
+    steps: tuple
+    result: str
+    timestamp: float
+
+
+class ActionRecord(NamedTuple):
+    agent_id: str
+    tool: str
+    duration: float
+    success: bool
+    timestamp: float
+
+
+class Telemetry:
+    """
+    Синглтон фоновой записи телеметрии агентов.
+    Цепочки рассуждений и вызовы инструментов складываются в ограниченные
+    кольцевые буферы компактных записей и записываются в memory.db пакетами
+    одной транзакцией из фонового потока, не задерживая обработку запросов.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Telemetry, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.memory_store = MemoryStore()
+        self.reasoning_sample_rate = getattr(
+            config, "TELEMETRY_REASONING_SAMPLE_RATE", DEFAULT_TELEMETRY_REASONING_SAMPLE_RATE
+        )
+        self.action_sample_rate = getattr(config, "TELEMETRY_ACTION_SAMPLE_RATE", DEFAULT_TELEMETRY_ACTION_SAMPLE_RATE)
+        self.flush_interval = getattr(config, "TELEMETRY_FLUSH_INTERVAL", DEFAULT_TELEMETRY_FLUSH_INTERVAL)
+        queue_size = getattr(config, "TELEMETRY_QUEUE_SIZE", DEFAULT_TELEMETRY_QUEUE_SIZE)
+        self._reasoning = deque(maxlen=queue_size)
+        self._actions = deque(maxlen=queue_size)
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._writer = None
+        self._initialized = True
+
+    def sample_reasoning(self) -> bool:
+        """
+        Решает, сохранять ли цепочку рассуждений текущего запроса
+
+        Returns:
+            bool: True, если запрос попал в выборку
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            return True
+        return self.reasoning_sample_rate > 0 and random.random() < self.reasoning_sample_rate
+
+    def record_reasoning(self, agent_id: str, query: str, build_steps: Callable[[], List[str]],
+                         result: Optional[str] = None) -> None:
+        """
+        Ставит цепочку рассуждений в очередь записи, если запрос попал в выборку.
+        Шаги строятся только для попавших в выборку запросов.
+
+        Args:
+            agent_id: Идентификатор агента
+            query: Запрос пользователя
+            build_steps: Функция, возвращающая шаги рассуждения
+            result: Ответ агента
+        """
+        if not self.sample_reasoning():
+            return
+        try:
+            steps = tuple(build_steps())
+        except Exception as e:
+            logger.error(f"Error building reasoning chain: {e}")
+            return
+        self._put(self._reasoning, ReasoningRecord(
+            agent_id, query[:MAX_TEXT_LENGTH], steps, (result or "")[:MAX_TEXT_LENGTH], time.time()
+        ))
+
+    def record_action(self, agent_id: str, tool: str, duration: float, success: bool) -> None:
+        """
+        Ставит вызов инструмента в очередь записи с учетом выборки
+
+        Args:
+            agent_id: Идентификатор агента
+            tool: Название инструмента
+            duration: Время выполнения в секундах
+            success: Завершился ли вызов без исключения
+        """
+        if self.action_sample_rate < 1 and random.random() >= self.action_sample_rate:
+            return
+        self._put(self._actions, ActionRecord(agent_id, tool, duration, success, time.time()))
+
+    def _put(self, buffer: deque, record: tuple) -> None:
+        with self._lock:
+            if len(buffer) == buffer.maxlen:
+                self._dropped += 1
+            buffer.append(record)
+            if self._writer is None and not self._stopped:
+                self._writer = threading.Thread(target=self._run_writer, name="TelemetryWriter", daemon=True)
+                self._writer.start()
+
+    def _run_writer(self) -> None:
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Записывает накопленные записи в memory.db
+
+        Returns:
+            int: Количество записанных записей
+        """
+        with self._lock:
+            reasoning, actions = list(self._reasoning), list(self._actions)
+            self._reasoning.clear()
+            self._actions.clear()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            logger.warning(f"Telemetry buffer overflow: {dropped} records dropped")
+        if not reasoning and not actions:
+            return 0
+        # При ошибке записи телеметрия теряется: повтор не должен нагружать базу
+        if self.memory_store.store_telemetry(reasoning, actions):
+            return len(reasoning) + len(actions)
+        return 0
+
+    def close(self) -> None:
+        """Останавливает фоновую запись и сохраняет оставшиеся записи"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join(timeout=self.flush_interval)
+        self.flush()
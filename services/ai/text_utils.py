@@ -0,0 +1,73 @@
+# services/ai/text_utils.py
+import re
+from typing import List, Set
+
+_TOKEN_RE = re.compile(r"[a-zа-я0-9]+(?:-[a-zа-я0-9]+)*")
+
+# Окончания русских слов, от длинных к коротким
+_ENDINGS = (
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "иях", "ией",
+    "ой", "ей", "ий", "ый", "ая", "яя", "ое", "ее", "ые", "ие", "ую", "юю",
+    "ов", "ев", "ах", "ях", "ом", "ем", "ам", "ям", "ью",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й"
+)
+MIN_STEM_LENGTH = 4
+
+
+def normalize_text(text: str) -> str:
+    """
+    Приводит текст к нижнему регистру, заменяет ё на е и убирает лишние символы
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        str: Нормализованный текст
+    """
+    if not text:
+        return ""
+    text = text.lower().replace("ё", "е")
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает текст на нормализованные слова
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        List[str]: Список слов
+    """
+    return normalize_text(text).split()
+
+
+def stem(word: str) -> str:
+    """
+    Отсекает типичное падежное окончание, оставляя основу не короче MIN_STEM_LENGTH
+
+    Args:
+        word: Нормализованное слово
+
+    Returns:
+        str: Основа слова
+    """
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def trigrams(word: str) -> Set[str]:
+    """
+    Возвращает множество триграмм слова с граничными пробелами
+
+    Args:
+        word: Нормализованное слово
+
+    Returns:
+        Set[str]: Триграммы
+    """
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
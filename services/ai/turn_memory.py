@@ -0,0 +1,174 @@
+# services/ai/turn_memory.py
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import config
+from .memory_store import MemoryStore
+from .shared_embeddings import SharedEmbeddings
+from .vector_index import NumpyVectorIndex
+
+logger = logging.getLogger(__name__)
+
+# Для скольких пользователей индексы ходов держатся в памяти
+DEFAULT_TURN_MEMORY_CACHE_SIZE = 200
+# Ходы с меньшим косинусным сходством с запросом не считаются относящимися к нему
+MIN_TURN_SIMILARITY = 0.5
+# Сколько символов ответа входит в текст для эмбеддинга
+MAX_RESPONSE_CHARS = 500
+
+
+def _turn_text(query: str, response: str) -> str:
+    return f"Пользователь: {query}\nАссистент: {response[:MAX_RESPONSE_CHARS]}"
+
+
+class TurnMemory:
+    """
+    Синглтон семантической памяти разговоров.
+    Каждый ход (запрос и ответ) векторизуется в фоновом потоке и сохраняется
+    в memory.db; для пользователя строится небольшой индекс NumpyVectorIndex,
+    по которому находятся прошлые ходы, близкие по смыслу к текущему запросу.
+    Индексы неактивных пользователей вытесняются из памяти по LRU.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TurnMemory, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.memory_store = MemoryStore()
+        # Общий клиент с EmbeddingsStore: один токен и один пул соединений с API
+        self.embeddings = SharedEmbeddings().get_store().embeddings
+        self.limit = self.memory_store.turns_limit
+        self.cache_size = getattr(config, "TURN_MEMORY_CACHE_SIZE", DEFAULT_TURN_MEMORY_CACHE_SIZE)
+        self._indexes: "OrderedDict[int, NumpyVectorIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._initialized = True
+
+    def add_turn(self, user_id: int, query: str, response: str) -> None:
+        """
+        Ставит ход разговора в очередь на векторизацию и сохранение
+
+        Args:
+            user_id: ID пользователя
+            query: Запрос пользователя
+            response: Ответ ассистента
+        """
+        with self._lock:
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="TurnMemory", daemon=True)
+                self._thread.start()
+        self._queue.put({"user_id": user_id, "query": query, "response": response})
+
+    def _worker(self) -> None:
+        while True:
+            # Ходы, накопившиеся за время предыдущего запроса к API, векторизуются одним пакетом
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._store(batch)
+            except Exception as e:
+                logger.error(f"Error storing conversation turns: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _store(self, turns: List[Dict[str, Any]]) -> None:
+        vectors = self.embeddings.embed_documents([_turn_text(turn["query"], turn["response"]) for turn in turns])
+        for turn, vector in zip(turns, vectors):
+            turn["vector"] = np.asarray(vector, dtype=np.float32).tobytes()
+        ids = self.memory_store.store_conversation_turns(turns, self.limit)
+
+        with self._lock:
+            for turn_id, turn, vector in zip(ids, turns, vectors):
+                index = self._indexes.get(turn["user_id"])
+                if index is not None:
+                    self._add_turns(index, [turn_id], [vector], [turn])
+
+    def _add_turns(self, index: NumpyVectorIndex, ids: List[int], vectors: Any, turns: List[Dict[str, Any]]) -> None:
+        # Вызывается под self._lock. Ход может прийти дважды: из _store и из догрузки в _get_index
+        new = [position for position, turn_id in enumerate(ids) if turn_id not in index]
+        if not new:
+            return
+        index.add(
+            [ids[position] for position in new], [vectors[position] for position in new],
+            [{"query": turns[position]["query"], "response": turns[position]["response"]} for position in new]
+        )
+        if len(index) > self.limit:
+            index.remove(index.ids()[:len(index) - self.limit])
+
+    def _get_index(self, user_id: int) -> Optional[NumpyVectorIndex]:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        turns = self.memory_store.get_conversation_turns(user_id)
+        if not turns:
+            return None
+        vectors = np.vstack([np.frombuffer(turn["vector"], dtype=np.float32) for turn in turns])
+        index = NumpyVectorIndex(vectors.shape[1])
+        index.add(
+            [turn["id"] for turn in turns], vectors,
+            [{"query": turn["query"], "response": turn["response"]} for turn in turns]
+        )
+        with self._lock:
+            index = self._indexes.setdefault(user_id, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.cache_size:
+                self._indexes.popitem(last=False)
+
+        # Ход, сохраненный во время загрузки, не застал индекс в кэше и не был в него добавлен:
+        # догружаем ходы новее загруженных. Более поздние ходы _store добавит сам
+        newer = self.memory_store.get_conversation_turns(user_id, after_id=turns[-1]["id"])
+        if newer:
+            vectors = [np.frombuffer(turn["vector"], dtype=np.float32) for turn in newer]
+            with self._lock:
+                self._add_turns(index, [turn["id"] for turn in newer], vectors, newer)
+        return index
+
+    def recall(self, user_id: int, query: str, k: int = 3, skip_recent: int = 0,
+               embedding: Optional[List[float]] = None) -> List[Dict[str, str]]:
+        """
+        Находит прошлые ходы разговора, близкие по смыслу к запросу
+
+        Args:
+            user_id: ID пользователя
+            query: Текущий запрос
+            k: Максимальное количество ходов
+            skip_recent: Сколько последних ходов не рассматривать (они уже есть в промпте дословно)
+            embedding: Готовый эмбеддинг запроса, если он уже вычислен
+
+        Returns:
+            List[Dict[str, str]]: Ходы [{query, response}, ...] в хронологическом порядке
+        """
+        index = self._get_index(user_id)
+        if index is None or len(index) <= skip_recent:
+            return []
+
+        vector = embedding if embedding is not None else self.embeddings.embed_query(query)
+        with self._lock:
+            recent = set(index.ids()[-skip_recent:]) if skip_recent else set()
+            found = index.search(vector, k + len(recent))
+            ids = [
+                turn_id for turn_id, score in found
+                if turn_id not in recent and score >= MIN_TURN_SIMILARITY
+            ][:k]
+            records = index.get_records(ids)
+        return [records[turn_id] for turn_id in sorted(ids) if turn_id in records]
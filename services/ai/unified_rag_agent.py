@@ -1,18 +1,68 @@
 # services/ai/unified_rag_agent.py
+import asyncio
 import logging
-import json
 import random
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 
+import config
 from .base import AIAgent
 from database.core import Database
-from .gigachat_llm import GigaChatLLM
+from database.signals import on_event_change
+from .llm_router import LLMRouter
 from .memory_store import MemoryStore
-from .embeddings_store import EmbeddingsStore
+from .session_history import SessionHistory
+from .conversation_summary import ConversationSummarizer
+from .turn_memory import TurnMemory
+from .shared_embeddings import SharedEmbeddings
+from .structured_output import parse_llm_json, REQUIRED
+from .gazetteer import RegionGazetteer, CONFIDENT_SCORE
+from .interest_lexicon import InterestLexicon
+from .event_index import EventNameIndex
+from .faq_index import FAQIndex
+from .event_summarizer import EventSummarizer, event_source_hash
+from .pipeline import StageGraph
+from .reranker import EventReranker
+from .recommendations import RecommendationBuilder
 
 logger = logging.getLogger(__name__)
 
+# Схемы JSON-ответов LLM: {поле: (тип, значение по умолчанию)}
+INTENT_SCHEMA = {
+    "type": (str, REQUIRED),
+    "confidence": (float, 0.5),
+    "extracted_info": (dict, dict)
+}
+EVENT_NAME_SCHEMA = {"event_name": (str, ""), "confidence": (float, 0.0)}
+CITY_SCHEMA = {"city": (str, ""), "confidence": (float, 0.0)}
+PROFESSION_SCHEMA = {"profession": (str, ""), "confidence": (float, 0.0)}
+
+# Количество мероприятий, которые ищутся по исходному запросу параллельно с определением намерения
+PREFETCH_K = 5
+
+# Количество кандидатов векторного поиска для переранжирования рекомендаций
+RERANK_CANDIDATES = 20
+
+# Сколько прошлых ходов разговора, близких к запросу по смыслу, добавляется в промпт
+RECALLED_TURNS = 2
+
+# Сколько секунд повторный вызов инструмента с теми же аргументами берется из кэша;
+# при изменении мероприятий кэши сбрасываются
+DEFAULT_SEMANTIC_SEARCH_CACHE_TTL = 60
+DEFAULT_DB_EVENTS_CACHE_TTL = 30
+
+# Вопросы о прошедших мероприятиях ищутся и в архивном уровне векторного индекса
+HISTORY_QUERY_RE = re.compile(
+    r"\b(прошедш\w*|прошл\w*|архив\w*|истори\w*|раньше|ранее|проводил\w*|проходил\w*|состоял\w*|уже был\w*)\b",
+    re.IGNORECASE
+)
+
+
+def _is_history_query(query: str) -> bool:
+    return bool(query and HISTORY_QUERY_RE.search(query))
+
 
 class UnifiedRAGAgent(AIAgent):
     """
@@ -23,9 +73,28 @@ class UnifiedRAGAgent(AIAgent):
     def __init__(self):
         super().__init__(name="UnifiedRAGAgent", autonomy_level=2)
         self.db = Database()
-        self.llm = GigaChatLLM(temperature=0.7)
+        self.llm = LLMRouter()
         self.memory_store = MemoryStore()
-        self.embeddings_store = EmbeddingsStore()
+        self.sessions = SessionHistory()
+        self.conversation_summarizer = ConversationSummarizer()
+        self.turn_memory = TurnMemory()
+        self.embeddings_store = SharedEmbeddings().get_store()
+        self.gazetteer = RegionGazetteer()
+        self.interest_lexicon = InterestLexicon()
+        self.event_index = EventNameIndex()
+        self.faq_index = FAQIndex()
+        self.summarizer = EventSummarizer()
+        self.reranker = EventReranker()
+        self.recommendations = RecommendationBuilder()
+        
+        # Параметры адаптивного поиска: перефразирование запроса только при низкой релевантности
+        self.search_min_relevance = getattr(config, "SEARCH_MIN_RELEVANCE", 0.75)
+        self.search_min_results = getattr(config, "SEARCH_MIN_RESULTS", 2)
+        self.speculative_rewrite = getattr(config, "SEARCH_SPECULATIVE_REWRITE", False)
+        self._search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rewrite")
+        self._search_stats_lock = threading.Lock()
+        self._search_stats = {"searches": 0, "rewrites": 0, "rewrites_skipped": 0, "rewrites_failed": 0,
+                              "rewrites_wasted": 0, "top_score_total": 0.0}
 
         # Определение типов запросов и соответствующих обработчиков
         self.handlers = {
@@ -45,7 +114,8 @@ class UnifiedRAGAgent(AIAgent):
         self.register_tool(
             "semantic_search",
             self._semantic_search,
-            "Выполняет семантический поиск по данным"
+            "Выполняет семантический поиск по данным",
+            cache_ttl=getattr(config, "SEMANTIC_SEARCH_CACHE_TTL", DEFAULT_SEMANTIC_SEARCH_CACHE_TTL)
         )
         
         self.register_tool(
@@ -57,8 +127,15 @@ class UnifiedRAGAgent(AIAgent):
         self.register_tool(
             "get_db_events",
             self._get_db_events,
-            "Получает события напрямую из базы данных"
+            "Получает события напрямую из базы данных",
+            cache_ttl=getattr(config, "DB_EVENTS_CACHE_TTL", DEFAULT_DB_EVENTS_CACHE_TTL)
         )
+        on_event_change(self._on_event_change)
+
+    def _on_event_change(self, event_id: Optional[int], action: str) -> None:
+        # Закэшированные результаты поиска могли устареть
+        self.clear_tool_cache("semantic_search")
+        self.clear_tool_cache("get_db_events")
 
     def _detect_intent(self, query: str, context: Dict = None) -> Dict:
         """
@@ -116,21 +193,18 @@ class UnifiedRAGAgent(AIAgent):
             }}
             """
             
-            response = self.llm.generate(prompt)
-            try:
-                result = json.loads(response)
-                
-                # Проверяем корректность типа
-                if result["type"] in self.handlers:
-                    return {
-                        "type": result["type"],
-                        "confidence": result["confidence"],
-                        "query": query,
-                        "is_follow_up": is_follow_up,
-                        "extracted_info": result.get("extracted_info", {})
-                    }
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM response for intent detection")
+            response = self.llm.generate(prompt, route="intent")
+            result = parse_llm_json(response, INTENT_SCHEMA, "intent")
+
+            # Проверяем корректность типа
+            if result and result["type"] in self.handlers:
+                return {
+                    "type": result["type"],
+                    "confidence": result["confidence"],
+                    "query": query,
+                    "is_follow_up": is_follow_up,
+                    "extracted_info": result["extracted_info"]
+                }
         
         except Exception as e:
             logger.error(f"Error using LLM for intent detection: {e}")
@@ -143,53 +217,149 @@ class UnifiedRAGAgent(AIAgent):
             "is_follow_up": is_follow_up
         }
 
-    def _semantic_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    def _semantic_search(self, query: str, k: int = 5,
+                         prefetched: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """
-        Выполняет семантический поиск по базе мероприятий
+        Выполняет семантический поиск по базе мероприятий.
+        Сначала ищет по исходному запросу; перефразирование через GigaChat
+        используется, только если результаты недостаточно релевантны.
         
         Args:
             query: Запрос для поиска
             k: Количество результатов
+            prefetched: Результаты поиска по этому же запросу, полученные заранее
             
         Returns:
             Список найденных мероприятий
+            
+        Raises:
+            Exception: Ошибка API эмбеддингов или векторного индекса
         """
         try:
             # Проверяем, что запрос не пустой
             if not query or not query.strip():
                 logger.warning("Empty query for semantic search")
                 return []
-                
-            # Используем улучшенный запрос для повышения точности поиска
-            try:
-                enriched_query = self.llm.generate(
-                    f"""
-                    Перефразируй запрос для улучшения семантического поиска мероприятий.
-                    Добавь ключевые слова, связанные с волонтерством и событиями.
-                    
-                    Запрос: "{query}"
-                    
-                    Верни только улучшенный запрос, без объяснений.
-                    """
-                )
-                
-                # Проверяем, что получили содержательный ответ
-                if enriched_query and len(enriched_query.strip()) > 5:
-                    # Выполняем поиск с улучшенным запросом
-                    results = self.embeddings_store.search(enriched_query, k)
-                    
-                    if results:
-                        return results
-            except Exception as inner_e:
-                logger.warning(f"Error enriching query: {inner_e}, falling back to original query")
             
-            # Если произошла ошибка или нет результатов, используем оригинальный запрос
-            return self.embeddings_store.search(query, k)
+            # Архив прошедших мероприятий подключается только для вопросов об истории
+            include_archive = _is_history_query(query)
+            
+            # При SEARCH_SPECULATIVE_REWRITE перефразирование запускается параллельно с первым поиском:
+            # ответ приходит быстрее, но вызов модели оплачивается и для уверенных результатов
+            rewrite_future = None
+            if prefetched is not None:
+                results = prefetched[:k]
+            else:
+                if self.speculative_rewrite:
+                    rewrite_future = self._search_executor.submit(self._rewrite_query, query)
+                results = self.embeddings_store.search(query, k, include_archive=include_archive)
+            top_score = results[0].get("relevance_score", 0.0) if results else 0.0
+            logger.debug(f"Semantic search top relevance {top_score:.3f} with {len(results)} results")
+            
+            if top_score >= self.search_min_relevance and len(results) >= min(k, self.search_min_results):
+                # Уже начатое перефразирование отменить нельзя: вызов модели потрачен впустую
+                if rewrite_future and not rewrite_future.cancel():
+                    self._record_search(top_score, "rewrites_wasted")
+                else:
+                    self._record_search(top_score, "rewrites_skipped")
+                return results
+            
+            enriched_query = rewrite_future.result() if rewrite_future else self._rewrite_query(query)
+            # Неудавшееся перефразирование учитывается отдельно: поиск по нему был нужен, но не выполнен
+            self._record_search(top_score, "rewrites" if enriched_query else "rewrites_failed")
+            if not enriched_query:
+                return results
+            
+            # Объединяем результаты обоих поисков, оставляя лучшую релевантность для каждого мероприятия
+            merged = {event["id"]: event for event in results}
+            for event in self.embeddings_store.search(enriched_query, k, include_archive=include_archive):
+                current = merged.get(event["id"])
+                if not current or event.get("relevance_score", 0.0) > current.get("relevance_score", 0.0):
+                    merged[event["id"]] = event
+            
+            return sorted(merged.values(), key=lambda event: event.get("relevance_score", 0.0), reverse=True)[:k]
                 
         except Exception as e:
+            # Ошибка передается вызывающему коду: use_tool не кэширует ее как пустой результат и учитывает в errors
             logger.error(f"Error performing semantic search: {e}")
+            raise
+
+    def _use_search_tool(self, tool_name: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Вызывает инструмент поиска мероприятий. Ошибка логируется и заменяется пустым
+        списком, чтобы сработал следующий способ поиска; в кэш инструмента она не попадает
+        
+        Args:
+            tool_name: Название инструмента
+            *args, **kwargs: Аргументы инструмента
+            
+        Returns:
+            Список мероприятий
+        """
+        try:
+            return self.use_tool(tool_name, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Tool {tool_name} failed: {e}")
             return []
 
+    def _rewrite_query(self, query: str) -> Optional[str]:
+        """
+        Перефразирует запрос для улучшения семантического поиска
+        
+        Args:
+            query: Исходный запрос
+            
+        Returns:
+            Улучшенный запрос или None, если перефразировать не удалось
+        """
+        try:
+            enriched_query = self.llm.generate(
+                f"""
+                Перефразируй запрос для улучшения семантического поиска мероприятий.
+                Добавь ключевые слова, связанные с волонтерством и событиями.
+                
+                Запрос: "{query}"
+                
+                Верни только улучшенный запрос, без объяснений.
+                """,
+                route="rewrite"
+            )
+            
+            # Проверяем, что получили содержательный ответ
+            if enriched_query and len(enriched_query.strip()) > 5:
+                return enriched_query.strip()
+        except Exception as e:
+            logger.warning(f"Error enriching query: {e}, using original query only")
+        return None
+
+    def _record_search(self, top_score: float, outcome: str) -> None:
+        # outcome: rewrites, rewrites_skipped, rewrites_failed или rewrites_wasted
+        with self._search_stats_lock:
+            self._search_stats["searches"] += 1
+            self._search_stats[outcome] += 1
+            self._search_stats["top_score_total"] += top_score
+
+    def get_search_stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику адаптивного поиска для подбора порогов
+        
+        Returns:
+            Словарь {searches, rewrites, rewrites_skipped, rewrites_failed, rewrites_wasted,
+            skip_rate, avg_top_score}
+        """
+        with self._search_stats_lock:
+            stats = dict(self._search_stats)
+        searches = stats["searches"]
+        return {
+            "searches": searches,
+            "rewrites": stats["rewrites"],
+            "rewrites_skipped": stats["rewrites_skipped"],
+            "rewrites_failed": stats["rewrites_failed"],
+            "rewrites_wasted": stats["rewrites_wasted"],
+            "skip_rate": stats["rewrites_skipped"] / searches if searches else 0.0,
+            "avg_top_score": stats["top_score_total"] / searches if searches else 0.0,
+        }
+
     def _get_db_events(self, filters: Dict = None, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Получает события напрямую из базы данных
@@ -200,6 +370,9 @@ class UnifiedRAGAgent(AIAgent):
             
         Returns:
             Список мероприятий из БД
+            
+        Raises:
+            Exception: Ошибка обращения к базе данных
         """
         try:
             conditions = []
@@ -232,7 +405,7 @@ class UnifiedRAGAgent(AIAgent):
                 cursor = conn.cursor()
                 cursor.execute(f"""
                     SELECT id, name, description, event_date, start_time,
-                           city, creator, participation_points, tags
+                           city, creator, participation_points, participants_count, tags
                     FROM events
                     {sql_where}
                     LIMIT ?
@@ -255,6 +428,7 @@ class UnifiedRAGAgent(AIAgent):
                         "description": db_event['description'],
                         "tags": db_event['tags'],
                         "points": db_event['participation_points'],
+                        "participants_count": db_event['participants_count'],
                     }
                     events.append(event)
                 
@@ -262,7 +436,7 @@ class UnifiedRAGAgent(AIAgent):
                 
         except Exception as e:
             logger.error(f"Error fetching events from database: {e}")
-            return []
+            raise
 
     def _generate_response(self, query: str, events: List[Dict], intent: str, **kwargs) -> str:
         """
@@ -427,14 +601,26 @@ class UnifiedRAGAgent(AIAgent):
         try:
             user_id = kwargs.get("user_id")
             
-            # Проверяем, можем ли найти название мероприятия в запросе
-            event_name = self._extract_event_name(query)
+            # Сначала ищем упоминание мероприятия в локальном индексе названий,
+            # к GigaChat обращаемся, только если индекс ничего не нашел
+            event_id = None
+            event_name = ""
+            match = self.event_index.best(query)
+            if match:
+                event_id, score = match
+                logger.info(f"Event {event_id} resolved locally with score {score:.2f}")
+            else:
+                event_name = self._extract_event_name(query)
+                if event_name:
+                    match = self.event_index.best(event_name)
+                    if match:
+                        event_id = match[0]
             
             # Если не нашли название в запросе напрямую, пробуем семантический поиск
-            if not event_name:
+            if event_id is None and not event_name:
                 try:
                     logger.info(f"Event name not found in query, trying semantic search: {query}")
-                    events = self._semantic_search(query, k=3)
+                    events = self._semantic_search(query, k=3, prefetched=kwargs.get("prefetched_events"))
                     
                     if not events:
                         # Если и семантический поиск не нашел результатов, возвращаем сообщение
@@ -452,12 +638,15 @@ class UnifiedRAGAgent(AIAgent):
             try:
                 with self.db.connect() as conn:
                     cursor = conn.cursor()
-                    # Сначала пробуем найти по точному совпадению
-                    cursor.execute("SELECT * FROM events WHERE name = ?", (event_name,))
+                    if event_id is not None:
+                        cursor.execute("SELECT * FROM events WHERE id = ?", (event_id,))
+                    else:
+                        # Сначала пробуем найти по точному совпадению
+                        cursor.execute("SELECT * FROM events WHERE name = ?", (event_name,))
                     result = cursor.fetchone()
                     
                     # Если не нашли по точному совпадению, пробуем искать по частичному
-                    if not result:
+                    if not result and event_name:
                         cursor.execute("SELECT * FROM events WHERE name LIKE ?", (f"%{event_name}%",))
                         result = cursor.fetchone()
                     
@@ -478,7 +667,7 @@ class UnifiedRAGAgent(AIAgent):
             # Если событие не найдено в базе, используем результаты семантического поиска
             if not event_details:
                 try:
-                    events = self._semantic_search(event_name, k=1)
+                    events = self.use_tool("semantic_search", event_name or query, k=1)
                     if events:
                         event_details = events[0]
                     else:
@@ -590,17 +779,14 @@ class UnifiedRAGAgent(AIAgent):
             4. Игнорируй общие фразы типа "мероприятие", "событие" без конкретного названия
             """
             
-            response = self.llm.generate(prompt)
-            try:
-                result = json.loads(response)
-                event_name = result.get("event_name", "").strip()
-                
-                if event_name and result.get("confidence", 0) > 0.5:
-                    logger.info(f"Extracted event name: '{event_name}' with confidence {result.get('confidence')}")
+            response = self.llm.generate(prompt, route="extraction")
+            result = parse_llm_json(response, EVENT_NAME_SCHEMA, "event_name")
+            if result:
+                event_name = result["event_name"]
+
+                if event_name and result["confidence"] > 0.5:
+                    logger.info(f"Extracted event name: '{event_name}' with confidence {result['confidence']}")
                     return event_name
-                    
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM response for event name extraction")
                 
         except Exception as e:
             logger.error(f"Error extracting event name: {e}")
@@ -631,6 +817,13 @@ class UnifiedRAGAgent(AIAgent):
             description = event.get("description", "Описание отсутствует")
             skills = event.get("skills", "Не указаны")
             
+            # Вместо полного описания используем заранее построенное краткое
+            summary = self._get_fresh_summary(event, self.summarizer.get_summaries([event.get("id")]))
+            if summary:
+                description = summary["summary"]
+                if summary["keywords"]:
+                    description += f" (ключевые слова: {summary['keywords']})"
+            
             # Формируем полное местоположение
             full_location = location
             if city and city not in location:
@@ -697,7 +890,7 @@ class UnifiedRAGAgent(AIAgent):
                 elif isinstance(user_info["tags"], str):
                     user_interests = [tag.strip() for tag in user_info["tags"].split(',')]
                 
-                interests.extend(user_interests)
+                interests.extend(tag for tag in user_interests if tag and tag not in interests)
             
             # Извлекаем город из запроса или информации пользователя
             city = self._extract_city_from_query(query)
@@ -775,7 +968,7 @@ class UnifiedRAGAgent(AIAgent):
                     if interests:
                         search_query += f" по темам {', '.join(interests[:3])}"
                         
-                    events = self._semantic_search(search_query, k=10)
+                    events = self.use_tool("semantic_search", search_query, k=10)
                 except Exception as e:
                     logger.error(f"Error in semantic search for current events: {e}")
             
@@ -845,7 +1038,9 @@ class UnifiedRAGAgent(AIAgent):
 
     def _handle_recommendation(self, query: str, **kwargs) -> str:
         """
-        Обрабатывает запрос на рекомендации мероприятий
+        Обрабатывает запрос на рекомендации мероприятий.
+        Интересы и регион определяются локально, кандидаты из векторного поиска
+        переранжируются по профилю пользователя без дополнительного вызова LLM.
         
         Args:
             query: Запрос пользователя
@@ -854,109 +1049,79 @@ class UnifiedRAGAgent(AIAgent):
         Returns:
             Ответ с рекомендациями
         """
-        user_id = kwargs.get("user_id")
         user_info = kwargs.get("user_info", {})
-        context = kwargs.get("context", {})
         conversation_history = kwargs.get("conversation_history", [])
+        events = []
         
-        # Получаем историю разговора для контекста
-        conversation_context = ""
-        if conversation_history:
-            for msg in conversation_history[-5:]:  # Берем последние 5 сообщений
-                role = "Пользователь" if msg["role"] == "user" else "Ассистент"
-                conversation_context += f"{role}: {msg['content']}\n"
+        # Контекст диалога: краткое содержание ранней части и последние сообщения
+        conversation_context = self.conversation_summarizer.build_context(
+            kwargs.get("user_id"), conversation_history, recalled=kwargs.get("recalled_turns")
+        )
         
-        # Анализируем контекст и запрос с помощью GigaChat
         try:
-            analysis_prompt = f"""
-            Проанализируй диалог с пользователем и определи:
-            1. Профессию или род деятельности пользователя (если упоминается)
-            2. Интересы и предпочтения
-            3. Город или регион (если упоминается)
-            4. Тип мероприятий, которые могут быть интересны
-            
-            Диалог:
-            {conversation_context}
-            
-            Текущий запрос: "{query}"
-            
-            Верни ответ в формате JSON:
-            {{
-                "profession": "название профессии или пустая строка",
-                "interests": ["список", "интересов"],
-                "city": "название города или пустая строка",
-                "event_types": ["список", "типов", "мероприятий"]
-            }}
-            """
-            
-            analysis_result = self.llm.generate(analysis_prompt)
-            try:
-                analysis = json.loads(analysis_result)
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM analysis result")
-                analysis = {
-                    "profession": "",
-                    "interests": [],
-                    "city": "",
-                    "event_types": []
-                }
-            
-            # Формируем поисковый запрос на основе анализа
-            search_terms = []
-            
-            if analysis["profession"]:
-                search_terms.append(analysis["profession"])
+            # Интересы и регион из диалога определяем по локальным справочникам
+            interests = self.interest_lexicon.tags(f"{conversation_context} {query}")
+            region_match = self.gazetteer.best(query) or self.gazetteer.best(conversation_context)
+            city = region_match[0] if region_match and region_match[1] >= CONFIDENT_SCORE else ""
             
-            if analysis["interests"]:
-                search_terms.extend(analysis["interests"])
+            # Запрос без уточнений ("что посоветуешь?") закрываем заранее рассчитанными рекомендациями
+            precomputed = []
+            if not interests and not city and user_info and user_info.get("id"):
+                precomputed = self.recommendations.get_recommendations(user_info["id"], limit=5)
             
-            if analysis["event_types"]:
-                search_terms.extend(analysis["event_types"])
-            
-            # Добавляем город в поиск, если он указан
-            city = analysis["city"]
             if not city and user_info and user_info.get("city"):
                 city = user_info["city"]
             
+            user_tags = [tag for tag in (user_info.get("tags") or []) if tag not in interests] if user_info else []
+            
             # Формируем поисковый запрос
-            search_query = " ".join(search_terms) if search_terms else "интересные мероприятия"
+            search_terms = interests + user_tags
+            search_query = f"{query} {' '.join(search_terms)}".strip() if search_terms else query
             if city:
                 search_query += f" в городе {city}"
             
-            # Поиск мероприятий
-            events = self._semantic_search(search_query, k=5)
+            # Берем с запасом кандидатов и переранжируем их по профилю пользователя
+            candidates = [] if precomputed else self._use_search_tool("semantic_search", search_query, k=RERANK_CANDIDATES)
             
             # Если не нашли через векторный поиск, используем прямой запрос к БД
-            if not events:
+            if not candidates and not precomputed:
                 db_filters = {
                     'city': city,
                     'tags': search_terms,
-                    'query': search_query
+                    'query': query
                 }
-                events = self._get_db_events(db_filters, limit=5)
+                candidates = self._use_search_tool("get_db_events", db_filters, limit=RERANK_CANDIDATES)
             
             # Если все еще нет результатов, ищем любые мероприятия
-            if not events:
-                events = self._get_db_events({'city': city} if city else {}, limit=5)
+            if not candidates and not precomputed:
+                candidates = self._use_search_tool("get_db_events", {'city': city} if city else {}, limit=RERANK_CANDIDATES)
+            
+            if precomputed:
+                events = precomputed
+            else:
+                events = self.reranker.rerank(candidates, user_info=user_info, interests=interests, city=city, limit=5)
             
             # Форматируем информацию о мероприятиях для промпта
             events_text = self._format_events_for_prompt(events)
             
             # Генерируем персонализированный ответ
             response_prompt = f"""
-            На основе анализа диалога с пользователем и найденных мероприятий, сформируй персонализированный ответ.
+            На основе диалога с пользователем и найденных мероприятий, сформируй персонализированный ответ.
             
-            Анализ пользователя:
-            - Профессия: {analysis["profession"]}
-            - Интересы: {", ".join(analysis["interests"])}
-            - Город: {city}
-            - Интересующие типы мероприятий: {", ".join(analysis["event_types"])}
+            Диалог:
+            {conversation_context}
             
-            Найденные мероприятия:
+            Текущий запрос: "{query}"
+            
+            Профиль пользователя:
+            - Интересы: {", ".join(search_terms) if search_terms else "не указаны"}
+            - Город: {city or "не указан"}
+            
+            Найденные мероприятия (от наиболее подходящих):
             {events_text}
             
             Сформируй ответ, который:
-            1. Учитывает профессию и интересы пользователя
+            1. Учитывает профессию (если она упоминалась в диалоге) и интересы пользователя
             2. Предлагает мероприятия, где профессиональные навыки могут быть особенно полезны
             3. Подчеркивает мероприятия, соответствующие интересам пользователя
             4. Учитывает предпочтительный город
@@ -981,77 +1146,42 @@ class UnifiedRAGAgent(AIAgent):
 
     def _extract_interests_from_query(self, query: str) -> List[str]:
         """
-        Извлекает интересы пользователя из запроса с помощью GigaChat API
-        
+        Определяет виды волонтерства из TAGS, упомянутые в запросе,
+        по локальному словарю синонимов без обращения к GigaChat API
+
         Args:
             query: Запрос пользователя
-            
+
         Returns:
-            Список интересов
+            Список тегов по убыванию уверенности
         """
-        try:
-            # Проверяем, что запрос не пустой
-            if not query or not query.strip():
-                return []
-                
-            prompt = f"""
-            Проанализируй запрос пользователя и извлеки его интересы, связанные с волонтерскими мероприятиями.
-            
-            Запрос: "{query}"
-            
-            Учти следующие аспекты:
-            1. Прямые упоминания интересов (например, "интересуюсь экологией", "люблю спорт")
-            2. Косвенные указания на интересы (например, "хочу помогать детям", "ищу мероприятия по уборке")
-            3. Профессиональные интересы (например, "я врач, хочу помогать в медицинских мероприятиях")
-            4. Общие предпочтения (например, "люблю работать с людьми", "интересуюсь образованием")
-            
-            Верни ответ в формате JSON:
-            {{
-                "interests": ["список интересов"],
-                "confidence": число от 0 до 1,
-                "explanation": "краткое объяснение почему выбраны эти интересы"
-            }}
-            
-            Интересы должны быть:
-            - Конкретными и релевантными для волонтерских мероприятий
-            - В единственном числе
-            - Без специальных символов
-            - На русском языке
-            """
-            
-            response = self.llm.generate(prompt)
-            try:
-                result = json.loads(response)
-                interests = result.get("interests", [])
-                
-                # Фильтруем интересы
-                filtered_interests = []
-                for interest in interests:
-                    # Проверяем длину и наличие только букв
-                    if len(interest) >= 3 and interest.isalpha():
-                        filtered_interests.append(interest.lower())
-                
-                return filtered_interests
-                
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM response for interests extraction")
-                return []
-                
-        except Exception as e:
-            logger.error(f"Error extracting interests with LLM: {e}")
+        if not query or not query.strip():
             return []
-    
+        return self.interest_lexicon.tags(query)
+
     def _extract_city_from_query(self, query: str) -> Optional[str]:
         """
-        Извлекает упоминание города из запроса с помощью GigaChat API
+        Извлекает упоминание региона из запроса. Сначала используется локальный
+        справочник регионов; GigaChat API вызывается, только если справочник
+        нашел кандидата, но не уверен в нем.
         
         Args:
             query: Запрос пользователя
             
         Returns:
-            Название города или None
+            Название региона из CITIES (или города, если его нет в справочнике) либо None
         """
         logger.info(f"Extracting city from query: '{query}'")
+
+        local_match = self.gazetteer.best(query)
+        if not local_match:
+            logger.info("No city found in query")
+            return None
+
+        region, score = local_match
+        if score >= CONFIDENT_SCORE:
+            logger.info(f"Extracted region locally: '{region}' with confidence {score:.2f}")
+            return region
         
         try:
             prompt = f"""
@@ -1087,17 +1217,18 @@ class UnifiedRAGAgent(AIAgent):
             3. Используй официальное название города
             """
             
-            response = self.llm.generate(prompt)
-            try:
-                result = json.loads(response)
-                city = result.get("city", "").strip()
-                
-                if city and result.get("confidence", 0) > 0.5:
-                    logger.info(f"Extracted city: '{city}' with confidence {result.get('confidence')}")
+            response = self.llm.generate(prompt, route="extraction")
+            result = parse_llm_json(response, CITY_SCHEMA, "city")
+            if result:
+                city = result["city"]
+
+                if city and result["confidence"] > 0.5:
+                    logger.info(f"Extracted city: '{city}' with confidence {result['confidence']}")
+                    # Приводим ответ модели к названию региона из справочника
+                    llm_match = self.gazetteer.best(city)
+                    if llm_match and llm_match[1] >= CONFIDENT_SCORE:
+                        return llm_match[0]
                     return city
-                    
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM response for city extraction")
                 
         except Exception as e:
             logger.error(f"Error using LLM to extract city: {e}")
@@ -1120,14 +1251,10 @@ class UnifiedRAGAgent(AIAgent):
             user_id = kwargs.get("user_id")
             conversation_history = kwargs.get("conversation_history", [])
             
-            # Получаем последние несколько сообщений для контекста
-            recent_context = ""
-            if len(conversation_history) > 2:
-                # Берем последние 5 сообщений (исключая текущее) для контекста
-                context_messages = conversation_history[-6:-1] if len(conversation_history) > 6 else conversation_history[:-1]
-                for msg in context_messages:
-                    role_prefix = "Пользователь: " if msg["role"] == "user" else "Ассистент: "
-                    recent_context += f"{role_prefix}{msg['content']}\n"
+            # Краткое содержание ранней части разговора и последние сообщения (исключая текущее)
+            recent_context = self.conversation_summarizer.build_context(
+                user_id, conversation_history, exclude_last=True, recalled=kwargs.get("recalled_turns")
+            )
             
             # Проверяем, является ли запрос приветствием
             lower_query = query.lower()
@@ -1172,7 +1299,7 @@ class UnifiedRAGAgent(AIAgent):
                     is_follow_up = True
                     try:
                         # Используем последний ответ как контекст для поиска мероприятий
-                        last_mentioned_events = self._semantic_search(last_bot_message, k=3)
+                        last_mentioned_events = self.use_tool("semantic_search", last_bot_message, k=3)
                     except Exception as e:
                         logger.error(f"Error searching for events in follow-up context: {e}")
             
@@ -1229,9 +1356,9 @@ class UnifiedRAGAgent(AIAgent):
             try:
                 if user_interests:
                     enriched_query = f"{query} {' '.join(user_interests)}"
-                    events = self._semantic_search(enriched_query, k=3)
+                    events = self.use_tool("semantic_search", enriched_query, k=3)
                 else:
-                    events = self._semantic_search(query, k=3)
+                    events = self._semantic_search(query, k=3, prefetched=kwargs.get("prefetched_events"))
             except Exception as e:
                 logger.error(f"Error searching for events in dialogue: {e}")
             
@@ -1286,6 +1413,7 @@ class UnifiedRAGAgent(AIAgent):
         if not events:
             return "Информация о мероприятиях отсутствует."
             
+        summaries = self.summarizer.get_summaries([event.get('id') for event in events])
         events_text = ""
         for idx, event in enumerate(events, 1):
             event_name = event.get('name', 'Неизвестное мероприятие')
@@ -1300,13 +1428,62 @@ class UnifiedRAGAgent(AIAgent):
             events_text += f"Дата и время: {event_date}, {event_time}\n"
             events_text += f"Город: {event_city}\n"
             events_text += f"Теги: {event_tags}\n"
-            events_text += f"Описание: {event_desc}\n\n"
+            summary = self._get_fresh_summary(event, summaries)
+            if summary:
+                events_text += f"Кратко: {summary['summary']}\n"
+                if summary["keywords"]:
+                    events_text += f"Ключевые слова: {summary['keywords']}\n"
+                events_text += "\n"
+            else:
+                events_text += f"Описание: {event_desc}\n\n"
             
         return events_text
 
+    @staticmethod
+    def _get_fresh_summary(event: Dict, summaries: Dict[int, Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """
+        Возвращает краткое описание мероприятия, если оно построено по текущим данным
+        
+        Args:
+            event: Словарь с информацией о мероприятии
+            summaries: Краткие описания по ID мероприятий
+            
+        Returns:
+            Краткое описание или None, если его нет или оно устарело
+        """
+        summary = summaries.get(event.get("id"))
+        if not summary:
+            return None
+        # Если описание мероприятия изменилось, а новое краткое еще не готово, используем исходный текст
+        if event.get("description") and summary["source_hash"] != event_source_hash(event):
+            return None
+        return summary
+
     def process_query(self, query: str, **kwargs) -> str:
         """
-        Обрабатывает запрос пользователя
+        Обрабатывает запрос пользователя из синхронного кода.
+        Если в текущем потоке уже работает цикл событий, запрос выполняется
+        в отдельном потоке со своим циклом (asyncio.run внутри цикла недопустим);
+        асинхронный код должен вызывать aprocess_query напрямую.
+        
+        Args:
+            query: Запрос пользователя
+            **kwargs: Дополнительные параметры
+            
+        Returns:
+            Ответ на запрос
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aprocess_query(query, **kwargs))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.aprocess_query(query, **kwargs)).result()
+
+    async def aprocess_query(self, query: str, **kwargs) -> str:
+        """
+        Обрабатывает запрос пользователя. Независимые этапы (загрузка профиля,
+        поиск по исходному запросу, определение намерения) выполняются одновременно.
         
         Args:
             query: Запрос пользователя
@@ -1318,73 +1495,214 @@ class UnifiedRAGAgent(AIAgent):
         try:
             # Получаем идентификатор пользователя
             user_id = kwargs.get("user_id")
-            
-            # Получаем историю разговора
             conversation_history = kwargs.get("conversation_history", [])
-            if not conversation_history and user_id:
-                # Если история не передана, но известен ID пользователя, 
-                # пытаемся загрузить историю из хранилища
-                conversation_history = self.memory_store.get_conversation(user_id) or []
-            
-            # Анализируем предыдущие сообщения для определения контекста
-            context = self._analyze_conversation_context(conversation_history, query)
             
-            # Сохраняем текущий запрос в истории
-            if user_id:
-                conversation_history.append({"role": "user", "content": query})
-                self.memory_store.save_conversation(user_id, conversation_history)
-            
-            # Определяем намерение пользователя с учетом контекста
-            intent_info = self._detect_intent(query, context)
-            logger.debug(f"Detected intent: {intent_info['type']} with confidence {intent_info['confidence']}")
-            
-            # Проверяем, является ли это продолжением предыдущего диалога
-            if context.get("is_follow_up") and context.get("previous_intent"):
-                # Если это уточняющий запрос, используем предыдущее намерение
-                previous_intent = context.get("previous_intent")
-                if previous_intent in self.handlers and intent_info["confidence"] < 0.7:
-                    intent_info["type"] = previous_intent
-                    logger.debug(f"Using previous intent: {previous_intent} for follow-up question")
-            
-            # Получаем соответствующий обработчик
-            handler = self.handlers.get(intent_info["type"], self._handle_dialogue)
-            
-            # Добавляем контекст разговора в параметры
-            kwargs["conversation_history"] = conversation_history
-            kwargs["context"] = context
-            
-            # Получаем информацию о пользователе, если доступна
-            if user_id:
-                user_info = self._get_user_info(user_id)
-                if user_info:
-                    kwargs["user_info"] = user_info
-            
-            # Очищаем kwargs от возможного дублирования intent
-            handler_kwargs = {k: v for k, v in kwargs.items() if k != 'intent'}
-            
-            # Вызываем обработчик с явным указанием intent, избегая дублирования
-            response = handler(query, intent=intent_info["type"], **handler_kwargs)
-            
-            # Сохраняем ответ в истории
-            if user_id:
-                conversation_history.append({"role": "assistant", "content": response})
-                self.memory_store.save_conversation(user_id, conversation_history)
-            
-            # Сохраняем цепочку рассуждений, если включена отладка
-            if logger.isEnabledFor(logging.DEBUG):
-                reasoning_steps = self.reason(query, context)
-                self.memory_store.store_reasoning_chain(
-                    agent_id=self.name,
-                    query=query,
-                    reasoning_steps=reasoning_steps,
-                    result=response[:100] + "..." if len(response) > 100 else response
+            # Вопросы о работе бота отвечаем из справочника без обращения к GigaChat
+            # Проверка упоминания мероприятия может перестроить индекс названий, поэтому вне цикла событий
+            faq_answer = await asyncio.to_thread(self.faq_index.answer, query)
+            if faq_answer:
+                conversation = await asyncio.to_thread(self._load_conversation, query, user_id, conversation_history)
+                await asyncio.to_thread(
+                    self._store_response, query, user_id, conversation["history"], conversation["context"], faq_answer,
+                    include_query=True, intent_info={"type": "faq", "confidence": 1.0}
                 )
-            
-            return response
+                return faq_answer
+            
+            graph = StageGraph("process_query")
+            graph.add_stage(
+                "conversation",
+                lambda _: self._load_conversation(query, user_id, conversation_history)
+            )
+            graph.add_stage(
+                "save_query",
+                lambda results: self._save_history(user_id, results["conversation"]["history"]),
+                depends_on=["conversation"], optional=True
+            )
+            graph.add_stage(
+                "intent",
+                lambda results: self._resolve_intent(query, results["conversation"]["context"]),
+                depends_on=["conversation"]
+            )
+            graph.add_stage(
+                "user_info",
+                lambda _: self._get_user_info(user_id) if user_id else {},
+                optional=True
+            )
+            # Запрос векторизуется один раз: эмбеддинг нужен и поиску мероприятий, и памяти разговоров
+            graph.add_stage(
+                "embed_query",
+                lambda _: self.embeddings_store.embeddings.embed_query(query),
+                optional=True
+            )
+            # Поиск по исходному запросу нужен большинству обработчиков, поэтому выполняется заранее
+            graph.add_stage(
+                "retrieval",
+                lambda results: self.embeddings_store.search(
+                    query, PREFETCH_K, include_archive=_is_history_query(query), embedding=results["embed_query"]
+                ),
+                depends_on=["embed_query"], optional=True
+            )
+            graph.add_stage(
+                "recall",
+                lambda results: self._recall_turns(query, user_id, results["embed_query"]),
+                depends_on=["embed_query"], optional=True
+            )
+            graph.add_stage(
+                "handler",
+                lambda results: self._run_handler(query, results, kwargs),
+                depends_on=["conversation", "intent", "user_info", "retrieval", "recall"]
+            )
+            graph.add_stage(
+                "store_response",
+                lambda results: self._store_response(
+                    query, user_id, results["conversation"]["history"],
+                    results["conversation"]["context"], results["handler"],
+                    intent_info=results.get("intent")
+                ),
+                # Ответ дописывается в сессию после запроса, поэтому ждет save_query
+                depends_on=["conversation", "save_query", "handler"], optional=True
+            )
+            
+            results = await graph.run(label=f"user {user_id}" if user_id else "")
+            return results["handler"]
             
         except Exception as e:
             logger.error(f"Error processing query: {e}")
             return "Извините, произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте переформулировать вопрос или задать другой вопрос."
+
+    def _load_conversation(self, query: str, user_id: Optional[int], conversation_history: List[Dict]) -> Dict:
+        """
+        Загружает историю разговора, анализирует контекст и добавляет в историю текущий запрос
+        
+        Args:
+            query: Запрос пользователя
+            user_id: ID пользователя
+            conversation_history: История, переданная вызывающим кодом
+            
+        Returns:
+            Словарь {"history": история, "context": контекст разговора}
+        """
+        if conversation_history:
+            conversation_history = list(conversation_history)
+        elif user_id:
+            # Если история не передана, но известен ID пользователя,
+            # берем окно истории из сессии (при первом обращении оно загружается из memory.db)
+            conversation_history = self.sessions.get(user_id)
+        else:
+            conversation_history = []
+        
+        # Анализируем предыдущие сообщения для определения контекста
+        context = self._analyze_conversation_context(conversation_history, query)
+        
+        if user_id:
+            conversation_history.append({"role": "user", "content": query})
+        return {"history": conversation_history, "context": context}
+
+    def _save_history(self, user_id: Optional[int], conversation_history: List[Dict]) -> None:
+        # В сессию дописывается только текущий запрос
+        if user_id and conversation_history:
+            self.sessions.append(user_id, conversation_history[-1:])
+
+    def _resolve_intent(self, query: str, context: Dict) -> Dict:
+        """
+        Определяет намерение пользователя с учетом контекста разговора
+        
+        Args:
+            query: Запрос пользователя
+            context: Контекст разговора
+            
+        Returns:
+            Информация о намерении
+        """
+        intent_info = self._detect_intent(query, context)
+        logger.debug(f"Detected intent: {intent_info['type']} with confidence {intent_info['confidence']}")
+        
+        # Проверяем, является ли это продолжением предыдущего диалога
+        if context.get("is_follow_up") and context.get("previous_intent"):
+            # Если это уточняющий запрос, используем предыдущее намерение
+            previous_intent = context.get("previous_intent")
+            if previous_intent in self.handlers and intent_info["confidence"] < 0.7:
+                intent_info["type"] = previous_intent
+                logger.debug(f"Using previous intent: {previous_intent} for follow-up question")
+        return intent_info
+
+    def _recall_turns(self, query: str, user_id: Optional[int], embedding: Optional[List[float]] = None) -> List[Dict]:
+        """
+        Находит прошлые ходы разговора, относящиеся к запросу.
+        Последние ходы пропускаются: они попадают в промпт дословно.
+        
+        Args:
+            query: Запрос пользователя
+            user_id: ID пользователя
+            embedding: Эмбеддинг запроса, вычисленный на этапе embed_query
+            
+        Returns:
+            Ходы [{query, response}, ...]
+        """
+        if not user_id:
+            return []
+        skip_recent = self.conversation_summarizer.tail_messages // 2
+        return self.turn_memory.recall(user_id, query, k=RECALLED_TURNS, skip_recent=skip_recent, embedding=embedding)
+
+    def _run_handler(self, query: str, results: Dict[str, Any], kwargs: Dict[str, Any]) -> str:
+        """
+        Вызывает обработчик намерения с результатами предыдущих этапов
+        
+        Args:
+            query: Запрос пользователя
+            results: Результаты этапов conversation, intent, user_info, retrieval
+            kwargs: Параметры, переданные в aprocess_query
+            
+        Returns:
+            Ответ обработчика
+        """
+        intent_info = results["intent"]
+        handler = self.handlers.get(intent_info["type"], self._handle_dialogue)
+        
+        # Очищаем kwargs от возможного дублирования intent
+        handler_kwargs = {k: v for k, v in kwargs.items() if k != 'intent'}
+        handler_kwargs["conversation_history"] = results["conversation"]["history"]
+        handler_kwargs["context"] = results["conversation"]["context"]
+        if results.get("user_info"):
+            handler_kwargs["user_info"] = results["user_info"]
+        if results.get("retrieval") is not None:
+            handler_kwargs["prefetched_events"] = results["retrieval"]
+        if results.get("recall"):
+            handler_kwargs["recalled_turns"] = results["recall"]
+        
+        # Вызываем обработчик с явным указанием intent, избегая дублирования
+        return handler(query, intent=intent_info["type"], **handler_kwargs)
+
+    def _store_response(self, query: str, user_id: Optional[int], conversation_history: List[Dict],
+                        context: Dict, response: str, include_query: bool = False,
+                        intent_info: Optional[Dict] = None) -> None:
+        """
+        Сохраняет ответ в истории разговора и цепочку рассуждений при отладке
+        
+        Args:
+            query: Запрос пользователя
+            user_id: ID пользователя
+            conversation_history: История разговора с текущим запросом
+            context: Контекст разговора
+            response: Ответ пользователю
+            include_query: Сохранить вместе с ответом и текущий запрос
+            intent_info: Намерение, определенное при обработке запроса
+        """
+        if user_id:
+            conversation_history.append({"role": "assistant", "content": response})
+            self.sessions.append(
+                user_id, conversation_history[-2:] if include_query else conversation_history[-1:]
+            )
+            # Длинный разговор сворачивается в краткое содержание в фоне
+            self.conversation_summarizer.schedule(user_id, conversation_history)
+            self.turn_memory.add_turn(user_id, query, response)
+        
+        # Цепочка рассуждений для выборки запросов записывается в фоне
+        self.telemetry.record_reasoning(
+            self.name, query,
+            lambda: self.reason(query, context, intent_info=intent_info),
+            result=response[:100] + "..." if len(response) > 100 else response
+        )
     
     def _analyze_conversation_context(self, conversation_history: List[Dict], current_query: str) -> Dict:
         """
@@ -1493,13 +1811,14 @@ class UnifiedRAGAgent(AIAgent):
             logger.error(f"Error fetching user info: {e}")
             return {}
 
-    def reason(self, query: str, context: Dict = None) -> List[str]:
+    def reason(self, query: str, context: Dict = None, intent_info: Optional[Dict] = None) -> List[str]:
         """
         Построение цепочки рассуждений для обработки запроса
         
         Args:
             query: Запрос пользователя
             context: Контекстная информация
+            intent_info: Уже определенное намерение; без него намерение определяется заново
             
         Returns:
             Список шагов рассуждения
@@ -1510,7 +1829,8 @@ class UnifiedRAGAgent(AIAgent):
         reasoning_steps.append(f"Анализирую запрос пользователя: {query}")
         
         # 2. Определение намерения
-        intent_info = self._detect_intent(query, context)
+        if intent_info is None:
+            intent_info = self._detect_intent(query, context)
         reasoning_steps.append(f"Определен тип запроса: {intent_info['type']} с уверенностью {intent_info['confidence']}")
         
         # 3. Поиск релевантной информации
@@ -1567,17 +1887,14 @@ class UnifiedRAGAgent(AIAgent):
             4. Если упомянуто образование, используй соответствующую профессию
             """
             
-            response = self.llm.generate(prompt)
-            try:
-                result = json.loads(response)
-                profession = result.get("profession", "").strip()
-                
-                if profession and result.get("confidence", 0) > 0.5:
-                    logger.info(f"Extracted profession: '{profession}' with confidence {result.get('confidence')}")
+            response = self.llm.generate(prompt, route="extraction")
+            result = parse_llm_json(response, PROFESSION_SCHEMA, "profession")
+            if result:
+                profession = result["profession"]
+
+                if profession and result["confidence"] > 0.5:
+                    logger.info(f"Extracted profession: '{profession}' with confidence {result['confidence']}")
                     return profession.lower()
-                    
-            except json.JSONDecodeError:
-                logger.error("Failed to parse LLM response for profession extraction")
                 
         except Exception as e:
             logger.error(f"Error extracting profession with LLM: {e}")
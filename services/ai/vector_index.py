@@ -0,0 +1,468 @@
+# services/ai/vector_index.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Сколько предыдущих поколений индекса хранится на диске для процессов, которые еще их читают
+KEEP_GENERATIONS = 2
+
+
+def normalize_rows(vectors: Any) -> np.ndarray:
+    """
+    Приводит векторы к float32 и единичной длине, чтобы скалярное произведение было косинусным сходством
+
+    Args:
+        vectors: Вектор или матрица векторов
+
+    Returns:
+        np.ndarray: Матрица нормированных векторов
+    """
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+class VectorIndex:
+    """
+    Базовый класс индекса векторов мероприятий.
+    Хранит нормированные векторы с ID мероприятий и записи с метаданными,
+    ищет ближайшие векторы по косинусному сходству.
+    Индекс, открытый из опубликованного файла, доступен только для чтения:
+    векторы отображаются в память, а записи читаются из SQLite по запросу,
+    поэтому несколько процессов используют одни и те же страницы кэша ОС.
+    При первом изменении такой индекс копируется в память.
+    """
+    backend = ""
+    extension = ""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.read_only = False
+        self.generation: Optional[str] = None
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._records_db: Optional[sqlite3.Connection] = None
+        self._records_lock = threading.Lock()
+        self._ids: set = set()
+
+    # Методы хранения векторов, которые реализуют конкретные индексы
+
+    def _add_vectors(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _remove_vectors(self, ids: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _search_vectors(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        raise NotImplementedError
+
+    def _all_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def _make_writable(self) -> None:
+        raise NotImplementedError
+
+    def _write_vectors(self, path: str) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def _read_vectors(cls, path: str, dimension: int, mmap: bool) -> "VectorIndex":
+        raise NotImplementedError
+
+    # Общие операции
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, event_id: int) -> bool:
+        return int(event_id) in self._ids
+
+    def ids(self) -> List[int]:
+        return sorted(self._ids)
+
+    def add(self, ids: List[int], vectors: Any, records: List[Dict[str, Any]]) -> None:
+        """
+        Добавляет или заменяет векторы мероприятий
+
+        Args:
+            ids: ID мероприятий
+            vectors: Векторы в том же порядке
+            records: Метаданные мероприятий (название, дата, хэш текста и т.д.)
+        """
+        if not ids:
+            return
+        self._ensure_writable()
+        self.remove([event_id for event_id in ids if event_id in self])
+        id_array = np.asarray(ids, dtype=np.int64)
+        self._add_vectors(id_array, normalize_rows(vectors))
+        for event_id, record in zip(ids, records):
+            self._records[int(event_id)] = dict(record)
+        self._ids.update(int(event_id) for event_id in ids)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        """
+        Удаляет векторы мероприятий; отсутствующие ID пропускаются
+
+        Args:
+            ids: ID мероприятий
+        """
+        present = [int(event_id) for event_id in ids if event_id in self]
+        if not present:
+            return
+        self._ensure_writable()
+        self._remove_vectors(np.asarray(present, dtype=np.int64))
+        for event_id in present:
+            self._records.pop(event_id, None)
+            self._ids.discard(event_id)
+
+    def search(self, vector: Any, k: int) -> List[Tuple[int, float]]:
+        """
+        Ищет ближайшие векторы
+
+        Args:
+            vector: Вектор запроса
+            k: Количество результатов
+
+        Returns:
+            List[Tuple[int, float]]: Пары (ID мероприятия, косинусное сходство) по убыванию сходства
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        return self._search_vectors(normalize_rows(vector)[0], k)
+
+    def get_vectors(self) -> Dict[int, np.ndarray]:
+        """
+        Возвращает векторы всех мероприятий индекса
+
+        Returns:
+            Dict[int, np.ndarray]: {ID мероприятия: нормированный вектор}
+        """
+        if not len(self):
+            return {}
+        ids, vectors = self._all_vectors()
+        return {int(event_id): vectors[i] for i, event_id in enumerate(ids)}
+
+    def get_records(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Возвращает метаданные мероприятий
+
+        Args:
+            ids: ID мероприятий
+
+        Returns:
+            Dict[int, Dict[str, Any]]: {ID мероприятия: метаданные}
+        """
+        ids = [int(event_id) for event_id in ids if event_id in self]
+        if self._records_db is None:
+            return {event_id: self._records[event_id] for event_id in ids if event_id in self._records}
+        if not ids:
+            return {}
+        placeholders = ",".join("?" for _ in ids)
+        with self._records_lock:
+            rows = self._records_db.execute(
+                f"SELECT id, data FROM records WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    def copy(self) -> "VectorIndex":
+        """
+        Возвращает независимую копию индекса в памяти, которую можно
+        сохранять без блокировки, пока исходный индекс продолжает меняться
+
+        Returns:
+            VectorIndex: Копия индекса того же типа
+        """
+        index = create_index(self.backend, self.dimension)
+        if len(self):
+            ids, vectors = self._all_vectors()
+            ids = [int(event_id) for event_id in ids]
+            records = self.get_records(ids)
+            index.add(ids, np.array(vectors, dtype=np.float32), [records[event_id] for event_id in ids])
+        return index
+
+    def _ensure_writable(self) -> None:
+        """Копирует опубликованный индекс в память перед первым изменением"""
+        if not self.read_only:
+            return
+        self._records = self.get_records(self._ids)
+        self._make_writable()
+        if self._records_db is not None:
+            self._records_db.close()
+            self._records_db = None
+        self.read_only = False
+
+    def save(self, prefix: str) -> None:
+        """
+        Сохраняет векторы в файл prefix + extension и метаданные в SQLite prefix + ".db"
+
+        Args:
+            prefix: Путь к файлам без расширения
+        """
+        self._write_vectors(prefix + self.extension)
+        records = self.get_records(self._ids)
+        path = prefix + ".db"
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("CREATE TABLE records (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            conn.executemany(
+                "INSERT INTO records (id, data) VALUES (?, ?)",
+                [(event_id, json.dumps(record, ensure_ascii=False)) for event_id, record in records.items()]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @classmethod
+    def load(cls, prefix: str, dimension: int, mmap: bool = True) -> "VectorIndex":
+        """
+        Открывает сохраненный индекс только для чтения
+
+        Args:
+            prefix: Путь к файлам без расширения
+            dimension: Размерность векторов
+            mmap: Отображать файл векторов в память вместо чтения
+
+        Returns:
+            VectorIndex: Индекс, метаданные которого читаются из SQLite
+        """
+        index = cls._read_vectors(prefix + cls.extension, dimension, mmap)
+        conn = sqlite3.connect(f"file:{prefix}.db?mode=ro", uri=True, check_same_thread=False)
+        index._records_db = conn
+        index._ids = {row[0] for row in conn.execute("SELECT id FROM records")}
+        index.read_only = True
+        return index
+
+
+class FaissVectorIndex(VectorIndex):
+    """
+    Индекс на FAISS: IndexIDMap2 поверх точного IndexFlatIP.
+    Опубликованный файл открывается с флагами FAISS для отображения в память и только для чтения.
+    """
+    backend = "faiss"
+    extension = ".faiss"
+
+    def __init__(self, dimension: int, index: Any = None):
+        super().__init__(dimension)
+        import faiss
+        self._faiss = faiss
+        self.index = index if index is not None else faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+    def _add_vectors(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self.index.add_with_ids(vectors, ids)
+
+    def _remove_vectors(self, ids: np.ndarray) -> None:
+        self.index.remove_ids(ids)
+
+    def _search_vectors(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        scores, ids = self.index.search(vector[None, :], k)
+        return [(int(event_id), float(score)) for event_id, score in zip(ids[0], scores[0]) if event_id != -1]
+
+    def _all_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids = self._faiss.vector_to_array(self.index.id_map)
+        return ids, self.index.index.reconstruct_n(0, self.index.ntotal)
+
+    def _make_writable(self) -> None:
+        self.index = self._faiss.clone_index(self.index)
+
+    def _write_vectors(self, path: str) -> None:
+        self._faiss.write_index(self.index, path)
+
+    @classmethod
+    def _read_vectors(cls, path: str, dimension: int, mmap: bool) -> "FaissVectorIndex":
+        import faiss
+        if mmap:
+            # Для плоских индексов отображение в память поддерживается флагом IO_FLAG_MMAP_IFC (FAISS >= 1.8)
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            try:
+                return cls(dimension, faiss.read_index(path, flags))
+            except RuntimeError as e:
+                logger.warning(f"FAISS index {path} can not be memory-mapped, reading it into memory: {e}")
+        return cls(dimension, faiss.read_index(path))
+
+
+class NumpyVectorIndex(VectorIndex):
+    """
+    Точный индекс на NumPy для небольших каталогов: векторы хранятся одним непрерывным
+    массивом float32, поиск - матрично-векторное произведение и argpartition.
+    Не импортирует FAISS; опубликованный файл .npy открывается через np.load(mmap_mode="r").
+    """
+    backend = "numpy"
+    extension = ".npy"
+
+    def __init__(self, dimension: int, ids: Optional[np.ndarray] = None, vectors: Optional[np.ndarray] = None):
+        super().__init__(dimension)
+        self._id_array = ids if ids is not None else np.empty(0, dtype=np.int64)
+        self._vectors = vectors if vectors is not None else np.empty((0, dimension), dtype=np.float32)
+
+    def _add_vectors(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self._id_array = np.concatenate((self._id_array, ids))
+        self._vectors = np.ascontiguousarray(np.vstack((self._vectors, vectors)), dtype=np.float32)
+
+    def _remove_vectors(self, ids: np.ndarray) -> None:
+        keep = ~np.isin(self._id_array, ids)
+        self._id_array = self._id_array[keep]
+        self._vectors = np.ascontiguousarray(self._vectors[keep])
+
+    def _search_vectors(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        scores = self._vectors @ vector
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self._id_array[i]), float(scores[i])) for i in top]
+
+    def _all_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._id_array, np.asarray(self._vectors)
+
+    def _make_writable(self) -> None:
+        self._id_array = np.array(self._id_array)
+        self._vectors = np.array(self._vectors)
+
+    @staticmethod
+    def _ids_path(path: str) -> str:
+        return path[:-len(NumpyVectorIndex.extension)] + ".ids" + NumpyVectorIndex.extension
+
+    def _write_vectors(self, path: str) -> None:
+        np.save(path, np.ascontiguousarray(self._vectors, dtype=np.float32))
+        np.save(self._ids_path(path), self._id_array.astype(np.int64))
+
+    @classmethod
+    def _read_vectors(cls, path: str, dimension: int, mmap: bool) -> "NumpyVectorIndex":
+        mode = "r" if mmap else None
+        return cls(dimension, np.load(cls._ids_path(path), mmap_mode=mode), np.load(path, mmap_mode=mode))
+
+
+VECTOR_INDEX_BACKENDS = {
+    FaissVectorIndex.backend: FaissVectorIndex,
+    NumpyVectorIndex.backend: NumpyVectorIndex,
+}
+
+
+def create_index(backend: str, dimension: int) -> VectorIndex:
+    """
+    Создает пустой индекс
+
+    Args:
+        backend: Название реализации из VECTOR_INDEX_BACKENDS
+        dimension: Размерность векторов
+
+    Returns:
+        VectorIndex: Пустой индекс
+    """
+    if backend not in VECTOR_INDEX_BACKENDS:
+        raise ValueError(f"Unknown vector index backend '{backend}'")
+    return VECTOR_INDEX_BACKENDS[backend](dimension)
+
+
+def _manifest_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.json")
+
+
+def read_manifest(directory: str, name: str) -> Optional[Dict[str, Any]]:
+    """
+    Читает описание текущего опубликованного поколения индекса
+
+    Args:
+        directory: Каталог индексов
+        name: Название индекса
+
+    Returns:
+        Optional[Dict[str, Any]]: {"generation", "backend", "dimension", "count"} или None
+    """
+    try:
+        with open(_manifest_path(directory, name), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading vector index manifest {name}: {e}")
+        return None
+
+
+def publish_index(index: VectorIndex, directory: str, name: str) -> str:
+    """
+    Публикует индекс: сохраняет новое поколение файлов и атомарно подменяет манифест.
+    Процессы, открывшие предыдущее поколение, продолжают читать его до перезагрузки.
+
+    Args:
+        index: Индекс для публикации
+        directory: Каталог индексов
+        name: Название индекса
+
+    Returns:
+        str: Название опубликованного поколения
+    """
+    os.makedirs(directory, exist_ok=True)
+    generation = f"{name}-{time.time_ns()}"
+    index.save(os.path.join(directory, generation))
+
+    manifest = {
+        "generation": generation,
+        "backend": index.backend,
+        "dimension": index.dimension,
+        "count": len(index),
+    }
+    temp_path = os.path.join(directory, f".{name}.json.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, _manifest_path(directory, name))
+    index.generation = generation
+
+    _remove_old_generations(directory, name, generation)
+    return generation
+
+
+def _remove_old_generations(directory: str, name: str, current: str) -> None:
+    # Файлы поколения отличаются только расширениями (.faiss, .npy, .ids.npy, .db)
+    generations = sorted(
+        {entry.split(".", 1)[0] for entry in os.listdir(directory)
+         if entry.startswith(f"{name}-") and not entry.endswith(".tmp")},
+        reverse=True
+    )
+    for generation in generations:
+        if generation == current:
+            continue
+        # Имена поколений содержат время публикации, поэтому сортировка идет от новых к старым
+        if generations.index(generation) < KEEP_GENERATIONS:
+            continue
+        for entry in os.listdir(directory):
+            if entry.split(".", 1)[0] == generation:
+                try:
+                    os.remove(os.path.join(directory, entry))
+                except OSError as e:
+                    logger.warning(f"Could not remove old vector index file {entry}: {e}")
+
+
+def open_published_index(directory: str, name: str) -> Optional[VectorIndex]:
+    """
+    Открывает текущее опубликованное поколение индекса только для чтения
+
+    Args:
+        directory: Каталог индексов
+        name: Название индекса
+
+    Returns:
+        Optional[VectorIndex]: Индекс или None, если он еще не публиковался
+    """
+    manifest = read_manifest(directory, name)
+    if not manifest:
+        return None
+    index_class = VECTOR_INDEX_BACKENDS.get(manifest["backend"])
+    if not index_class:
+        logger.warning(f"Vector index {name} was published by unknown backend '{manifest['backend']}'")
+        return None
+    index = index_class.load(os.path.join(directory, manifest["generation"]), manifest["dimension"])
+    index.generation = manifest["generation"]
+    return index
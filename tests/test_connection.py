@@ -0,0 +1,29 @@
+import gc
+import threading
+
+from database.connection import ConnectionPool
+
+
+def test_connection_of_finished_thread_is_closed(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    connections = []
+
+    def work():
+        with pool.connection() as conn:
+            conn.execute("SELECT 1")
+            connections.append(conn)
+
+    for _ in range(5):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert len(pool._connections) == 0
+    for conn in connections:
+        try:
+            conn.execute("SELECT 1")
+        except Exception as e:
+            assert "closed" in str(e)
+        else:
+            raise AssertionError("connection of a finished thread is still open")
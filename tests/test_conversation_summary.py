@@ -0,0 +1,60 @@
+import pytest
+
+from services.ai import session_history
+from services.ai.conversation_summary import ConversationSummarizer
+from services.ai.memory_store import MemoryStore
+from services.ai.session_history import SessionHistory
+
+
+@pytest.fixture
+def summarizer(tmp_path, monkeypatch):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    monkeypatch.setattr(SessionHistory, "_instance", None)
+    monkeypatch.setattr(ConversationSummarizer, "_instance", None)
+    monkeypatch.setattr(session_history, "MemoryStore", lambda: store)
+    sessions = SessionHistory()
+    summarizer = object.__new__(ConversationSummarizer)
+    summarizer._initialized = True
+    summarizer.memory_store = store
+    summarizer.token_threshold = 1000
+    summarizer.tail_messages = 4
+    return summarizer, sessions, store
+
+
+def _messages(start, count):
+    return [
+        {"role": "user" if number % 2 == 0 else "assistant", "content": f"сообщение {number}"}
+        for number in range(start, start + count)
+    ]
+
+
+def test_messages_after_summary_stay_in_context(summarizer):
+    summarizer, sessions, store = summarizer
+    sessions.append(1, _messages(0, 10))
+    sessions.flush()
+    summarized = store.get_conversation_messages(1)[3]["id"]
+    store.save_conversation_summary(1, "обсуждали субботник", summarized)
+    sessions.append(1, _messages(10, 2))
+
+    context = summarizer.build_context(1, sessions.get(1))
+
+    assert "обсуждали субботник" in context
+    # Все сообщения после содержания (4..11), а не только последние четыре
+    for number in range(4, 12):
+        assert f"сообщение {number}\n" in context
+    assert "сообщение 2\n" not in context
+
+
+def test_reset_drops_previous_summary(summarizer):
+    summarizer, sessions, store = summarizer
+    sessions.append(1, _messages(0, 6))
+    sessions.flush()
+    store.save_conversation_summary(1, "обсуждали субботник", store.get_conversation_messages(1)[1]["id"])
+
+    sessions.reset(1)
+    sessions.append(1, _messages(100, 1))
+    context = summarizer.build_context(1, sessions.get(1))
+
+    assert "обсуждали субботник" not in context
+    assert "сообщение 5\n" not in context
+    assert "сообщение 100\n" in context
@@ -0,0 +1,58 @@
+from database.core import Database
+from services.ai import event_similarity
+from services.ai.event_similarity import EventSimilarityGraph
+
+
+def _event(name, description, tags):
+    return {
+        "name": name, "date": "01.01.2099", "time": "10:00", "city": "Москва",
+        "description": description, "tags": tags
+    }
+
+
+def _neighbor_ids(db, event_id):
+    return [event["id"] for event in db.get_event_neighbors(event_id)]
+
+
+def test_edit_updates_own_and_reverse_neighbor_lists(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "events.db")
+    monkeypatch.setattr(event_similarity, "Database", lambda: Database(db_path))
+    monkeypatch.setattr(EventSimilarityGraph, "_instance", None)
+    graph = EventSimilarityGraph()
+    db = graph.db
+
+    park = db.add_event(_event("Уборка парка", "Собираем мусор в парке", "Экологическое"))
+    forest = db.add_event(_event("Уборка леса", "Собираем мусор в лесу", "Экологическое"))
+    concert = db.add_event(_event("Благотворительный концерт", "Музыкальный вечер для детей", "Культурное"))
+    festival = db.add_event(_event("Музыкальный фестиваль", "Концерт и музыкальный вечер", "Культурное"))
+    assert graph.refresh() == 4
+    assert _neighbor_ids(db, park) == [forest]
+    assert forest not in _neighbor_ids(db, concert)
+
+    db.update_event(forest, _event("Музыкальный концерт", "Концерт и музыкальный вечер", "Культурное"))
+    assert graph.refresh() > 0
+
+    assert park not in _neighbor_ids(db, forest)
+    assert festival in _neighbor_ids(db, forest)
+    # Обратные списки: бывший сосед потерял мероприятие, новые соседи его получили
+    assert forest not in _neighbor_ids(db, park)
+    assert forest in _neighbor_ids(db, concert)
+    assert forest in _neighbor_ids(db, festival)
+
+
+def test_delete_removes_event_from_neighbor_lists(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "events.db")
+    monkeypatch.setattr(event_similarity, "Database", lambda: Database(db_path))
+    monkeypatch.setattr(EventSimilarityGraph, "_instance", None)
+    graph = EventSimilarityGraph()
+    db = graph.db
+
+    park = db.add_event(_event("Уборка парка", "Собираем мусор в парке", "Экологическое"))
+    forest = db.add_event(_event("Уборка леса", "Собираем мусор в лесу", "Экологическое"))
+    graph.refresh()
+    assert _neighbor_ids(db, park) == [forest]
+
+    db.delete_event(forest)
+    graph.refresh()
+    assert _neighbor_ids(db, park) == []
+    assert graph.get_similar(park) == []
@@ -0,0 +1,46 @@
+import pytest
+
+from database.core import Database
+from services.ai import event_index
+from services.ai.event_index import EventNameIndex
+from services.ai.faq_index import FAQIndex
+
+
+@pytest.fixture
+def faq(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "events.db")
+    monkeypatch.setattr(event_index, "Database", lambda: Database(db_path))
+    monkeypatch.setattr(EventNameIndex, "_instance", None)
+    Database(db_path).add_event({
+        "name": "Субботник в парке", "date": "01.01.2099", "time": "10:00", "city": "Москва",
+        "description": "Уборка парка", "tags": "Экологическое"
+    })
+    return FAQIndex()
+
+
+@pytest.mark.parametrize("query", [
+    "как записаться на мероприятие",
+    "как начисляются баллы",
+    "что такое лидерборд",
+    "как попасть в топ волонтеров",
+    "расскажи о себе",
+])
+def test_general_questions_are_answered(faq, query):
+    assert faq.answer(query)
+
+
+@pytest.mark.parametrize("query", [
+    "сколько баллов у меня",
+    "Как записаться на мероприятие Субботник в парке?",
+])
+def test_personal_and_event_questions_go_to_model(faq, query):
+    assert faq.answer(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "топ мероприятий на выходных",
+    "что умеет волонтер на субботнике",
+    "какие виды волонтерства подходят для врача",
+])
+def test_single_shared_word_is_not_enough(faq, query):
+    assert faq.answer(query) is None
@@ -0,0 +1,35 @@
+import pytest
+
+from services.ai.gazetteer import RegionGazetteer
+
+
+@pytest.mark.parametrize("query, region", [
+    ("мероприятия в нижнем новгороде", "Нижегородская область"),
+    ("волонтерство в Нижнем Новгороде", "Нижегородская область"),
+    ("что есть в новгороде", "Новгородская область"),
+    ("акции в великом новгороде", "Новгородская область"),
+    ("уборка в нижегородской области", "Нижегородская область"),
+])
+def test_novgorod_regions_are_told_apart(query, region):
+    assert RegionGazetteer().best(query)[0] == region
+
+
+@pytest.mark.parametrize("query, region", [
+    ("мероприятия в Советске", "Калининградская область"),
+    ("из Балтийска", "Калининградская область"),
+    ("волонтеры в Кировске", "Мурманская область"),
+    ("субботник в Апатитах", "Мурманская область"),
+])
+def test_ambiguous_towns_match_by_exact_form(query, region):
+    assert RegionGazetteer().best(query)[0] == region
+
+
+@pytest.mark.parametrize("query", [
+    "советский район",
+    "дай совет",
+    "советы волонтерам",
+    "кировский район",
+    "балтийский завод",
+])
+def test_everyday_words_do_not_match_towns(query):
+    assert RegionGazetteer().best(query) is None
@@ -0,0 +1,33 @@
+import pytest
+
+from services.ai.interest_lexicon import InterestLexicon
+
+
+@pytest.mark.parametrize("text", [
+    "люблю читать стихи",
+    "хочу помогать в команде друзей",
+    "где парковка у входа?",
+    "расскажи историю",
+    "здорово, спасибо",
+    "купил новую кровать",
+    "поехали в деревню",
+    "берегите себя",
+    "посадка на поезд в 10 утра",
+    "хочу работать волонтером",
+    "пойдем в компании друзей",
+])
+def test_everyday_phrases_get_no_tags(text):
+    assert InterestLexicon().tags(text) == []
+
+
+@pytest.mark.parametrize("text, tag", [
+    ("хочу помочь после стихийного бедствия", "Чрезвычайное"),
+    ("уборка парка в субботу", "Экологическое"),
+    ("прогулка по парку с собаками из приюта", "Экологическое"),
+    ("экскурсия по историческому центру", "Культурное"),
+    ("мероприятие для коллег на тимбилдинг", "Корпоративное"),
+    ("хочу сдать кровь", "Медицинское"),
+    ("посадить деревья во дворе", "Экологическое"),
+])
+def test_interest_phrases_get_tags(text, tag):
+    assert tag in InterestLexicon().tags(text)
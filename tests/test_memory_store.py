@@ -0,0 +1,19 @@
+import gc
+import threading
+
+from services.ai.memory_store import MemoryStore
+
+
+def test_connection_of_finished_thread_is_closed(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    opened = len(store._connections)
+
+    for user_id in range(5):
+        thread = threading.Thread(target=store.get_conversation_history, args=(user_id,))
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert len(store._connections) == opened
+    store.close()
+    assert len(store._connections) == 0
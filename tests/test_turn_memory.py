@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services.ai.memory_store import MemoryStore
+from services.ai.turn_memory import TurnMemory
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def make_memory(store):
+    memory = object.__new__(TurnMemory)
+    memory.memory_store = store
+    memory.embeddings = FakeEmbeddings()
+    memory.limit = 10
+    memory.cache_size = 10
+    memory._indexes = OrderedDict()
+    memory._lock = threading.Lock()
+    return memory
+
+
+def turn(query):
+    return {"user_id": 1, "query": query, "response": "ok", "vector": np.array([1.0, 0.0], dtype=np.float32).tobytes()}
+
+
+def test_turn_stored_while_index_loads_is_recalled(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.store_conversation_turns([turn("первый")], 10)
+    memory = make_memory(store)
+
+    load = store.get_conversation_turns
+
+    def load_and_store_concurrently(user_id, after_id=0):
+        turns = load(user_id, after_id)
+        if not after_id:
+            # Ход сохраняется после чтения базы, но до появления индекса в кэше
+            memory._store([{"user_id": 1, "query": "второй", "response": "ok"}])
+        return turns
+
+    store.get_conversation_turns = load_and_store_concurrently
+    recalled = memory.recall(1, "второй")
+
+    assert [record["query"] for record in recalled] == ["первый", "второй"]
+    # Следующий ход добавляет сам _store, без повторов
+    memory._store([{"user_id": 1, "query": "второй", "response": "ok"}])
+    assert len(memory._indexes[1]) == 3
+    store.close()